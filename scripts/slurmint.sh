@@ -53,5 +53,6 @@ run_cmd "\
     APP_ID=\"\$(torchx run --wait --scheduler slurm  utils.echo --num_replicas 3)\" && \
     torchx status \"\$APP_ID\" && \
     torchx describe \"\$APP_ID\" && \
-    cat \"slurm-\$(basename \$APP_ID).out\" \
+    torchx log \"\$APP_ID/echo\" && \
+    cat \"slurm-\$(basename \$APP_ID)\"-echo-*.out \
 "
@@ -9,15 +9,13 @@ import argparse
 import logging
 import re
 import sys
-import threading
-from queue import Queue
 from typing import Optional
 from urllib.parse import urlparse
 
 from pyre_extensions import none_throws
 from torchx import specs
 from torchx.cli.cmd_base import SubCommand
-from torchx.runner import Runner, get_runner
+from torchx.runner import get_runner
 from torchx.specs.api import make_app_handle
 
 logger: logging.Logger = logging.getLogger(__name__)
@@ -30,6 +28,9 @@ else:
     GREEN = ""
     ENDC = ""
 
+# max number of log lines buffered before they are written to stdout
+MAX_BATCH_LINES: int = 1024
+
 
 def validate(job_identifier: str) -> None:
     if not re.match(r"^\w+://[^/.]*/[^/.]+/[^/.]+(/(\d+,?)+)?$", job_identifier):
@@ -39,26 +40,13 @@ def validate(job_identifier: str) -> None:
         sys.exit(1)
 
 
-def print_log_lines(
-    runner: Runner,
-    app_handle: str,
-    role_name: str,
-    replica_id: int,
-    regex: str,
-    should_tail: bool,
-    exceptions: "Queue[Exception]",
+def get_logs(
+    identifier: str,
+    regex: Optional[str],
+    should_tail: bool = False,
+    tail_lines: Optional[int] = None,
+    limit_bytes: Optional[int] = None,
 ) -> None:
-    try:
-        for line in runner.log_lines(
-            app_handle, role_name, replica_id, regex, should_tail=should_tail
-        ):
-            print(f"{GREEN}{role_name}/{replica_id}{ENDC} {line}")
-    except Exception as e:
-        exceptions.put(e)
-        raise
-
-
-def get_logs(identifier: str, regex: Optional[str], should_tail: bool = False) -> None:
     validate(identifier)
     url = urlparse(identifier)
     scheduler_backend = url.scheme
@@ -96,38 +84,33 @@ def get_logs(identifier: str, regex: Optional[str], should_tail: bool = False) -
 
         replica_ids = list(range(0, num_replicas))
 
-    threads = []
-    exceptions = Queue()
-    for replica_id in replica_ids:
-        thread = threading.Thread(
-            target=print_log_lines,
-            args=(
-                runner,
-                app_handle,
-                role_name,
-                replica_id,
-                regex,
-                should_tail,
-                exceptions,
-            ),
-        )
-        thread.daemon = True
-        thread.start()
-        threads.append(thread)
-
-    for thread in threads:
-        thread.join()
-
-    # Retrieve all exceptions, print all except one and raise the first recorded exception
-    threads_exceptions = []
-    while not exceptions.empty():
-        threads_exceptions.append(exceptions.get())
-
-    if len(threads_exceptions) > 0:
-        for i in range(1, len(threads_exceptions)):
-            logger.error(threads_exceptions[i])
-
-        raise threads_exceptions[0]
+    # lines of all replicas are written to stdout from this thread only, in
+    # batches of the lines read so far whenever no more lines are available
+    batch = []
+
+    def flush() -> None:
+        if batch:
+            sys.stdout.write("".join(batch))
+            batch.clear()
+        sys.stdout.flush()
+
+    lines = runner.log_lines_multiplexed(
+        app_handle,
+        role_name,
+        replica_ids,
+        regex,
+        should_tail=should_tail,
+        on_idle=flush,
+        tail_lines=tail_lines,
+        limit_bytes=limit_bytes,
+    )
+    try:
+        for replica_id, line in lines:
+            batch.append(f"{GREEN}{role_name}/{replica_id}{ENDC} {line}\n")
+            if len(batch) >= MAX_BATCH_LINES:
+                flush()
+    finally:
+        flush()
 
 
 def find_role_replicas(app: specs.AppDef, role_name: str) -> Optional[int]:
@@ -152,6 +135,18 @@ class CmdLog(SubCommand):
             help="Tail logs",
         )
 
+        subparser.add_argument(
+            "--tail_lines",
+            type=int,
+            help="only print the last N lines of each replica's log",
+        )
+
+        subparser.add_argument(
+            "--limit_bytes",
+            type=int,
+            help="stop after (about) N bytes of each replica's log",
+        )
+
         subparser.add_argument(
             "identifier",
             type=str,
@@ -159,4 +154,10 @@ class CmdLog(SubCommand):
         )
 
     def run(self, args: argparse.Namespace) -> None:
-        get_logs(args.identifier, args.regex, args.tail)
+        get_logs(
+            args.identifier,
+            args.regex,
+            args.tail,
+            tail_lines=args.tail_lines,
+            limit_bytes=args.limit_bytes,
+        )
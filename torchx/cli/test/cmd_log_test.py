@@ -11,7 +11,9 @@ from typing import Iterator, Optional
 from unittest.mock import MagicMock, patch
 
 from torchx.cli.cmd_log import ENDC, GREEN, get_logs
-from torchx.specs import AppDef, Role, parse_app_handle
+from torchx.runner import Runner
+from torchx.schedulers.api import DescribeAppResponse
+from torchx.specs import AppState, Role
 
 
 class SentinelError(Exception):
@@ -25,37 +27,47 @@ class SentinelError(Exception):
 RUNNER = "torchx.cli.cmd_log.get_runner"
 
 
+def log_iter(
+    app_id: str,
+    role_name: str,
+    k: int,
+    regex: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    should_tail: bool = False,
+    tail_lines: Optional[int] = None,
+    limit_bytes: Optional[int] = None,
+) -> Iterator[str]:
+    import re
+
+    if regex is None:
+        regex = ".*"
+
+    log_lines = ["INFO foo", "ERROR bar", "WARN baz"]
+    return iter([line for line in log_lines if re.match(regex, line)])
+
+
 class MockRunner:
-    def __call__(self, name: Optional[str] = None) -> "MockRunner":
-        return self
+    """
+    Creates a ``Runner`` on a mock scheduler whose ``log_iter`` is patched,
+    so that ``get_logs`` goes through the real ``Runner.log_lines_multiplexed``.
+    """
 
-    def describe(self, app_handle: str) -> AppDef:
-        scheduler_backend, session_name, app_id = parse_app_handle(app_handle)
-        return AppDef(
-            name=app_id,
+    def __call__(self, name: Optional[str] = None) -> Runner:
+        scheduler = MagicMock()
+        scheduler.describe.return_value = DescribeAppResponse(
+            app_id="SparseNNAppDef",
+            state=AppState.RUNNING,
             roles=[
                 Role(name="master", image="test_image", num_replicas=1),
                 Role(name="trainer", image="test_image", num_replicas=3),
             ],
         )
-
-    def log_lines(
-        self,
-        app_id: str,
-        role_name: str,
-        k: str,
-        regex: str,
-        since: Optional[int] = None,
-        until: Optional[int] = None,
-        should_tail: bool = False,
-    ) -> Iterator[str]:
-        import re
-
-        if regex is None:
-            regex = ".*"
-
-        log_lines = ["INFO foo", "ERROR bar", "WARN baz"]
-        return iter([line for line in log_lines if re.match(regex, line)])
+        scheduler.log_iter.side_effect = log_iter
+        runner = Runner(
+            name or "default", schedulers={"default": scheduler, "local": scheduler}
+        )
+        return runner
 
 
 class CmdLogTest(unittest.TestCase):
@@ -135,7 +147,6 @@ class CmdLogTest(unittest.TestCase):
     def test_print_log_lines_throws(self, mock_runner: MagicMock) -> None:
         # makes sure that when the function executed in the threadpool
         # errors out; we raise the exception all the way through
-        with patch.object(mock_runner, "log_lines") as log_lines_mock:
-            log_lines_mock.side_effect = RuntimeError
+        with patch(__name__ + ".log_iter", side_effect=RuntimeError):
             with self.assertRaises(RuntimeError):
                 get_logs("local://test-session/SparseNNAppDef/trainer/0,1", regex=None)
@@ -16,6 +16,7 @@ from typing import Generator
 from unittest.mock import MagicMock, patch
 
 from torchx.cli.cmd_run import CmdBuiltins, CmdRun, _parse_run_config
+from torchx.schedulers.slurm_scheduler import create_scheduler as create_slurm_scheduler
 
 
 @contextmanager
@@ -97,6 +98,11 @@ class CmdRunTest(unittest.TestCase):
         self.assertEqual("value", cfg.get("key"))
         self.assertEqual("bar", cfg.get("foo"))
 
+    def test_parse_run_config_bool(self) -> None:
+        cfg = _parse_run_config("homogeneous=True")
+        resolved = create_slurm_scheduler("test").run_opts().resolve(cfg)
+        self.assertIs(True, resolved.get("homogeneous"))
+
 
 class CmdBuiltinTest(unittest.TestCase):
     def test_run(self) -> None:
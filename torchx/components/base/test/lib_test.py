@@ -16,9 +16,15 @@ from unittest.mock import patch
 
 from torchx.components.base import torch_dist_role
 from torchx.specs.api import Resource
+from torchx.util.entrypoints import clear_cache
 
 
 class TorchxBaseLibTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # entry points are cached per process, re-read the patched ones
+        clear_cache()
+        self.addCleanup(clear_cache)
+
     def test_torch_dist_role_str_resources(self) -> None:
         expected_resources = {}
         with patch.object(metadata, "entry_points") as entry_points_mock:
@@ -5,4 +5,9 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
-from torchx.runner.api import Runner, get_runner  # noqa: F401 F403
+from torchx.runner.api import (  # noqa: F401 F403
+    AsyncRunner,
+    Runner,
+    get_async_runner,
+    get_runner,
+)
@@ -5,17 +5,39 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
+import asyncio
 import getpass
+import heapq
 import json
 import logging
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from functools import partial
+from queue import Full, Queue
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from pyre_extensions import none_throws
 from torchx.runner.events import log_event
 from torchx.schedulers import get_schedulers
-from torchx.schedulers.api import Scheduler
+from torchx.schedulers.api import (
+    DescribeAppResponse,
+    Scheduler,
+    log_limits,
+    run_in_thread,
+)
 from torchx.specs.api import (
     AppDef,
     AppDryRunInfo,
@@ -42,6 +64,143 @@ NONE: str = "<NONE>"
 # /tmp/foobar.py:component
 ComponentId = str
 
+K = TypeVar("K")
+
+# marks the end of a stream in the multiplexer's queues
+_END_OF_STREAM = object()
+
+# interval (in seconds) at which a reader blocked on a full queue checks
+# whether the multiplexer has been closed
+_STOP_POLL_INTERVAL: float = 0.1
+
+
+def _put(
+    out: "Queue[Tuple[K, object]]", item: Tuple[K, object], stop: threading.Event
+) -> bool:
+    # blocks until item is queued (returns True) or the multiplexer is closed
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=_STOP_POLL_INTERVAL)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def _read_stream(
+    key: K,
+    stream: Callable[[], Iterable[str]],
+    out: "Queue[Tuple[K, object]]",
+    stop: threading.Event,
+) -> None:
+    lines = None
+    try:
+        lines = iter(stream())
+        for line in lines:
+            if not _put(out, (key, line), stop):
+                return
+    except Exception as e:
+        _put(out, (key, e), stop)
+    finally:
+        close = getattr(lines, "close", None)
+        if close and stop.is_set():
+            close()
+        _put(out, (key, _END_OF_STREAM), stop)
+
+
+def _multiplex(
+    streams: Dict[K, Callable[[], Iterable[str]]],
+    max_buffered_lines: int,
+    merge_key: Optional[Callable[[str], Any]] = None,
+    on_idle: Optional[Callable[[], None]] = None,
+) -> Iterator[Tuple[K, str]]:
+    """
+    Reads the given streams (each created by calling its factory) concurrently
+    and yields their lines as ``(key, line)`` from the calling thread. Each stream
+    is read by a daemon thread that only ever blocks on the stream itself or on
+    the (bounded) queue shared with the caller, so a slow consumer applies
+    backpressure to the streams rather than buffering them without bound.
+
+    Lines of the same stream are yielded in order. If ``merge_key`` is given,
+    the streams (assumed to be sorted by ``merge_key``) are merged in
+    ``merge_key`` order, otherwise lines are yielded as soon as they are read.
+    ``on_idle`` is called every time the caller is about to wait for lines
+    (e.g. to flush the lines it has buffered so far).
+
+    Closing the returned generator (or stopping to iterate it) stops the
+    readers: a reader exits as soon as its stream returns the next line and
+    the stream's iterator is closed.
+
+    Errors raised by a stream end that stream only. Once all streams have ended,
+    all but the first error are logged and the first one is raised.
+    """
+
+    if merge_key:
+        # merging needs to look at the next line of every stream, so each
+        # stream gets its own queue (and share of the buffer)
+        queue_size = max(1, max_buffered_lines // max(1, len(streams)))
+        queues = {key: Queue(maxsize=queue_size) for key in streams}
+    else:
+        shared_queue = Queue(maxsize=max_buffered_lines)
+        queues = {key: shared_queue for key in streams}
+
+    stop = threading.Event()
+    for key, stream in streams.items():
+        threading.Thread(
+            target=_read_stream,
+            args=(key, stream, queues[key], stop),
+            name=f"torchx-log-{key}",
+            daemon=True,
+        ).start()
+
+    errors = []
+
+    def _next(q: "Queue[Tuple[K, object]]") -> Optional[Tuple[K, str]]:
+        # returns the next line of the stream(s) read into q or None at the end
+        while True:
+            if on_idle and q.empty():
+                on_idle()
+            key, item = q.get()
+            if item is _END_OF_STREAM:
+                return None
+            elif isinstance(item, Exception):
+                errors.append(item)
+            else:
+                # pyre-ignore[7]: item is a line of the stream
+                return key, item
+
+    try:
+        if merge_key:
+            heap = []
+            for i, (key, q) in enumerate(queues.items()):
+                first = _next(q)
+                if first:
+                    heap.append((merge_key(first[1]), i, first, q))
+            heapq.heapify(heap)
+            while heap:
+                _, i, (key, line), q = heap[0]
+                yield key, line
+                nxt = _next(q)
+                if nxt:
+                    heapq.heapreplace(heap, (merge_key(nxt[1]), i, nxt, q))
+                else:
+                    heapq.heappop(heap)
+        else:
+            num_streams = len(streams)
+            while num_streams:
+                nxt = _next(shared_queue)
+                if nxt:
+                    yield nxt
+                else:
+                    num_streams -= 1
+    finally:
+        stop.set()
+
+    if errors:
+        for e in errors[1:]:
+            logger.error(e)
+        raise errors[0]
+
 
 class Runner:
     """
@@ -199,12 +358,65 @@ class Runner:
         with log_event("schedule", scheduler_backend, runcfg=runcfg) as logger_context:
             sched = self._scheduler(scheduler_backend)
             app_id = sched.schedule(dryrun_info)
-            app_handle = make_app_handle(scheduler_backend, self._name, app_id)
-            app = none_throws(dryrun_info._app)
-            self._apps[app_handle] = app
-            _, _, app_id = parse_app_handle(app_handle)
             logger_context._torchx_event.app_id = app_id
-            return app_handle
+            return self._add_app(dryrun_info, app_id)
+
+    def schedule_many(
+        self,
+        # pyre-fixme[24]: AppDryRunInfo was designed to work with Any request object
+        dryrun_infos: List[AppDryRunInfo],
+    ) -> List[Union[AppHandle, Exception]]:
+        """
+        Same as ``schedule`` but for several apps at once (e.g. the trials of a
+        hyperparameter sweep). The apps of each scheduler are submitted with
+        one ``Scheduler.schedule_many`` call, which submits them concurrently.
+
+        The submissions are independent of each other: the returned list has
+        the app handle of each app in the order of ``dryrun_infos`` or, if the
+        app failed to be submitted, the exception raised by its submission.
+
+        Usage:
+
+        ::
+
+         dryrun_infos = [
+             session.dryrun(app, scheduler="kubernetes", cfg=cfg) for app in apps
+         ]
+         for app, result in zip(apps, session.schedule_many(dryrun_infos)):
+             if isinstance(result, Exception):
+                 print(f"failed to launch {app.name}: {result}")
+
+        """
+        results: Dict[int, Union[AppHandle, Exception]] = {}
+        by_backend: Dict[SchedulerBackend, List[int]] = {}
+        for i, dryrun_info in enumerate(dryrun_infos):
+            by_backend.setdefault(none_throws(dryrun_info._scheduler), []).append(i)
+
+        for scheduler_backend, indices in by_backend.items():
+            with log_event("schedule_many", scheduler_backend):
+                sched = self._scheduler(scheduler_backend)
+                app_ids = sched.schedule_many([dryrun_infos[i] for i in indices])
+            for i, app_id in zip(indices, app_ids):
+                if isinstance(app_id, Exception):
+                    results[i] = app_id
+                else:
+                    results[i] = self._add_app(dryrun_infos[i], app_id)
+
+        num_failed = sum(isinstance(result, Exception) for result in results.values())
+        if num_failed:
+            logger.warning(f"failed to schedule {num_failed}/{len(results)} apps")
+        return [results[i] for i in range(len(dryrun_infos))]
+
+    # pyre-fixme[24]: AppDryRunInfo was designed to work with Any request object
+    def _add_app(self, dryrun_info: AppDryRunInfo, app_id: str) -> AppHandle:
+        """
+        Records the app scheduled from ``dryrun_info`` as ``app_id`` in this
+        session's apps and returns its app handle.
+        """
+        scheduler_backend = none_throws(dryrun_info._scheduler)
+        app_handle = make_app_handle(scheduler_backend, self._name, app_id)
+        self._apps[app_handle] = none_throws(dryrun_info._app)
+        return app_handle
 
     def name(self) -> str:
         return self._name
@@ -292,23 +504,28 @@ class Runner:
         )
         with log_event("status", scheduler_backend, app_id):
             desc = scheduler.describe(app_id)
-            if not desc:
-                # app does not exist on the scheduler
-                # remove it from apps cache if it exists
-                # effectively removes this app from the list() API
-                self._apps.pop(app_handle, None)
-                return None
+            return self._to_app_status(app_handle, desc)
 
-            app_status = AppStatus(
-                desc.state,
-                desc.num_restarts,
-                msg=desc.msg,
-                structured_error_msg=desc.structured_error_msg,
-                roles=desc.roles_statuses,
-            )
-            if app_status:
-                app_status.ui_url = desc.ui_url
-            return app_status
+    def _to_app_status(
+        self, app_handle: AppHandle, desc: Optional[DescribeAppResponse]
+    ) -> Optional[AppStatus]:
+        if not desc:
+            # app does not exist on the scheduler
+            # remove it from apps cache if it exists
+            # effectively removes this app from the list() API
+            self._apps.pop(app_handle, None)
+            return None
+
+        app_status = AppStatus(
+            desc.state,
+            desc.num_restarts,
+            msg=desc.msg,
+            structured_error_msg=desc.structured_error_msg,
+            roles=desc.roles_statuses,
+        )
+        if app_status:
+            app_status.ui_url = desc.ui_url
+        return app_status
 
     def wait(
         self, app_handle: AppHandle, wait_interval: float = 10
@@ -327,7 +544,8 @@ class Runner:
 
         Args:
             app_handle: the app handle to wait for completion
-            wait_interval: the minimum interval to wait before polling for status
+            wait_interval: the maximum interval to wait before polling for status
+                (schedulers that are notified of state changes may poll sooner)
 
         Returns:
             The terminal status of the application, or ``None`` if the app does not exist anymore
@@ -344,19 +562,58 @@ class Runner:
                 if app_status.is_terminal():
                     return app_status
                 else:
-                    time.sleep(wait_interval)
+                    scheduler._wait_for_state_change(app_id, wait_interval)
 
     def list(self) -> Dict[AppHandle, AppDef]:
         """
         Returns the applications that were run with this session mapped by the app handle.
         The persistence of the session is implementation dependent.
+
+        The apps' statuses are refreshed (and apps that no longer exist removed)
+        with one ``Scheduler.describe_many`` call per scheduler backend, the
+        backends are called concurrently.
         """
         with log_event("list"):
-            app_ids = list(self._apps.keys())
-            for app_id in app_ids:
-                self.status(app_id)
+            app_handles = self._app_handles_by_backend()
+            if len(app_handles) <= 1:
+                for scheduler_backend, handles in app_handles.items():
+                    self._refresh_statuses(scheduler_backend, handles)
+            else:
+                with ThreadPoolExecutor(
+                    max_workers=len(app_handles), thread_name_prefix="torchx-list"
+                ) as executor:
+                    futures = [
+                        executor.submit(self._refresh_statuses, backend, handles)
+                        for backend, handles in app_handles.items()
+                    ]
+                    for future in futures:
+                        future.result()
             return self._apps
 
+    def _app_handles_by_backend(
+        self,
+    ) -> Dict[SchedulerBackend, List[Tuple[AppHandle, str]]]:
+        """
+        Returns the ``(app_handle, app_id)`` of this session's apps grouped by
+        their scheduler backend.
+        """
+        app_handles = {}
+        for app_handle in list(self._apps.keys()):
+            scheduler_backend, _, app_id = parse_app_handle(app_handle)
+            app_handles.setdefault(scheduler_backend, []).append((app_handle, app_id))
+        return app_handles
+
+    def _refresh_statuses(
+        self,
+        scheduler_backend: SchedulerBackend,
+        app_handles: List[Tuple[AppHandle, str]],
+    ) -> None:
+        scheduler = self._scheduler(scheduler_backend)
+        with log_event("describe_many", scheduler_backend):
+            descs = scheduler.describe_many([app_id for _, app_id in app_handles])
+        for app_handle, app_id in app_handles:
+            self._to_app_status(app_handle, descs.get(app_id))
+
     def stop(self, app_handle: AppHandle) -> None:
         """
         Stops the application, effectively directing the scheduler to cancel
@@ -409,6 +666,8 @@ class Runner:
         since: Optional[datetime] = None,
         until: Optional[datetime] = None,
         should_tail: bool = False,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
     ) -> Iterable[str]:
         """
         Returns an iterator over the log lines of the specified job container.
@@ -458,6 +717,8 @@ class Runner:
                     first log line (start of job).
             until: datetime based end cursor. If left empty, follows the log output
                     until the job completes and all log lines have been consumed.
+            tail_lines: only returns the last ``tail_lines`` lines of the log
+            limit_bytes: stops after (about) ``limit_bytes`` bytes of log
 
         Returns:
              An iterator over the role k-th replica of the specified application.
@@ -473,10 +734,85 @@ class Runner:
             if not self.status(app_handle):
                 raise UnknownAppException(app_handle)
             log_iter = scheduler.log_iter(
-                app_id, role_name, k, regex, since, until, should_tail
+                app_id,
+                role_name,
+                k,
+                regex,
+                since,
+                until,
+                should_tail,
+                **log_limits(tail_lines, limit_bytes),
             )
             return log_iter
 
+    def log_lines_multiplexed(
+        self,
+        app_handle: AppHandle,
+        role_name: str,
+        replica_ids: List[int],
+        regex: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        should_tail: bool = False,
+        merge_key: Optional[Callable[[str], Any]] = None,
+        max_buffered_lines: int = 1024,
+        on_idle: Optional[Callable[[], None]] = None,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Same as ``log_lines`` but follows the logs of several replicas of the role
+        at once and returns an iterator over ``(replica_id, line)`` pairs.
+        Lines of the same replica are returned in order, lines of different
+        replicas are interleaved as they are read or, if ``merge_key`` is
+        specified, merged by ``merge_key`` (e.g. a function that parses the
+        timestamp of the log line).
+
+        The app is looked up once, then the logs of each replica are read by a
+        background thread (the scheduler log iterators are blocking) into a
+        buffer of at most
+        ``max_buffered_lines`` lines, which is drained by the caller's thread.
+        Hence only the caller consumes the lines (e.g. writes them to stdout)
+        and a slow consumer blocks the readers rather than growing the buffer.
+        ``on_idle`` is then called whenever the caller is about to wait for
+        more lines (e.g. to flush its output) and closing the returned iterator
+        stops the readers.
+
+        Usage:
+
+        ::
+
+         for replica_id, line in runner.log_lines_multiplexed(
+             app_handle, "trainer", replica_ids=[0, 1, 2], should_tail=True
+         ):
+             print(f"trainer/{replica_id} {line}")
+
+        Raises:
+            UnknownAppException: if the app does not exist in the scheduler
+        """
+        scheduler, scheduler_backend, app_id = self._scheduler_app_id(
+            app_handle, check_session=False
+        )
+        with log_event("log_lines_multiplexed", scheduler_backend, app_id):
+            if not self.status(app_handle):
+                raise UnknownAppException(app_handle)
+
+        streams = {
+            replica_id: partial(
+                scheduler.log_iter,
+                app_id,
+                role_name,
+                replica_id,
+                regex,
+                since,
+                until,
+                should_tail,
+                **log_limits(tail_lines, limit_bytes),
+            )
+            for replica_id in replica_ids
+        }
+        return _multiplex(streams, max_buffered_lines, merge_key, on_idle)
+
     def _scheduler(self, scheduler: SchedulerBackend) -> Scheduler:
         sched = self._schedulers.get(scheduler)
         if not sched:
@@ -507,6 +843,185 @@ class Runner:
         return f"Runner(name={self._name}, schedulers={self._schedulers}, apps={self._apps})"
 
 
+class AsyncRunner:
+    """
+    asyncio counterpart of ``Runner``: the action APIs are coroutines so that a
+    single event loop can drive many apps at once without a thread per app.
+    Wraps (and shares the session and the apps of) a ``Runner``.
+
+    The scheduler calls go through the scheduler's ``*_async`` methods, which
+    schedulers without a non-blocking client implement by running the blocking
+    call in the event loop's default executor (see ``Scheduler.schedule_async``).
+    Waiting for an app does not hold on to a thread in between status checks.
+
+    Usage:
+
+    ::
+
+     runner = AsyncRunner(get_runner())
+     app_handles = await asyncio.gather(*[runner.run(app) for app in apps])
+     statuses = await asyncio.gather(*[runner.wait(h) for h in app_handles])
+
+    """
+
+    def __init__(self, runner: Runner) -> None:
+        self._runner = runner
+
+    @property
+    def runner(self) -> Runner:
+        return self._runner
+
+    def name(self) -> str:
+        return self._runner.name()
+
+    async def run(
+        self,
+        app: AppDef,
+        scheduler: SchedulerBackend = "default",
+        cfg: Optional[RunConfig] = None,
+    ) -> AppHandle:
+        """
+        See ``Runner.run``.
+        """
+        # dryrun may fetch images or read files, so keep it off the event loop
+        dryrun_info = await run_in_thread(self._runner.dryrun, app, scheduler, cfg)
+        return await self.schedule(dryrun_info)
+
+    # pyre-fixme[24]: AppDryRunInfo was designed to work with Any request object
+    async def schedule(self, dryrun_info: AppDryRunInfo) -> AppHandle:
+        """
+        See ``Runner.schedule``.
+        """
+        runner = self._runner
+        scheduler_backend = none_throws(dryrun_info._scheduler)
+        cfg = dryrun_info._cfg
+        runcfg = json.dumps(cfg.cfgs) if cfg else None
+        with log_event("schedule", scheduler_backend, runcfg=runcfg) as logger_context:
+            sched = runner._scheduler(scheduler_backend)
+            app_id = await sched.schedule_async(dryrun_info)
+            logger_context._torchx_event.app_id = app_id
+            return runner._add_app(dryrun_info, app_id)
+
+    async def status(self, app_handle: AppHandle) -> Optional[AppStatus]:
+        """
+        See ``Runner.status``.
+        """
+        runner = self._runner
+        scheduler, scheduler_backend, app_id = runner._scheduler_app_id(
+            app_handle, check_session=False
+        )
+        with log_event("status", scheduler_backend, app_id):
+            desc = await scheduler.describe_async(app_id)
+            return runner._to_app_status(app_handle, desc)
+
+    async def wait(
+        self, app_handle: AppHandle, wait_interval: float = 10
+    ) -> Optional[AppStatus]:
+        """
+        See ``Runner.wait``.
+        """
+        scheduler, scheduler_backend, app_id = self._runner._scheduler_app_id(
+            app_handle, check_session=False
+        )
+        with log_event("wait", scheduler_backend, app_id):
+            while True:
+                app_status = await self.status(app_handle)
+
+                if not app_status:
+                    return None
+                if app_status.is_terminal():
+                    return app_status
+                else:
+                    await scheduler._wait_for_state_change_async(app_id, wait_interval)
+
+    async def list(self) -> Dict[AppHandle, AppDef]:
+        """
+        See ``Runner.list``.
+        """
+        runner = self._runner
+        with log_event("list"):
+            app_handles = runner._app_handles_by_backend()
+            await asyncio.gather(
+                *[
+                    self._refresh_statuses(backend, handles)
+                    for backend, handles in app_handles.items()
+                ]
+            )
+            return runner._apps
+
+    async def _refresh_statuses(
+        self,
+        scheduler_backend: SchedulerBackend,
+        app_handles: List[Tuple[AppHandle, str]],
+    ) -> None:
+        runner = self._runner
+        scheduler = runner._scheduler(scheduler_backend)
+        with log_event("describe_many", scheduler_backend):
+            descs = await scheduler.describe_many_async(
+                [app_id for _, app_id in app_handles]
+            )
+        for app_handle, app_id in app_handles:
+            runner._to_app_status(app_handle, descs.get(app_id))
+
+    async def stop(self, app_handle: AppHandle) -> None:
+        """
+        See ``Runner.stop``.
+        """
+        scheduler, scheduler_backend, app_id = self._runner._scheduler_app_id(
+            app_handle
+        )
+        with log_event("stop", scheduler_backend, app_id):
+            status = await self.status(app_handle)
+            if status is not None and not status.is_terminal():
+                await scheduler.cancel_async(app_id)
+
+    async def log_lines(
+        self,
+        app_handle: AppHandle,
+        role_name: str,
+        k: int = 0,
+        regex: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        should_tail: bool = False,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        See ``Runner.log_lines``.
+
+        Usage:
+
+        ::
+
+         async for line in runner.log_lines(app_handle, "trainer", k=0):
+            print(line)
+
+        Raise:
+            UnknownAppException: if the app does not exist in the scheduler
+        """
+        scheduler, scheduler_backend, app_id = self._runner._scheduler_app_id(
+            app_handle, check_session=False
+        )
+        with log_event("log_lines", scheduler_backend, app_id):
+            if not await self.status(app_handle):
+                raise UnknownAppException(app_handle)
+        async for line in scheduler.log_iter_async(
+            app_id,
+            role_name,
+            k,
+            regex,
+            since,
+            until,
+            should_tail,
+            **log_limits(tail_lines, limit_bytes),
+        ):
+            yield line
+
+    def __repr__(self) -> str:
+        return f"AsyncRunner({self._runner})"
+
+
 def get_runner(name: Optional[str] = None, **scheduler_params: Any) -> Runner:
     """
     Convenience method to construct and get a Runner object.
@@ -526,3 +1041,16 @@ def get_runner(name: Optional[str] = None, **scheduler_params: Any) -> Runner:
 
     schedulers = get_schedulers(session_name=name, **scheduler_params)
     return Runner(name, schedulers)
+
+
+def get_async_runner(
+    name: Optional[str] = None, **scheduler_params: Any
+) -> AsyncRunner:
+    """
+    Same as ``get_runner`` but returns an ``AsyncRunner``.
+
+    >>> from torchx.runner import get_async_runner
+    >>> get_async_runner(name="torchx-docs", queue="default")
+    AsyncRunner(Runner(name=torchx-docs, ...))
+    """
+    return AsyncRunner(get_runner(name, **scheduler_params))
@@ -5,21 +5,26 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
+import asyncio
 import datetime
 import os
 import shutil
 import tempfile
+import threading
+import time
 import unittest
 from dataclasses import asdict
+from typing import Iterator, List
 from unittest.mock import MagicMock, patch
 
 from pyre_extensions import none_throws
-from torchx.runner import Runner
+from torchx.runner import AsyncRunner, Runner
 from torchx.schedulers.api import DescribeAppResponse
 from torchx.schedulers.local_scheduler import LocalScheduler
 from torchx.schedulers.test.test_util import write_shell_script
 from torchx.specs.api import (
     AppDef,
+    AppDryRunInfo,
     AppState,
     Resource,
     Role,
@@ -167,6 +172,93 @@ class RunnerTest(unittest.TestCase):
         apps = session.list()
         self.assertEqual(num_apps, len(apps))
 
+    def test_list_describe_many(self, _) -> None:
+        def submit_dryrun(app: AppDef, cfg: RunConfig) -> AppDryRunInfo[None]:
+            dryrun_info = AppDryRunInfo(None, repr)
+            dryrun_info._app = app
+            return dryrun_info
+
+        default_scheduler_mock = MagicMock()
+        other_scheduler_mock = MagicMock()
+        for scheduler_mock, app_ids in [
+            (default_scheduler_mock, ["app1", "app2"]),
+            (other_scheduler_mock, ["app3"]),
+        ]:
+            scheduler_mock.submit_dryrun.side_effect = submit_dryrun
+            scheduler_mock.schedule.side_effect = app_ids
+        default_scheduler_mock.describe_many.return_value = {
+            "app1": DescribeAppResponse("app1", AppState.RUNNING),
+            "app2": None,
+        }
+        other_scheduler_mock.describe_many.return_value = {
+            "app3": DescribeAppResponse("app3", AppState.SUCCEEDED),
+        }
+        session = Runner(
+            name=SESSION_NAME,
+            schedulers={
+                "default": default_scheduler_mock,
+                "other": other_scheduler_mock,
+            },
+        )
+        role = Role(name="echo", image=self.test_dir, entrypoint="echo")
+        app = AppDef("name", roles=[role])
+        app_handles = [
+            session.run(app),
+            session.run(app),
+            session.run(app, scheduler="other"),
+        ]
+
+        # app2 no longer exists
+        apps = session.list()
+        self.assertEqual({app_handles[0], app_handles[2]}, set(apps.keys()))
+        # one bulk call per scheduler
+        default_scheduler_mock.describe_many.assert_called_once_with(["app1", "app2"])
+        other_scheduler_mock.describe_many.assert_called_once_with(["app3"])
+        default_scheduler_mock.describe.assert_not_called()
+
+    def test_schedule_many(self, _) -> None:
+        def submit_dryrun(app: AppDef, cfg: RunConfig) -> AppDryRunInfo[None]:
+            dryrun_info = AppDryRunInfo(None, repr)
+            dryrun_info._app = app
+            return dryrun_info
+
+        default_scheduler_mock = MagicMock()
+        other_scheduler_mock = MagicMock()
+        error = ValueError("quota exceeded")
+        default_scheduler_mock.submit_dryrun.side_effect = submit_dryrun
+        default_scheduler_mock.schedule_many.return_value = ["app1", error]
+        other_scheduler_mock.submit_dryrun.side_effect = submit_dryrun
+        other_scheduler_mock.schedule_many.return_value = ["app2"]
+        session = Runner(
+            name=SESSION_NAME,
+            schedulers={
+                "default": default_scheduler_mock,
+                "other": other_scheduler_mock,
+            },
+        )
+        role = Role(name="echo", image=self.test_dir, entrypoint="echo")
+        app = AppDef("name", roles=[role])
+        dryrun_infos = [
+            session.dryrun(app),
+            session.dryrun(app, scheduler="other"),
+            session.dryrun(app),
+        ]
+
+        results = session.schedule_many(dryrun_infos)
+        self.assertEqual(
+            [
+                f"default://{SESSION_NAME}/app1",
+                f"other://{SESSION_NAME}/app2",
+                error,
+            ],
+            results,
+        )
+        default_scheduler_mock.schedule_many.assert_called_once_with(
+            [dryrun_infos[0], dryrun_infos[2]]
+        )
+        other_scheduler_mock.schedule_many.assert_called_once_with([dryrun_infos[1]])
+        self.assertEqual(app, session.describe(f"default://{SESSION_NAME}/app1"))
+
     def test_evict_non_existent_app(self, _) -> None:
         # tests that apps previously run with this session that are finished and eventually
         # removed by the scheduler also get removed from the session after a status() API has been
@@ -336,6 +428,144 @@ class RunnerTest(unittest.TestCase):
             app_id, role_name, replica_id, regex, since, until, False
         )
 
+        # tail_lines and limit_bytes are only passed to the scheduler when set
+        scheduler_mock.log_iter.reset_mock()
+        session.log_lines(f"default://test_session/{app_id}", role_name, tail_lines=5)
+        scheduler_mock.log_iter.assert_called_once_with(
+            app_id, role_name, 0, None, None, None, False, tail_lines=5
+        )
+
+    def test_log_lines_multiplexed(self, _) -> None:
+        scheduler_mock = MagicMock()
+        scheduler_mock.describe.return_value = DescribeAppResponse(
+            "mock_app", AppState.RUNNING
+        )
+        scheduler_mock.log_iter.side_effect = lambda app_id, role, k, *args: iter(
+            [f"{i} replica_{k}" for i in range(k, 10, 3)]
+        )
+        session = Runner(
+            name=SESSION_NAME,
+            schedulers={"default": scheduler_mock},
+        )
+        app_handle = "default://test_session/mock_app"
+
+        lines = list(
+            session.log_lines_multiplexed(
+                app_handle, "trainer", [0, 1, 2], max_buffered_lines=2
+            )
+        )
+        # interleaved but ordered per replica
+        for k in range(3):
+            self.assertEqual(
+                [f"{i} replica_{k}" for i in range(k, 10, 3)],
+                [line for replica_id, line in lines if replica_id == k],
+            )
+
+        lines = list(
+            session.log_lines_multiplexed(
+                app_handle,
+                "trainer",
+                [0, 1, 2],
+                merge_key=lambda line: int(line.split(" ")[0]),
+            )
+        )
+        self.assertEqual(
+            [(i % 3, f"{i} replica_{i % 3}") for i in range(10)],
+            lines,
+        )
+
+    def test_log_lines_multiplexed_error(self, _) -> None:
+        scheduler_mock = MagicMock()
+        scheduler_mock.describe.return_value = DescribeAppResponse(
+            "mock_app", AppState.RUNNING
+        )
+
+        def log_iter(app_id: str, role: str, k: int, *args: object) -> Iterator[str]:
+            yield "hello"
+            if k == 1:
+                raise RuntimeError("failed to read logs")
+            yield "world"
+
+        scheduler_mock.log_iter.side_effect = log_iter
+        session = Runner(
+            name=SESSION_NAME,
+            schedulers={"default": scheduler_mock},
+        )
+
+        lines = []
+        with self.assertRaises(RuntimeError):
+            for line in session.log_lines_multiplexed(
+                "default://test_session/mock_app", "trainer", [0, 1]
+            ):
+                lines.append(line)
+        # the healthy replica is read to the end before the error is raised
+        self.assertEqual(
+            [(0, "hello"), (0, "world"), (1, "hello")],
+            sorted(lines),
+        )
+
+    def test_log_lines_multiplexed_close(self, _) -> None:
+        scheduler_mock = MagicMock()
+        scheduler_mock.describe.return_value = DescribeAppResponse(
+            "mock_app", AppState.RUNNING
+        )
+        closed = [threading.Event(), threading.Event()]
+
+        def log_iter(app_id: str, role: str, k: int, *args: object) -> Iterator[str]:
+            try:
+                i = 0
+                while True:
+                    yield f"line {i}"
+                    i += 1
+            finally:
+                closed[k].set()
+
+        scheduler_mock.log_iter.side_effect = log_iter
+        session = Runner(
+            name=SESSION_NAME,
+            schedulers={"default": scheduler_mock},
+        )
+
+        on_idle = MagicMock()
+        lines = session.log_lines_multiplexed(
+            "default://test_session/mock_app",
+            "trainer",
+            [0, 1],
+            max_buffered_lines=2,
+            on_idle=on_idle,
+        )
+        for _ in range(3):
+            next(lines)
+        lines.close()
+
+        # readers blocked on the full buffer stop and close their log iterators
+        for event in closed:
+            self.assertTrue(event.wait(timeout=10))
+        on_idle.assert_called()
+
+    def test_log_lines_multiplexed_describe_once(self, _) -> None:
+        scheduler_mock = MagicMock()
+        scheduler_mock.describe.return_value = DescribeAppResponse(
+            "mock_app", AppState.RUNNING
+        )
+        scheduler_mock.log_iter.side_effect = lambda app_id, role, k, *args, **kw: iter(
+            [f"replica_{k}"]
+        )
+        session = Runner(
+            name=SESSION_NAME,
+            schedulers={"default": scheduler_mock},
+        )
+
+        lines = session.log_lines_multiplexed(
+            "default://test_session/mock_app", "trainer", [0, 1, 2], tail_lines=5
+        )
+        self.assertEqual([(k, f"replica_{k}") for k in range(3)], sorted(lines))
+        # the app is described once rather than once per replica
+        scheduler_mock.describe.assert_called_once_with("mock_app")
+        scheduler_mock.log_iter.assert_any_call(
+            "mock_app", "trainer", 2, None, None, None, False, tail_lines=5
+        )
+
     def test_no_default_scheduler(self, _) -> None:
         with self.assertRaises(ValueError):
             Runner(name=SESSION_NAME, schedulers={"local": self.scheduler})
@@ -426,3 +656,94 @@ class RunnerTest(unittest.TestCase):
         with patch.object(runner, "run") as run_mock:
             with self.assertRaises(ValueError):
                 runner.run_component(f"{component_path}:unknown_function", [], "local")
+
+
+@patch("torchx.runner.api.log_event")
+class AsyncRunnerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = tempfile.mkdtemp("AsyncRunnerTest")
+
+        write_shell_script(self.test_dir, "touch.sh", ["touch $1"])
+        write_shell_script(self.test_dir, "fail.sh", ["exit 1"])
+        write_shell_script(self.test_dir, "sleep.sh", ["sleep $1"])
+        write_shell_script(self.test_dir, "echo_stderr.sh", ["echo $1 1>&2"])
+
+        self.scheduler = LocalScheduler(SESSION_NAME)
+        self.runner = AsyncRunner(
+            Runner(name=SESSION_NAME, schedulers={"default": self.scheduler})
+        )
+        self.cfg = RunConfig({"image_type": "dir"})
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def _app(self, entrypoint: str, *args: str) -> AppDef:
+        role = Role(
+            name="role",
+            image=self.test_dir,
+            resource=resource.SMALL,
+            entrypoint=entrypoint,
+            args=list(args),
+        )
+        return AppDef(entrypoint, roles=[role])
+
+    def test_run_wait_list(self, _) -> None:
+        test_file = os.path.join(self.test_dir, "test_file")
+        apps = [self._app("touch.sh", test_file), self._app("fail.sh")]
+
+        async def run() -> List[AppState]:
+            app_handles = await asyncio.gather(
+                *[self.runner.run(app, cfg=self.cfg) for app in apps]
+            )
+            self.assertEqual(set(app_handles), set(await self.runner.list()))
+            statuses = await asyncio.gather(
+                *[self.runner.wait(h, wait_interval=0.1) for h in app_handles]
+            )
+            return [none_throws(status).state for status in statuses]
+
+        self.assertEqual([AppState.SUCCEEDED, AppState.FAILED], asyncio.run(run()))
+        self.assertTrue(os.path.isfile(test_file))
+
+    def test_stop(self, _) -> None:
+        async def run() -> AppState:
+            app_handle = await self.runner.run(
+                self._app("sleep.sh", "60"), cfg=self.cfg
+            )
+            self.assertEqual(
+                AppState.RUNNING,
+                none_throws(await self.runner.status(app_handle)).state,
+            )
+            await self.runner.stop(app_handle)
+            # the local scheduler notifies the waiter rather than it polling
+            status = await self.runner.wait(app_handle, wait_interval=60)
+            return none_throws(status).state
+
+        start = time.monotonic()
+        self.assertEqual(AppState.CANCELLED, asyncio.run(run()))
+        self.assertLess(time.monotonic() - start, 30)
+
+    def test_wait_unknown_app(self, _) -> None:
+        self.assertIsNone(
+            asyncio.run(self.runner.wait("default://test_session/unknown_app_id", 0.1))
+        )
+
+    def test_log_lines(self, _) -> None:
+        cfg = RunConfig({"log_dir": self.test_dir})
+
+        async def run() -> List[str]:
+            app_handle = await self.runner.run(
+                self._app("echo_stderr.sh", "hello"), cfg=cfg
+            )
+            return [line async for line in self.runner.log_lines(app_handle, "role")]
+
+        self.assertEqual(["hello"], asyncio.run(run()))
+
+    def test_log_lines_unknown_app(self, _) -> None:
+        async def run() -> None:
+            async for _ in self.runner.log_lines(
+                "default://test_session/unknown", "trainer"
+            ):
+                pass
+
+        with self.assertRaises(UnknownAppException):
+            asyncio.run(run())
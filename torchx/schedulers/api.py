@@ -6,10 +6,25 @@
 # LICENSE file in the root directory of this source tree.
 
 import abc
+import asyncio
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Iterable, List, Optional
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
 
 from torchx.specs.api import (
     NONE,
@@ -55,6 +70,56 @@ class DescribeAppResponse:
     roles: List[Role] = field(default_factory=list)
 
 
+T = TypeVar("T")
+
+# max number of threads used by ``Scheduler.describe_many`` to describe apps
+# concurrently on schedulers that do not have a bulk describe API
+DESCRIBE_MANY_MAX_WORKERS: int = 16
+
+# max number of threads used by ``Scheduler.schedule_many`` to submit apps
+# concurrently
+SCHEDULE_MANY_MAX_WORKERS: int = 16
+
+# max number of threads used by ``Scheduler.log_iter_async`` to read the
+# (blocking) log iterators. Followed logs hold on to a thread while they wait
+# for new lines so they get their own threads rather than starving the event
+# loop's default executor that the other ``*_async`` methods run in
+LOG_ITER_ASYNC_MAX_WORKERS: int = 64
+
+# returned by ``next()`` once a log iterator is exhausted
+_END_OF_LOG = object()
+
+_log_iter_executor: Optional[ThreadPoolExecutor] = None
+_log_iter_executor_lock = threading.Lock()
+
+
+def _get_log_iter_executor() -> ThreadPoolExecutor:
+    """
+    Returns the thread pool (shared by all schedulers) that the blocking log
+    iterators are read from by ``Scheduler.log_iter_async``.
+    """
+    global _log_iter_executor
+    with _log_iter_executor_lock:
+        if _log_iter_executor is None:
+            _log_iter_executor = ThreadPoolExecutor(
+                max_workers=LOG_ITER_ASYNC_MAX_WORKERS,
+                thread_name_prefix="torchx-log-iter",
+            )
+        return _log_iter_executor
+
+
+async def run_in_thread(
+    fn: Callable[..., T], *args: Any, executor: Optional[ThreadPoolExecutor] = None
+) -> T:
+    """
+    Calls ``fn(*args)`` from ``executor`` (the running event loop's default
+    executor if not given) and returns its result without blocking the event
+    loop. Used to adapt the blocking scheduler APIs to asyncio.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(fn, *args))
+
+
 class Scheduler(abc.ABC):
     """
     An interface abstracting functionalities of a scheduler.
@@ -94,6 +159,38 @@ class Scheduler(abc.ABC):
 
         raise NotImplementedError()
 
+    def schedule_many(
+        self,
+        # pyre-fixme[24]: AppDryRunInfo was designed to work with Any request object
+        dryrun_infos: List[AppDryRunInfo],
+        max_workers: int = SCHEDULE_MANY_MAX_WORKERS,
+    ) -> List[Union[str, Exception]]:
+        """
+        Schedules several apps (e.g. the trials of a sweep) and returns their
+        app ids in the order of ``dryrun_infos``. The apps are submitted
+        independently: if an app fails to be submitted its exception is returned
+        in place of its app id and the other apps are still submitted.
+
+        The default implementation calls ``schedule`` for each app from a thread
+        pool of at most ``max_workers`` threads.
+        """
+
+        # pyre-fixme[24]: AppDryRunInfo was designed to work with Any request object
+        def schedule(dryrun_info: AppDryRunInfo) -> Union[str, Exception]:
+            try:
+                return self.schedule(dryrun_info)
+            except Exception as e:
+                return e
+
+        if len(dryrun_infos) <= 1:
+            return [schedule(dryrun_info) for dryrun_info in dryrun_infos]
+
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(dryrun_infos)),
+            thread_name_prefix=f"torchx-{self.backend}",
+        ) as executor:
+            return list(executor.map(schedule, dryrun_infos))
+
     # pyre-fixme[24]: AppDryRunInfo was designed to work with Any request object
     def submit_dryrun(self, app: AppDef, cfg: RunConfig) -> AppDryRunInfo:
         """
@@ -133,6 +230,27 @@ class Scheduler(abc.ABC):
         """
         raise NotImplementedError()
 
+    def describe_many(
+        self, app_ids: List[str]
+    ) -> Dict[str, Optional[DescribeAppResponse]]:
+        """
+        Describes the specified applications. Schedulers with an API to describe
+        several apps at once should override this method, the default
+        implementation calls ``describe`` for each app from a thread pool of
+        at most ``DESCRIBE_MANY_MAX_WORKERS`` threads.
+
+        Returns:
+            app_id to its description or ``None`` if the app does not exist
+        """
+        if len(app_ids) <= 1:
+            return {app_id: self.describe(app_id) for app_id in app_ids}
+
+        max_workers = min(DESCRIBE_MANY_MAX_WORKERS, len(app_ids))
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"torchx-{self.backend}"
+        ) as executor:
+            return dict(zip(app_ids, executor.map(self.describe, app_ids)))
+
     def exists(self, app_id: str) -> bool:
         """
         Returns:
@@ -167,6 +285,18 @@ class Scheduler(abc.ABC):
             # do nothing if the app does not exist
             return
 
+    def _wait_for_state_change(self, app_id: str, timeout: float) -> None:
+        """
+        Blocks for at most ``timeout`` seconds or until the scheduler observes
+        that the application may have changed state, whichever comes first.
+        Used by ``Runner.wait`` in between status checks.
+
+        Schedulers that are notified of state changes (rather than having to
+        poll for them) should override this method to return early. The default
+        implementation simply sleeps for ``timeout`` seconds.
+        """
+        time.sleep(timeout)
+
     def log_iter(
         self,
         app_id: str,
@@ -176,6 +306,8 @@ class Scheduler(abc.ABC):
         since: Optional[datetime] = None,
         until: Optional[datetime] = None,
         should_tail: bool = False,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
     ) -> Iterable[str]:
         """
         Returns an iterator to the log lines of the ``k``th replica of the ``role``.
@@ -227,6 +359,11 @@ class Scheduler(abc.ABC):
         7. Some schedulers may support line cursors by supporting ``__getitem__``
            (e.g. ``iter[50]`` seeks to the 50th log line).
 
+        8. ``tail_lines`` (only return the last ``tail_lines`` lines available
+           when the iterator is created) and ``limit_bytes`` (stop after about
+           ``limit_bytes`` bytes of log) bound the amount of log read. Schedulers
+           that cannot honor them (natively or by emulating them) ignore them.
+
         Returns:
             An ``Iterator`` over log lines of the specified role replica
 
@@ -237,6 +374,77 @@ class Scheduler(abc.ABC):
             f"{self.__class__.__qualname__} does not support application log iteration"
         )
 
+    # pyre-fixme[24]: AppDryRunInfo was designed to work with Any request object
+    async def schedule_async(self, dryrun_info: AppDryRunInfo) -> str:
+        """
+        asyncio version of ``schedule``. Schedulers with non-blocking (native
+        asyncio) clients should override the ``*_async`` methods, by default they
+        run their blocking counterparts in the event loop's default executor.
+        """
+        return await run_in_thread(self.schedule, dryrun_info)
+
+    async def describe_async(self, app_id: str) -> Optional[DescribeAppResponse]:
+        """
+        asyncio version of ``describe``.
+        """
+        return await run_in_thread(self.describe, app_id)
+
+    async def describe_many_async(
+        self, app_ids: List[str]
+    ) -> Dict[str, Optional[DescribeAppResponse]]:
+        """
+        asyncio version of ``describe_many``.
+        """
+        return await run_in_thread(self.describe_many, app_ids)
+
+    async def cancel_async(self, app_id: str) -> None:
+        """
+        asyncio version of ``cancel``.
+        """
+        await run_in_thread(self.cancel, app_id)
+
+    async def _wait_for_state_change_async(self, app_id: str, timeout: float) -> None:
+        """
+        asyncio version of ``_wait_for_state_change``, used by ``AsyncRunner.wait``.
+        Does not hold on to a thread while waiting, the default implementation
+        simply sleeps for ``timeout`` seconds.
+        """
+        await asyncio.sleep(timeout)
+
+    async def log_iter_async(
+        self,
+        app_id: str,
+        role_name: str,
+        k: int = 0,
+        regex: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        should_tail: bool = False,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        asyncio version of ``log_iter``. By default each line is read from the
+        (blocking) ``log_iter`` in a thread pool of at most
+        ``LOG_ITER_ASYNC_MAX_WORKERS`` threads that is dedicated to reading logs,
+        so that followed logs do not starve the other ``*_async`` methods.
+        """
+        kwargs = log_limits(tail_lines, limit_bytes)
+        executor = _get_log_iter_executor()
+        log_iter = await run_in_thread(
+            lambda: iter(
+                self.log_iter(
+                    app_id, role_name, k, regex, since, until, should_tail, **kwargs
+                )
+            ),
+            executor=executor,
+        )
+        while True:
+            line = await run_in_thread(next, log_iter, _END_OF_LOG, executor=executor)
+            if line is _END_OF_LOG:
+                return
+            yield line
+
     def _validate(self, app: AppDef, scheduler: SchedulerBackend) -> None:
         """
         Validates whether application is consistent with the scheduler.
@@ -252,6 +460,20 @@ class Scheduler(abc.ABC):
                 )
 
 
+def log_limits(tail_lines: Optional[int], limit_bytes: Optional[int]) -> Dict[str, int]:
+    """
+    Returns the ``tail_lines`` and ``limit_bytes`` keyword arguments of
+    ``Scheduler.log_iter`` that are set. They are only passed when set so that
+    schedulers that override ``log_iter`` without them keep working.
+    """
+    kwargs = {}
+    if tail_lines is not None:
+        kwargs["tail_lines"] = tail_lines
+    if limit_bytes is not None:
+        kwargs["limit_bytes"] = limit_bytes
+    return kwargs
+
+
 def filter_regex(regex: str, data: Iterable[str]) -> Iterable[str]:
     """
     filter_regex takes a string iterator and returns an iterator that only has
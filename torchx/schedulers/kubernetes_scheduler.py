@@ -5,15 +5,36 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
+import functools
+import logging
+import math
+import re
+import threading
+import time
 import warnings
+from collections import Counter
 from dataclasses import dataclass
-from datetime import datetime
-from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Iterable
+from datetime import datetime, timezone
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Tuple,
+    Union,
+)
+from uuid import uuid4
 
 import yaml
 
 if TYPE_CHECKING:
-    from kubernetes.client import ApiClient, CustomObjectsApi
+    from kubernetes.client import ApiClient, CoreV1Api, CustomObjectsApi
     from kubernetes.client.models import (  # noqa: F401 imported but unused
         V1Pod,
         V1PodSpec,
@@ -24,6 +45,7 @@ if TYPE_CHECKING:
     )
 
 from torchx.schedulers.api import (
+    SCHEDULE_MANY_MAX_WORKERS,
     AppDryRunInfo,
     DescribeAppResponse,
     Scheduler,
@@ -43,6 +65,54 @@ from torchx.specs.api import (
     runopts,
 )
 
+logger: logging.Logger = logging.getLogger(__name__)
+
+# max seconds describe waits for a newly started informer to list the jobs
+INFORMER_SYNC_TIMEOUT: float = 10.0
+
+# bytes read from the API server at a time when streaming pod logs
+LOG_CHUNK_SIZE: int = 64 * 1024
+
+# number of times the submission of a job is retried when the apiserver is
+# throttling (429) or fails (5xx), the n-th retry waits SUBMIT_BACKOFF * 2**n
+# seconds (unless the apiserver sends a Retry-After header)
+SUBMIT_RETRIES: int = 4
+SUBMIT_BACKOFF: float = 0.5
+
+# seconds to wait before following a pod log again after the connection dropped
+LOG_RECONNECT_INTERVAL: float = 1.0
+# seconds added to the since_seconds of a log request. since_seconds is relative
+# to the apiserver's clock but computed from the local clock, the slack covers
+# the skew between the two (the extra lines are filtered out by timestamp)
+LOG_CLOCK_SKEW_SLACK: int = 10
+
+# labels of the pods of a job's tasks that map the tasks back to the role and
+# replica id (task names cannot be parsed since role names may end in -<digit>)
+LABEL_ROLE_NAME: str = "torchx.pytorch.org/role-name"
+LABEL_REPLICA_ID: str = "torchx.pytorch.org/replica-id"
+# label volcano sets on the pods of a job
+LABEL_VOLCANO_JOB_NAME: str = "volcano.sh/job-name"
+
+# annotation of a job with the id of the submission that created it, tells
+# apart a job created by a previous attempt of the submission from another job
+# of the same name when a retry conflicts
+ANNOTATION_SUBMISSION_ID: str = "torchx.pytorch.org/submission-id"
+
+# max length of a job name (the jobs' names are used as label values) and the
+# length of the random suffix appended to the generateName prefix
+MAX_JOB_NAME_LENGTH: int = 63
+JOB_NAME_SUFFIX_LENGTH: int = 8
+
+# max number of jobs whose tasks are cached (to find the pods of the replicas)
+JOB_TASKS_CACHE_SIZE: int = 1024
+# max number of compact tasks whose replica states are cached
+COMPACT_STATES_CACHE_SIZE: int = 1024
+
+# the timestamp the apiserver prefixes each log line with when timestamps=True
+LOG_TIMESTAMP: Pattern[str] = re.compile(
+    r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(\.\d+)?(Z|[+-]\d\d:\d\d) "
+)
+
 RETRY_POLICIES: Mapping[str, Iterable[Mapping[str, str]]] = {
     RetryPolicy.REPLICA: [],
     RetryPolicy.APPLICATION: [
@@ -103,15 +173,83 @@ TASK_STATE: Dict[str, ReplicaState] = {
 }
 
 
-def sanitize_for_serialization(obj: object) -> object:
+@functools.lru_cache(maxsize=None)
+def _serialization_client() -> "ApiClient":
     from kubernetes import client
 
-    api = client.ApiClient()
-    return api.sanitize_for_serialization(obj)
+    # only used to serialize objects, so it needs no kube config
+    return client.ApiClient()
+
+
+def sanitize_for_serialization(obj: object) -> object:
+    return _serialization_client().sanitize_for_serialization(obj)
+
+
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Splits a stream of utf-8 encoded chunks into lines (without the trailing
+    newline). Only the current partial line is held in memory.
+    """
+    partial = b""
+    for chunk in chunks:
+        lines = (partial + chunk).split(b"\n")
+        partial = lines.pop()
+        for line in lines:
+            yield line.decode("utf-8", errors="replace")
+    if partial:
+        yield partial.decode("utf-8", errors="replace")
+
+
+def _split_log_timestamp(line: str) -> Tuple[Optional[datetime], str]:
+    """
+    Splits the log line into the (RFC3339) timestamp the apiserver prefixes
+    log lines with when ``timestamps=True`` (truncated to microseconds, None if
+    there is none) and the line as logged by the pod.
+    """
+    m = LOG_TIMESTAMP.match(line)
+    if not m:
+        return None, line
+    seconds, fraction, tz = m.groups()
+    ts = datetime.strptime(
+        seconds + ("+00:00" if tz == "Z" else tz), "%Y-%m-%dT%H:%M:%S%z"
+    )
+    ts = ts.replace(microsecond=int(fraction[1:7].ljust(6, "0")) if fraction else 0)
+    return ts, line[m.end() :]
+
+
+def _to_utc(dt: datetime) -> datetime:
+    # naive datetimes are in local time
+    return dt.astimezone(timezone.utc)
+
+
+def _seconds_since(dt: datetime) -> int:
+    """
+    Returns the since_seconds of a log request for the lines logged at or after
+    ``dt``. Since the local clock may be behind (or ahead of) the apiserver's,
+    this includes ``LOG_CLOCK_SKEW_SLACK`` more seconds of log, the caller
+    filters the lines by their (apiserver) timestamps.
+    """
+    # the apiserver requires a positive number of (whole) seconds
+    delta = datetime.now(timezone.utc) - _to_utc(dt)
+    return max(1, math.ceil(delta.total_seconds()) + LOG_CLOCK_SKEW_SLACK)
+
+
+def _stream_lines(resp: Any) -> Iterator[str]:
+    """
+    Yields the lines of a ``_preload_content=False`` (urllib3) response as they
+    are received and releases the connection back to the pool when done.
+    """
+    try:
+        yield from _iter_lines(resp.stream(LOG_CHUNK_SIZE))
+    finally:
+        resp.release_conn()
 
 
-def role_to_pod(name: str, role: Role) -> "V1Pod":
+def role_to_pod(
+    name: str, role: Role, labels: Optional[Dict[str, str]] = None
+) -> "V1Pod":
     from kubernetes.client.models import (  # noqa: F811 redefinition of unused
+        V1ObjectMeta,
         V1Pod,
         V1PodSpec,
         V1Container,
@@ -158,6 +296,7 @@ def role_to_pod(name: str, role: Role) -> "V1Pod":
         ],
     )
     return V1Pod(
+        metadata=V1ObjectMeta(labels=labels) if labels else None,
         spec=V1PodSpec(
             containers=[container],
             restart_policy="Never",
@@ -165,7 +304,22 @@ def role_to_pod(name: str, role: Role) -> "V1Pod":
     )
 
 
-def app_to_resource(app: AppDef, queue: str) -> Dict[str, object]:
+def _depends_on_replica_id(role: Role) -> bool:
+    """
+    Returns whether the role's args or env use the ``replica_id`` macro.
+    """
+    roles = [
+        macros.Values(img_root="", app_id=macros.app_id, replica_id=replica_id).apply(
+            role
+        )
+        for replica_id in ("0", "1")
+    ]
+    return roles[0].args != roles[1].args or roles[0].env != roles[1].env
+
+
+def app_to_resource(
+    app: AppDef, queue: str, compact: bool = False
+) -> Dict[str, object]:
     """
     app_to_resource creates a volcano job kubernetes resource definition from
     the provided AppDef. The resource definition can be used to launch the
@@ -175,12 +329,42 @@ def app_to_resource(app: AppDef, queue: str) -> Dict[str, object]:
     volcano `replicas` field since macros change the arguments on a per
     replica basis.
 
+    If ``compact`` is set, roles whose args and env do not use the
+    ``replica_id`` macro are generated as a single task (named after the role)
+    with the volcano `replicas` field set to the number of replicas instead. The
+    size of the resource then does not grow with the number of replicas. The
+    replicas can tell themselves apart by the ``VK_TASK_INDEX`` env var set by
+    volcano's env plugin.
+
+    The pods are labeled with the role name and (unless compact) the replica id
+    so that the tasks can be mapped back to the replicas (see ``_job_tasks``).
+
     Volcano has two levels of retries: one at the task level and one at the
     job level. When using the APPLICATION retry policy, the job level retry
     count is set to the minimum of the max_retries of the roles.
     """
     tasks = []
     for i, role in enumerate(app.roles):
+        if compact and not _depends_on_replica_id(role):
+            values = macros.Values(
+                img_root="",
+                app_id=macros.app_id,
+                replica_id=macros.replica_id,
+            )
+            pod = role_to_pod(
+                role.name, values.apply(role), {LABEL_ROLE_NAME: role.name}
+            )
+            tasks.append(
+                {
+                    "replicas": role.num_replicas,
+                    "name": role.name,
+                    "template": pod,
+                    "maxRetry": role.max_retries,
+                    "policies": RETRY_POLICIES[role.retry_policy],
+                }
+            )
+            continue
+
         for replica_id in range(role.num_replicas):
             values = macros.Values(
                 img_root="",
@@ -189,7 +373,11 @@ def app_to_resource(app: AppDef, queue: str) -> Dict[str, object]:
             )
             name = f"{role.name}-{replica_id}"
             replica_role = values.apply(role)
-            pod = role_to_pod(name, replica_role)
+            pod = role_to_pod(
+                name,
+                replica_role,
+                {LABEL_ROLE_NAME: role.name, LABEL_REPLICA_ID: str(replica_id)},
+            )
             tasks.append(
                 {
                     "replicas": 1,
@@ -219,6 +407,218 @@ def app_to_resource(app: AppDef, queue: str) -> Dict[str, object]:
     return resource
 
 
+def _parse_task_name(name: str) -> Tuple[str, Optional[int]]:
+    # tasks of jobs submitted without the role and replica id labels are named
+    # <role>-<replica id> or <role> (compact)
+    role, _, idx = name.rpartition("-")
+    if role and idx.isdigit():
+        return role, int(idx)
+    return name, None
+
+
+def _job_tasks(job: Dict[str, Any]) -> Dict[str, Tuple[str, Optional[int]]]:
+    """
+    Returns the role name and replica id of the tasks of the volcano job keyed
+    by task name. The replica id is ``None`` for compact tasks that run all the
+    replicas of the role (see ``app_to_resource``).
+    """
+    tasks = {}
+    for task in (job.get("spec") or {}).get("tasks", []):
+        name = task["name"]
+        metadata = (task.get("template") or {}).get("metadata") or {}
+        labels = metadata.get("labels") or {}
+        role = labels.get(LABEL_ROLE_NAME)
+        if role is None:
+            tasks[name] = _parse_task_name(name)
+        else:
+            replica_id = labels.get(LABEL_REPLICA_ID)
+            tasks[name] = (role, int(replica_id) if replica_id is not None else None)
+    return tasks
+
+
+class _VolcanoJobInformer:
+    """
+    Keeps an in-memory cache of the Volcano jobs in a namespace, keyed by job
+    name, up to date with a single list+watch (much like client-go's informers)
+    from a daemon thread. Jobs can then be described (and waited on) from memory
+    rather than with a request per job per poll.
+
+    The jobs are listed once and the watch is resumed from the resourceVersion
+    of the last event seen. The jobs are listed again if the watch fails (e.g.
+    the resourceVersion is too old).
+
+    ``api`` is a ``CustomObjectsApi`` and ``watch_factory`` creates a
+    ``kubernetes.watch.Watch``. Anything with the same ``list_namespaced_custom_object``
+    and ``stream``/``stop`` methods (e.g. a fake API server) works too.
+    """
+
+    # seconds after which the apiserver ends a watch, it is then resumed
+    WATCH_TIMEOUT: int = 300
+    # seconds to back off for before listing the jobs again after an error
+    RETRY_INTERVAL: float = 1.0
+
+    def __init__(
+        self,
+        api: Any,  # pyre-ignore[2]: CustomObjectsApi or a stand-in
+        namespace: str,
+        watch_factory: Callable[[], Any],  # pyre-ignore[2]
+    ) -> None:
+        self._api = api
+        self._namespace = namespace
+        self._watch_factory = watch_factory
+        # guards the fields below and is notified on every change
+        self._changed = threading.Condition()
+        # job name -> volcano job
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # resourceVersion of the last list or watch event seen
+        self._resource_version: Optional[str] = None
+        self._synced = False
+        # set while the jobs cannot be listed (cleared by the next list)
+        self._failed = False
+        # whether a caller already waited for the first list
+        self._sync_waited = False
+        self._stopped = False
+        self._watch: Optional[Any] = None  # pyre-ignore[4]
+        self._thread = threading.Thread(
+            target=self._run, name=f"torchx-k8s-informer-{namespace}", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._changed:
+            self._stopped = True
+            watch = self._watch
+            self._changed.notify_all()
+        if watch:
+            watch.stop()
+
+    @property
+    def synced(self) -> bool:
+        """
+        Whether the cache is populated and the jobs could be listed the last
+        time they were. Does not block.
+        """
+        with self._changed:
+            return self._synced and not self._failed
+
+    def wait_for_sync(self, timeout: float) -> bool:
+        """
+        Waits for the jobs to be listed for at most ``timeout`` seconds or until
+        listing them fails. Only the first call blocks, later calls return
+        ``synced`` right away so that callers fall back to a GET immediately
+        while the informer cannot list the jobs.
+
+        Returns:
+            ``True`` if the cache has been populated, ``False`` otherwise
+        """
+        with self._changed:
+            if not self._sync_waited:
+                self._sync_waited = True
+                self._changed.wait_for(lambda: self._synced or self._failed, timeout)
+            return self._synced and not self._failed
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached job or ``None`` if it is not (yet) in the cache.
+        """
+        with self._changed:
+            return self._jobs.get(name)
+
+    def wait_for_change(self, name: str, timeout: float) -> None:
+        """
+        Blocks until the job changes (or is deleted) or ``timeout`` seconds elapse.
+        """
+
+        def resource_version() -> Optional[str]:
+            job = self._jobs.get(name)
+            return job["metadata"].get("resourceVersion") if job else None
+
+        with self._changed:
+            version = resource_version()
+            self._changed.wait_for(
+                lambda: self._stopped or resource_version() != version, timeout
+            )
+
+    def _list(self) -> None:
+        resp = self._api.list_namespaced_custom_object(
+            group="batch.volcano.sh",
+            version="v1alpha1",
+            namespace=self._namespace,
+            plural="jobs",
+        )
+        jobs = {job["metadata"]["name"]: job for job in resp.get("items", [])}
+        with self._changed:
+            self._jobs = jobs
+            self._resource_version = resp["metadata"]["resourceVersion"]
+            self._synced = True
+            self._failed = False
+            self._changed.notify_all()
+
+    def _watch_events(self) -> bool:
+        """
+        Applies the watch events to the cache until the watch ends.
+
+        Returns:
+            ``False`` if the jobs need to be listed again, ``True`` otherwise
+        """
+        watch = self._watch_factory()
+        with self._changed:
+            if self._stopped:
+                return True
+            self._watch = watch
+
+        for event in watch.stream(
+            self._api.list_namespaced_custom_object,
+            group="batch.volcano.sh",
+            version="v1alpha1",
+            namespace=self._namespace,
+            plural="jobs",
+            resource_version=self._resource_version,
+            timeout_seconds=self.WATCH_TIMEOUT,
+            allow_watch_bookmarks=True,
+        ):
+            event_type = event["type"]
+            obj = event["object"]
+            if event_type == "ERROR":
+                # e.g. 410 Gone, the resourceVersion is too old to resume from
+                logger.info(f"watch of volcano jobs failed: {obj}, re-listing")
+                return False
+
+            metadata = obj["metadata"]
+            with self._changed:
+                if event_type == "DELETED":
+                    self._jobs.pop(metadata["name"], None)
+                elif event_type in ("ADDED", "MODIFIED"):
+                    self._jobs[metadata["name"]] = obj
+                self._resource_version = metadata["resourceVersion"]
+                self._changed.notify_all()
+        return True
+
+    def _run(self) -> None:
+        relist = True
+        while not self._stopped:
+            try:
+                if relist:
+                    self._list()
+                relist = not self._watch_events()
+            except Exception as e:
+                if self._stopped:
+                    return
+                logger.warning(
+                    f"failed to list/watch volcano jobs in namespace: {self._namespace}"
+                    f" ({e}), re-listing in {self.RETRY_INTERVAL}s"
+                )
+                if relist:
+                    # the jobs could not be listed, the cache cannot be trusted
+                    with self._changed:
+                        self._failed = True
+                        self._changed.notify_all()
+                relist = True
+                time.sleep(self.RETRY_INTERVAL)
+
+
 @dataclass
 class KubernetesJob:
     resource: Dict[str, object]
@@ -250,32 +650,100 @@ class KubernetesScheduler(Scheduler):
         kubernetes://torchx_user/1234
         $ torchx status kubernetes://torchx_user/1234
         ...
+
+    The scheduler creates a single ``ApiClient`` (loading the kube config once)
+    whose connections are reused by all requests, ``connection_pool_maxsize``
+    sets the max number of connections it keeps to the apiserver (which bounds
+    the number of concurrent requests, e.g. from ``describe_many``).
+
+    With ``use_informer=True`` the jobs of each namespace are listed and watched
+    once (see ``_VolcanoJobInformer``) so that ``describe`` is served from memory
+    and ``Runner.wait`` wakes up on job changes rather than polling the apiserver
+    for each job.
     """
 
-    def __init__(self, session_name: str, client: Optional["ApiClient"] = None) -> None:
+    def __init__(
+        self,
+        session_name: str,
+        client: Optional["ApiClient"] = None,
+        use_informer: bool = False,
+        connection_pool_maxsize: Optional[int] = None,
+    ) -> None:
         super().__init__("kubernetes", session_name)
 
         self._client = client
+        self._connection_pool_maxsize = connection_pool_maxsize
+        # guards the lazy creation of the client and apis below
+        self._client_lock = threading.Lock()
+        self._custom_objects: Optional["CustomObjectsApi"] = None
+        self._core_v1: Optional["CoreV1Api"] = None
+        self._use_informer = use_informer
+        # namespace -> informer (started on the first describe in the namespace)
+        self._informers: Dict[str, _VolcanoJobInformer] = {}
+        self._informers_lock = threading.Lock()
+        # app_id -> tasks of the job (see _job_tasks), the tasks never change
+        self._job_tasks: Dict[str, Dict[str, Tuple[str, Optional[int]]]] = {}
+        # (app_id, task) -> phase counts of the compact task and the
+        # (replica id, phase) of its pods when the phases were counted
+        self._compact_states: Dict[
+            Tuple[str, str], Tuple[Dict[str, int], List[Tuple[int, str]]]
+        ] = {}
 
     def _api_client(self) -> "ApiClient":
         from kubernetes import client, config
 
-        c = self._client
-        if c is None:
-            configuration = client.Configuration()
-            try:
-                config.load_kube_config(client_configuration=configuration)
-            except config.ConfigException as e:
-                warnings.warn(f"failed to load kube config: {e}")
+        with self._client_lock:
+            c = self._client
+            if c is None:
+                configuration = client.Configuration()
+                try:
+                    config.load_kube_config(client_configuration=configuration)
+                except config.ConfigException as e:
+                    warnings.warn(f"failed to load kube config: {e}")
+                if self._connection_pool_maxsize:
+                    configuration.connection_pool_maxsize = (
+                        self._connection_pool_maxsize
+                    )
 
-            c = self._client = client.ApiClient(configuration)
+                c = self._client = client.ApiClient(configuration)
 
-        return c
+            return c
 
     def _custom_objects_api(self) -> "CustomObjectsApi":
         from kubernetes import client
 
-        return client.CustomObjectsApi(self._api_client())
+        api = self._custom_objects
+        if api is None:
+            api = self._custom_objects = client.CustomObjectsApi(self._api_client())
+        return api
+
+    def _core_v1_api(self) -> "CoreV1Api":
+        from kubernetes import client
+
+        api = self._core_v1
+        if api is None:
+            api = self._core_v1 = client.CoreV1Api(self._api_client())
+        return api
+
+    def _informer(self, namespace: str) -> Optional[_VolcanoJobInformer]:
+        """
+        Returns the (started) informer of the namespace or ``None`` if informers
+        are not used.
+        """
+        if not self._use_informer:
+            return None
+
+        with self._informers_lock:
+            informer = self._informers.get(namespace)
+            if not informer:
+                from kubernetes import watch
+
+                informer = _VolcanoJobInformer(
+                    self._custom_objects_api(), namespace, watch.Watch
+                )
+                informer.start()
+                self._informers[namespace] = informer
+            return informer
 
     def schedule(self, dryrun_info: AppDryRunInfo[KubernetesJob]) -> str:
         cfg = dryrun_info._cfg
@@ -283,14 +751,84 @@ class KubernetesScheduler(Scheduler):
         namespace = cfg.get("namespace") or "default"
         resource = dryrun_info.request.resource
 
-        resp = self._custom_objects_api().create_namespaced_custom_object(
+        submission_id = uuid4().hex
+        metadata = dict(resource["metadata"])
+        metadata["annotations"] = {
+            **metadata.get("annotations", {}),
+            ANNOTATION_SUBMISSION_ID: submission_id,
+        }
+        generate_name = metadata.pop("generateName", None)
+        if generate_name is not None:
+            # name the job here rather than on the apiserver so that retrying a
+            # submission that did go through fails with a conflict instead of
+            # creating the job twice, the prefix is truncated like the apiserver
+            # truncates generateName so that the name is not too long
+            prefix = generate_name[: MAX_JOB_NAME_LENGTH - JOB_NAME_SUFFIX_LENGTH]
+            metadata["name"] = f"{prefix}{submission_id[:JOB_NAME_SUFFIX_LENGTH]}"
+        resource = {**resource, "metadata": metadata}
+        name = metadata["name"]
+
+        from kubernetes.client.rest import ApiException
+
+        for attempt in range(SUBMIT_RETRIES + 1):
+            try:
+                resp = self._custom_objects_api().create_namespaced_custom_object(
+                    group="batch.volcano.sh",
+                    version="v1alpha1",
+                    namespace=namespace,
+                    plural="jobs",
+                    body=resource,
+                )
+                name = resp["metadata"]["name"]
+                break
+            except ApiException as e:
+                if (
+                    attempt > 0
+                    and e.status == 409
+                    and self._submitted_by(namespace, name, submission_id)
+                ):
+                    # a previous attempt created the job
+                    break
+                status = e.status or 0
+                if attempt == SUBMIT_RETRIES or not (status == 429 or status >= 500):
+                    raise
+                retry_after = (e.headers or {}).get("Retry-After")
+                delay = (
+                    float(retry_after)
+                    if retry_after and retry_after.isdigit()
+                    else SUBMIT_BACKOFF * 2**attempt
+                )
+                logger.warning(
+                    f"failed to submit job {namespace}:{name} ({e.status} {e.reason}),"
+                    f" retrying in {delay}s"
+                )
+                time.sleep(delay)
+        return f"{namespace}:{name}"
+
+    def _submitted_by(self, namespace: str, name: str, submission_id: str) -> bool:
+        """
+        Returns whether the job was created by the submission (rather than being
+        another job with the same name).
+        """
+        job = self._custom_objects_api().get_namespaced_custom_object(
             group="batch.volcano.sh",
             version="v1alpha1",
             namespace=namespace,
             plural="jobs",
-            body=resource,
+            name=name,
         )
-        return f'{namespace}:{resp["metadata"]["name"]}'
+        annotations = job["metadata"].get("annotations") or {}
+        return annotations.get(ANNOTATION_SUBMISSION_ID) == submission_id
+
+    def schedule_many(
+        self,
+        dryrun_infos: List[AppDryRunInfo[KubernetesJob]],
+        max_workers: int = SCHEDULE_MANY_MAX_WORKERS,
+    ) -> List[Union[str, Exception]]:
+        # more concurrent submissions than pooled connections would open (and
+        # then discard) a new connection per submission
+        pool_maxsize = self._api_client().configuration.connection_pool_maxsize
+        return super().schedule_many(dryrun_infos, min(max_workers, pool_maxsize))
 
     def _submit_dryrun(
         self, app: AppDef, cfg: RunConfig
@@ -298,7 +836,7 @@ class KubernetesScheduler(Scheduler):
         queue = cfg.get("queue")
         if not isinstance(queue, str):
             raise TypeError(f"config value 'queue' must be a string, got {queue}")
-        resource = app_to_resource(app, queue)
+        resource = app_to_resource(app, queue, compact=bool(cfg.get("compact_tasks")))
         req = KubernetesJob(resource=resource)
         info = AppDryRunInfo(req, repr)
         info._app = app
@@ -330,12 +868,25 @@ class KubernetesScheduler(Scheduler):
         opts.add(
             "queue", type_=str, help="Volcano queue to schedule job in", required=True
         )
+        opts.add(
+            "compact_tasks",
+            type_=bool,
+            default=False,
+            help="schedule the replicas of roles that do not use the replica_id macro"
+            " as a single Volcano task (with `replicas: N`) rather than one task per"
+            " replica, replicas get their index from the VK_TASK_INDEX env var",
+        )
         return opts
 
     def describe(self, app_id: str) -> Optional[DescribeAppResponse]:
         namespace, name = app_id.split(":")
-        roles = {}
-        roles_statuses = {}
+        informer = self._informer(namespace)
+        if informer and informer.wait_for_sync(INFORMER_SYNC_TIMEOUT):
+            job = informer.get(name)
+            # a job that was just created may not have been watched yet
+            if job:
+                return self._to_describe_response(app_id, job)
+
         resp = self._custom_objects_api().get_namespaced_custom_object_status(
             group="batch.volcano.sh",
             version="v1alpha1",
@@ -343,6 +894,13 @@ class KubernetesScheduler(Scheduler):
             plural="jobs",
             name=name,
         )
+        return self._to_describe_response(app_id, resp)
+
+    def _to_describe_response(
+        self, app_id: str, resp: Dict[str, Any]
+    ) -> DescribeAppResponse:
+        roles = {}
+        roles_statuses = {}
         status = resp.get("status")
         if status:
             state_str = status["state"]["phase"]
@@ -351,19 +909,33 @@ class KubernetesScheduler(Scheduler):
             TASK_STATUS_COUNT = "taskStatusCount"
 
             if TASK_STATUS_COUNT in status:
+                tasks = _job_tasks(resp)
                 for name, status in status[TASK_STATUS_COUNT].items():
-                    role, idx = name.split("-")
-
-                    state_str = next(iter(status["phase"].keys()))
-                    state = TASK_STATE[state_str]
+                    role, idx = tasks.get(name) or _parse_task_name(name)
 
                     if role not in roles:
                         roles[role] = Role(name=role, num_replicas=0, image="")
                         roles_statuses[role] = RoleStatus(role, [])
-                    roles[role].num_replicas += 1
-                    roles_statuses[role].replicas.append(
-                        ReplicaStatus(id=int(idx), role=role, state=state, hostname="")
-                    )
+
+                    if idx is not None:
+                        replica_states = [(idx, next(iter(status["phase"])))]
+                    else:
+                        # a compact task, its replicas are told apart by the
+                        # index volcano appends to their pod names
+                        replica_states = self._compact_replica_states(
+                            app_id, name, status["phase"]
+                        )
+
+                    for replica_id, state_str in replica_states:
+                        roles[role].num_replicas += 1
+                        roles_statuses[role].replicas.append(
+                            ReplicaStatus(
+                                id=replica_id,
+                                role=role,
+                                state=TASK_STATE.get(state_str, ReplicaState.UNKNOWN),
+                                hostname="",
+                            )
+                        )
         else:
             app_state = AppState.UNKNOWN
         return DescribeAppResponse(
@@ -373,6 +945,101 @@ class KubernetesScheduler(Scheduler):
             state=app_state,
         )
 
+    def _compact_replica_states(
+        self, app_id: str, task: str, phases: Dict[str, int]
+    ) -> List[Tuple[int, str]]:
+        """
+        Returns the (replica id, phase) of the pods of the compact ``task``
+        of the job. Volcano names them ``<job>-<task>-<task index>``.
+
+        ``phases`` are the phase counts of the task in the job's status. The
+        pods are only listed again once they change so that describing (or
+        waiting on) a job whose pods did not change phase is served from the
+        job alone (e.g. from the informer).
+        """
+        key = (app_id, task)
+        cached = self._compact_states.get(key)
+        if cached and cached[0] == phases:
+            return cached[1]
+
+        namespace, name = app_id.split(":")
+        pods = self._core_v1_api().list_namespaced_pod(
+            namespace=namespace, label_selector=f"{LABEL_VOLCANO_JOB_NAME}={name}"
+        )
+        prefix = f"{name}-{task}-"
+        replica_states = []
+        for pod in pods.items:
+            pod_name = pod.metadata.name
+            idx = pod_name[len(prefix) :]
+            if pod_name.startswith(prefix) and idx.isdigit():
+                replica_states.append((int(idx), pod.status.phase))
+        replica_states.sort()
+
+        # the pods may not agree with the (older) job status yet, list them
+        # again next time rather than caching states the counts do not match
+        if Counter(phase for _, phase in replica_states) == Counter(phases):
+            if key not in self._compact_states and (
+                len(self._compact_states) >= COMPACT_STATES_CACHE_SIZE
+            ):
+                # evicts the oldest task
+                self._compact_states.pop(next(iter(self._compact_states)), None)
+            self._compact_states[key] = (dict(phases), replica_states)
+        return replica_states
+
+    def _wait_for_state_change(self, app_id: str, timeout: float) -> None:
+        namespace, name = app_id.split(":")
+        informer = self._informer(namespace)
+        if informer:
+            informer.wait_for_change(name, timeout)
+        else:
+            super()._wait_for_state_change(app_id, timeout)
+
+    def __del__(self) -> None:
+        for informer in self._informers.values():
+            informer.stop()
+
+    def _tasks(self, namespace: str, name: str) -> Dict[str, Tuple[str, Optional[int]]]:
+        """
+        Returns the tasks of the job (see ``_job_tasks``), the job is only
+        fetched the first time since its tasks never change.
+        """
+        app_id = f"{namespace}:{name}"
+        tasks = self._job_tasks.get(app_id)
+        if tasks is not None:
+            return tasks
+
+        informer = self._informer(namespace)
+        job = informer.get(name) if informer else None
+        if not job:
+            job = self._custom_objects_api().get_namespaced_custom_object(
+                group="batch.volcano.sh",
+                version="v1alpha1",
+                namespace=namespace,
+                plural="jobs",
+                name=name,
+            )
+        tasks = _job_tasks(job)
+        if len(self._job_tasks) >= JOB_TASKS_CACHE_SIZE:
+            # evicts the oldest job
+            self._job_tasks.pop(next(iter(self._job_tasks)), None)
+        self._job_tasks[app_id] = tasks
+        return tasks
+
+    def _pod_name(self, namespace: str, name: str, role_name: str, k: int) -> str:
+        """
+        Returns the name of the pod of the ``k``-th replica of the role. Volcano
+        names pods ``<job>-<task>-<task index>`` so it depends on whether the
+        role's replicas are one task each or a single compact task.
+        """
+        for task, (role, replica_id) in self._tasks(namespace, name).items():
+            if role != role_name:
+                continue
+            if replica_id is None:
+                return f"{name}-{task}-{k}"
+            if replica_id == k:
+                return f"{name}-{task}-0"
+        return f"{name}-{role_name}-{k}-0"
+
     def log_iter(
         self,
         app_id: str,
@@ -382,14 +1049,24 @@ class KubernetesScheduler(Scheduler):
         since: Optional[datetime] = None,
         until: Optional[datetime] = None,
         should_tail: bool = False,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
     ) -> Iterable[str]:
-        assert until is None, "kubernetes API doesn't support until"
-
-        from kubernetes import client, watch
+        """
+        Returns the log lines of the pod. The lines are requested with the
+        timestamps of the apiserver, ``since`` and ``until`` are matched against
+        these timestamps rather than the local clock (the timestamps are
+        stripped from the returned lines). ``tail_lines`` and
+        ``limit_bytes`` are passed to the apiserver to only fetch the last lines
+        (or the first bytes) of the log.
 
+        When tailing, the log is followed until the pod terminates. If the
+        connection drops it is re-established from the last seen timestamp
+        without repeating lines.
+        """
         namespace, name = app_id.split(":")
 
-        pod_name = f"{name}-{role_name}-{k}-0"
+        pod_name = self._pod_name(namespace, name, role_name, k)
 
         args: Dict[str, object] = {
             "name": pod_name,
@@ -397,23 +1074,98 @@ class KubernetesScheduler(Scheduler):
             "timestamps": True,
         }
         if since is not None:
-            args["since_seconds"] = (datetime.now() - since).total_seconds()
-
-        core_api = client.CoreV1Api(self._api_client())
-        if should_tail:
-            w = watch.Watch()
-            iterator = w.stream(core_api.read_namespaced_pod_log, **args)
-        else:
-            resp = core_api.read_namespaced_pod_log(**args)
-            iterator = resp.strip().split("\n")
+            args["since_seconds"] = _seconds_since(since)
+        if tail_lines is not None:
+            args["tail_lines"] = tail_lines
+        if limit_bytes is not None:
+            args["limit_bytes"] = limit_bytes
 
+        iterator = self._pod_log_lines(args, since, until, should_tail, limit_bytes)
         if regex:
             return filter_regex(regex, iterator)
         else:
             return iterator
 
+    def _pod_log_lines(
+        self,
+        args: Dict[str, object],
+        since: Optional[datetime],
+        until: Optional[datetime],
+        should_tail: bool,
+        limit_bytes: Optional[int],
+    ) -> Iterator[str]:
+        from urllib3.exceptions import HTTPError
+
+        core_api = self._core_v1_api()
+        since = _to_utc(since) if since is not None else None
+        until = _to_utc(until) if until is not None else None
+        if should_tail:
+            args["follow"] = True
+        num_bytes = 0
+        # timestamp of the last line read and the number of lines read with
+        # that timestamp, used to skip the lines that were already read when
+        # the log is followed again after the connection dropped
+        last_ts = None
+        num_at_last_ts = 0
+
+        while True:
+            resp = core_api.read_namespaced_pod_log(**args, _preload_content=False)
+            resume_ts, skip = last_ts, num_at_last_ts
+            lines = _stream_lines(resp)
+            try:
+                for line in lines:
+                    ts, payload = _split_log_timestamp(line)
+                    if ts is not None:
+                        if resume_ts is not None:
+                            if ts < resume_ts:
+                                continue
+                            if ts == resume_ts and skip > 0:
+                                skip -= 1
+                                continue
+                            resume_ts = None
+                        if until is not None and ts > until:
+                            return
+                        if ts == last_ts:
+                            num_at_last_ts += 1
+                        else:
+                            last_ts, num_at_last_ts = ts, 1
+                    num_bytes += len(line.encode("utf-8")) + 1
+                    if since is not None and ts is not None and ts < since:
+                        continue
+                    yield payload
+            except HTTPError as e:
+                logger.info(f"log stream of pod {args['name']} dropped: {e}")
+            finally:
+                lines.close()
+
+            if not should_tail or self._pod_terminated(args):
+                return
+            if limit_bytes is not None:
+                if num_bytes >= limit_bytes:
+                    return
+                args["limit_bytes"] = limit_bytes - num_bytes
+            if last_ts is not None:
+                args.pop("tail_lines", None)
+                args["since_seconds"] = _seconds_since(last_ts)
+            time.sleep(LOG_RECONNECT_INTERVAL)
+
+    def _pod_terminated(self, args: Dict[str, object]) -> bool:
+        from kubernetes.client.rest import ApiException
+
+        try:
+            pod = self._core_v1_api().read_namespaced_pod(
+                name=args["name"], namespace=args["namespace"]
+            )
+        except ApiException as e:
+            if e.status == 404:
+                return True
+            raise
+        return pod.status.phase in ("Succeeded", "Failed")
+
 
 def create_scheduler(session_name: str, **kwargs: Any) -> KubernetesScheduler:
     return KubernetesScheduler(
         session_name=session_name,
+        use_informer=kwargs.get("use_informer", False),
+        connection_pool_maxsize=kwargs.get("connection_pool_maxsize"),
     )
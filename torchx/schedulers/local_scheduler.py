@@ -6,24 +6,41 @@
 # LICENSE file in the root directory of this source tree.
 
 import abc
+import asyncio
 import ctypes
 import json
 import logging
 import os
 import pprint
-import re
+import selectors
 import signal
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
 from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional, Pattern, TextIO, Tuple
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
 from uuid import uuid4
 
+from pyre_extensions import none_throws
 from torchx.schedulers.api import AppDryRunInfo, DescribeAppResponse, Scheduler
+from torchx.schedulers.log_iterator import FileWatcher, LogIterator, LogTimestamps
 from torchx.specs.api import (
     NONE,
     AppDef,
@@ -46,6 +63,9 @@ def make_unique(app_name: str) -> str:
 
 NA: str = "<N/A>"
 
+# max number of threads used to launch the replicas of an app concurrently
+MAX_LAUNCH_WORKERS: int = 32
+
 
 class ImageProvider(abc.ABC):
     """
@@ -207,14 +227,86 @@ class _LocalAppDef:
         self.state: AppState = AppState.PENDING
         # time (in seconds since epoch) when the last set_state method() was called
         self.last_updated: float = -1
+        # time (in seconds) it took to launch all the replicas of the app
+        self.launch_latency: float = -1
+        # guards state transitions and is notified on each one
+        self._state_changed = threading.Condition()
+        # called once the app is finished
+        self._done_callbacks: List[Callable[[], None]] = []
 
     def add_replica(self, role_name: str, replica: _LocalReplica) -> None:
         procs = self.role_replicas.setdefault(role_name, [])
         procs.append(replica)
 
     def set_state(self, state: AppState) -> None:
-        self.last_updated = time.time()
-        self.state = state
+        with self._state_changed:
+            self.last_updated = time.time()
+            self.state = state
+            self._state_changed.notify_all()
+
+    def get_state(self) -> AppState:
+        """
+        Returns the current state of the app. Unlike reading ``state`` directly,
+        blocks while the app is being finished so that a terminal state is only
+        observed once the app has been closed.
+        """
+        with self._state_changed:
+            return self.state
+
+    def finish(
+        self,
+        state: AppState,
+        on_finish: Optional[Callable[["_LocalAppDef"], None]] = None,
+    ) -> bool:
+        """
+        Transitions the app to the terminal ``state`` and closes it, unless the
+        app has already reached a terminal state. ``on_finish(app)`` is called
+        once the app is closed but before the threads waiting for the app (see
+        ``wait``) wake up, so that they observe its effects.
+
+        Returns:
+            ``True`` if this call finished the app, ``False`` otherwise
+        """
+        with self._state_changed:
+            if is_terminal(self.state):
+                return False
+            self.set_state(state)
+            self.close()
+            if on_finish:
+                # waiters only wake up once the lock is released
+                on_finish(self)
+            callbacks, self._done_callbacks = self._done_callbacks, []
+        for fn in callbacks:
+            fn()
+        return True
+
+    def add_done_callback(self, fn: Callable[[], None]) -> None:
+        """
+        Calls ``fn()`` (from the thread that finishes the app) once the app is
+        finished, or right away if it already is.
+        """
+        with self._state_changed:
+            if not is_terminal(self.state):
+                self._done_callbacks.append(fn)
+                return
+        fn()
+
+    def remove_done_callback(self, fn: Callable[[], None]) -> None:
+        with self._state_changed:
+            if fn in self._done_callbacks:
+                self._done_callbacks.remove(fn)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the app reaches a terminal state or ``timeout`` seconds elapse.
+
+        Returns:
+            ``True`` if the app is in a terminal state, ``False`` on timeout
+        """
+        with self._state_changed:
+            return self._state_changed.wait_for(
+                lambda: is_terminal(self.state), timeout
+            )
 
     def terminate(self) -> None:
         """
@@ -227,6 +319,18 @@ class _LocalAppDef:
             for r in replicas:
                 r.terminate()
 
+    def log_files(self) -> List[str]:
+        """
+        Returns the stdout and stderr log files of the replicas (if any).
+        """
+        return [
+            std_io.name
+            for replicas in self.role_replicas.values()
+            for replica in replicas
+            for std_io in (replica.stdout, replica.stderr)
+            if std_io
+        ]
+
     def _get_error_file(self) -> Optional[str]:
         error_file = None
         min_timestamp = sys.maxsize
@@ -287,6 +391,7 @@ class _LocalAppDef:
             "log_dir": self.log_dir,
             "final_state": self.state.name,
             "last_updated": self.last_updated,
+            "launch_latency": self.launch_latency,
             "roles": roles_info,
         }
 
@@ -306,17 +411,214 @@ class _LocalAppDef:
         return f"{{app_id:{self.id}, state:{self.state}, pid_map:{role_to_pid}}}"
 
 
+class _LocalAppCache:
+    """
+    Holds the apps launched by ``LocalScheduler`` in least recently used order.
+    Apps in a terminal state are additionally indexed (in the order they finished
+    or were last accessed) so that both lookups and the eviction of the least
+    recently used finished app are O(1). Running apps are never evicted.
+
+    Accessing an app through ``get`` or ``[]`` marks it as most recently used.
+    Safe to use from multiple threads (the reaper marks apps as terminal).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._apps: "OrderedDict[AppId, _LocalAppDef]" = OrderedDict()
+        # app_ids of the apps in a terminal state, least recently used first
+        self._terminal_apps: "OrderedDict[AppId, None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._apps)
+
+    def __contains__(self, app_id: AppId) -> bool:
+        return app_id in self._apps
+
+    def __getitem__(self, app_id: AppId) -> _LocalAppDef:
+        app = self.get(app_id)
+        if app is None:
+            raise KeyError(app_id)
+        return app
+
+    def get(self, app_id: AppId) -> Optional[_LocalAppDef]:
+        with self._lock:
+            app = self._apps.get(app_id)
+            if app is not None:
+                self._apps.move_to_end(app_id)
+                if app_id in self._terminal_apps:
+                    self._terminal_apps.move_to_end(app_id)
+            return app
+
+    def items(self) -> Iterator[Tuple[AppId, _LocalAppDef]]:
+        with self._lock:
+            return iter(list(self._apps.items()))
+
+    def add(self, app: _LocalAppDef) -> None:
+        with self._lock:
+            self._apps[app.id] = app
+            if is_terminal(app.state):
+                self._terminal_apps[app.id] = None
+
+    def mark_terminal(self, app: _LocalAppDef) -> None:
+        """
+        Records that ``app`` has reached a terminal state, which makes it
+        eligible for eviction.
+        """
+        with self._lock:
+            if app.id in self._apps:
+                self._terminal_apps[app.id] = None
+                self._terminal_apps.move_to_end(app.id)
+
+    def evict_lru(self) -> Optional[AppId]:
+        """
+        Evicts the least recently used app in a terminal state.
+
+        Returns:
+            The evicted app's id or ``None`` if all apps are running
+        """
+        with self._lock:
+            if not self._terminal_apps:
+                return None
+            app_id, _ = self._terminal_apps.popitem(last=False)
+            del self._apps[app_id]
+            return app_id
+
+
+class _Reaper:
+    """
+    Reaps the replica processes launched by ``LocalScheduler`` from a single
+    daemon thread and finishes an app (see ``_LocalAppDef.finish``) as soon as
+    its last replica exits. This keeps ``describe`` from having to poll every
+    replica and lets waiters block on the app's state rather than sleep.
+
+    Where ``os.pidfd_open`` is available (Linux, python>=3.9) the thread blocks
+    on the replicas' pidfds, otherwise it polls the replicas that it could not
+    get a pidfd for every ``poll_interval`` seconds. The thread exits when
+    there are no more running replicas and is restarted on the next ``watch``.
+
+    ``on_finish`` is called with each app that the reaper finished (see
+    ``_LocalAppDef.finish``).
+    """
+
+    def __init__(
+        self,
+        on_finish: Callable[[_LocalAppDef], None],
+        poll_interval: float = 0.1,
+    ) -> None:
+        self._on_finish = on_finish
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._selector: Optional[selectors.BaseSelector] = (
+            selectors.DefaultSelector() if hasattr(os, "pidfd_open") else None
+        )
+        # replicas without a pidfd, these are polled
+        self._polled: List[Tuple[_LocalAppDef, _LocalReplica]] = []
+        # app_id -> number of replicas of the app that have not exited yet
+        self._num_alive: Dict[AppId, int] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def _pidfd_open(self, pid: int) -> Optional[int]:
+        if not self._selector:
+            return None
+        try:
+            # pyre-ignore[16]: only available on linux and python>=3.9
+            return os.pidfd_open(pid)
+        except OSError as e:
+            log.debug(f"pidfd_open failed for pid: {pid}, falling back to polling: {e}")
+            return None
+
+    def watch(self, app: _LocalAppDef) -> None:
+        """
+        Starts watching the replicas of the given app.
+        """
+        with self._lock:
+            for replicas in app.role_replicas.values():
+                for replica in replicas:
+                    self._num_alive[app.id] = self._num_alive.get(app.id, 0) + 1
+                    pidfd = self._pidfd_open(replica.proc.pid)
+                    if pidfd is None:
+                        self._polled.append((app, replica))
+                    else:
+                        none_throws(self._selector).register(
+                            pidfd, selectors.EVENT_READ, (app, replica)
+                        )
+
+            if not self._thread and self._num_alive:
+                self._thread = threading.Thread(
+                    target=self._run, name="torchx-local-reaper", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._num_alive:
+                    self._thread = None
+                    return
+                timeout = self._poll_interval if self._polled else None
+
+            exited = []
+            selector = self._selector
+            if selector:
+                for key, _ in selector.select(timeout):
+                    selector.unregister(key.fd)
+                    os.close(key.fd)
+                    exited.append(key.data)
+            else:
+                time.sleep(self._poll_interval)
+
+            with self._lock:
+                polled = []
+                for app, replica in self._polled:
+                    if replica.is_alive():
+                        polled.append((app, replica))
+                    else:
+                        exited.append((app, replica))
+                self._polled = polled
+
+            for app, replica in exited:
+                self._on_exit(app, replica)
+
+    def _on_exit(self, app: _LocalAppDef, replica: _LocalReplica) -> None:
+        # the process has exited; wait() reaps it and records its exit code
+        replica.proc.wait()
+        with self._lock:
+            self._num_alive[app.id] -= 1
+            if self._num_alive[app.id] > 0:
+                return
+            del self._num_alive[app.id]
+
+        failed = False
+        for replicas in app.role_replicas.values():
+            for r in replicas:
+                failed |= r.failed()
+
+        try:
+            app.finish(
+                AppState.FAILED if failed else AppState.SUCCEEDED, self._on_finish
+            )
+        except Exception:
+            log.exception(f"failed to close app: {app.id}")
+
+
+# prctl(2) of libc (linux only), looked up once so that the forked replicas
+# only have to call it (see ``_pr_set_pdeathsig``)
+_PRCTL: Optional[Callable[..., int]] = (
+    ctypes.CDLL("libc.so.6").prctl if sys.platform == "linux" else None
+)
+PR_SET_PDEATHSIG = 1
+
+
 def _pr_set_pdeathsig() -> None:
     """
     Sets PR_SET_PDEATHSIG to ensure a child process is
-    terminated appropriately.
+    terminated appropriately. Called in the child between fork and exec
+    (``preexec_fn``) so it does nothing but the syscall.
 
     See http://stackoverflow.com/questions/1884941/ for more information.
     For libc.so.6 read http://www.linux-m68k.org/faq/glibcinfo.html
     """
-    libc = ctypes.CDLL("libc.so.6")
-    PR_SET_PDEATHSIG = 1
-    libc.prctl(PR_SET_PDEATHSIG, signal.SIGTERM)
+    none_throws(_PRCTL)(PR_SET_PDEATHSIG, signal.SIGTERM)
 
 
 @dataclass
@@ -346,6 +648,8 @@ class PopenRequest:
     # maps role_name -> List[replica_log_dir]
     # role_log_dirs["trainer"][0] -> holds trainer's 0^th replica's log directory path
     role_log_dirs: Dict[RoleName, List[str]]
+    # whether to timestamp the stdout/stderr log files of the replicas
+    timestamp_logs: bool = False
 
 
 class LocalScheduler(Scheduler):
@@ -370,8 +674,29 @@ class LocalScheduler(Scheduler):
     def __init__(self, session_name: str, cache_size: int = 100) -> None:
         super().__init__("local", session_name)
 
-        # TODO T72035686 replace dict with a proper LRUCache data structure
-        self._apps: Dict[AppId, _LocalAppDef] = {}
+        self._apps = _LocalAppCache()
+        self._timestamper = _LogTimestamper()
+        apps, timestamper = self._apps, self._timestamper
+
+        def on_finish(app: _LocalAppDef) -> None:
+            # the app's log files are complete, make the app evictable
+            for log_file in app.log_files():
+                timestamper.unwatch(log_file)
+            apps.mark_terminal(app)
+
+        # not a bound method so that the reaper thread does not keep self alive
+        self._on_finish: Callable[[_LocalAppDef], None] = on_finish
+        self._reaper = _Reaper(on_finish=on_finish)
+        if not _PRCTL:
+            log.warning(
+                f"PR_SET_PDEATHSIG is not supported on {sys.platform}, the replicas"
+                " are not terminated if this process exits before they do"
+            )
+        # PR_SET_PDEATHSIG fires when the thread that forked the replica exits
+        # so the launcher threads must live as long as the scheduler does
+        self._launcher = ThreadPoolExecutor(
+            max_workers=MAX_LAUNCH_WORKERS, thread_name_prefix="torchx-local-launch"
+        )
 
         if cache_size <= 0:
             raise ValueError("cache size must be greater than zero")
@@ -391,6 +716,14 @@ class LocalScheduler(Scheduler):
             default=None,
             help="dir to write stdout/stderr log files of replicas",
         )
+        opts.add(
+            "timestamp_logs",
+            type_=bool,
+            default=False,
+            help="record when the replicas write to their log files so that"
+            " log_iter can return the lines written between since and until"
+            " (requires log_dir)",
+        )
         return opts
 
     def _validate(self, app: AppDef, scheduler: SchedulerBackend) -> None:
@@ -419,23 +752,14 @@ class LocalScheduler(Scheduler):
     def _evict_lru(self) -> bool:
         """
         Evicts one least recently used element from the apps cache. LRU is defined as
-        the oldest app in a terminal state (e.g. oldest finished app).
+        the app in a terminal state that was least recently accessed (or finished).
 
         Returns:
             ``True`` if an entry was evicted, ``False`` if no entries could be evicted
             (e.g. all apps are running)
         """
-        lru_time = sys.maxsize
-        lru_app_id = None
-        for (app_id, app) in self._apps.items():
-            if is_terminal(app.state):
-                if app.last_updated <= lru_time:
-                    lru_app_id = app_id
-
+        lru_app_id = self._apps.evict_lru()
         if lru_app_id:
-            # evict LRU finished app from the apps cache
-            del self._apps[lru_app_id]
-
             log.debug(f"evicting app: {lru_app_id}, from local scheduler cache")
             return True
         else:
@@ -462,16 +786,18 @@ class LocalScheduler(Scheduler):
         return open(file, mode="w")
 
     def _popen(
-        self, role_name: RoleName, replica_id: int, replica_params: ReplicaParam
+        self,
+        role_name: RoleName,
+        replica_id: int,
+        replica_params: ReplicaParam,
+        stdout: Optional[TextIO],
+        stderr: Optional[TextIO],
     ) -> _LocalReplica:
         """
-        Same as ``subprocess.Popen(**popen_kwargs)`` but is able to take ``stdout`` and ``stderr``
-        as file name ``str`` rather than a file-like obj.
+        Same as ``subprocess.Popen(**popen_kwargs)`` but takes the already opened
+        ``stdout`` and ``stderr`` log files of the replica (``None`` for console).
         """
 
-        stdout_ = self._get_file_io(replica_params.stdout)
-        stderr_ = self._get_file_io(replica_params.stderr)
-
         # inherit parent's env vars since 99.9% of the time we want this behavior
         # just make sure we override the parent's env vars with the user_defined ones
         env = os.environ.copy()
@@ -479,25 +805,65 @@ class LocalScheduler(Scheduler):
 
         error_file = env["TORCHELASTIC_ERROR_FILE"]
 
-        args_pfmt = pprint.pformat(asdict(replica_params), indent=2, width=80)
-        log.info(f"Running {role_name} (replica {replica_id}):\n {args_pfmt}")
+        if log.isEnabledFor(logging.INFO):
+            args_pfmt = pprint.pformat(asdict(replica_params), indent=2, width=80)
+            log.info(f"Running {role_name} (replica {replica_id}):\n {args_pfmt}")
 
         proc = subprocess.Popen(
             args=replica_params.args,
             env=env,
-            stdout=stdout_,
-            stderr=stderr_,
-            preexec_fn=_pr_set_pdeathsig,
+            stdout=stdout,
+            stderr=stderr,
+            # PR_SET_PDEATHSIG fires when the forking (launcher) thread exits
+            preexec_fn=_pr_set_pdeathsig if _PRCTL else None,
         )
         return _LocalReplica(
             role_name,
             replica_id,
             proc,
-            stdout=stdout_,
-            stderr=stderr_,
+            stdout=stdout,
+            stderr=stderr,
             error_file=error_file,
         )
 
+    def _launch(
+        self,
+        launches: List[
+            Tuple[RoleName, int, ReplicaParam, Optional[TextIO], Optional[TextIO]]
+        ],
+    ) -> List[Tuple[RoleName, _LocalReplica]]:
+        """
+        Launches the replicas concurrently from the scheduler's thread pool (of at
+        most ``MAX_LAUNCH_WORKERS`` threads). If any of the replicas fails to launch,
+        the ones that did launch are terminated and the first error is raised.
+
+        Returns:
+            ``(role_name, replica)`` pairs in the same order as ``launches``
+        """
+
+        # always forked from the launcher threads (even a single replica) since
+        # the replicas are terminated when the thread that forked them exits
+        futures = [self._launcher.submit(self._popen, *launch) for launch in launches]
+        wait_futures(futures)
+
+        replicas = []
+        errors = []
+        for launch, future in zip(launches, futures):
+            error = future.exception()
+            if error:
+                errors.append(error)
+                for std_io in launch[3:]:
+                    if std_io:
+                        std_io.close()
+            else:
+                replicas.append((launch[0], future.result()))
+
+        if errors:
+            for _, replica in replicas:
+                replica.terminate()
+            raise errors[0]
+        return replicas
+
     def _get_app_log_dir(self, app_id: str, cfg: RunConfig) -> Tuple[str, bool]:
         """
         Returns the log dir and a bool (should_redirect_std). We redirect stdout/err
@@ -516,7 +882,7 @@ class LocalScheduler(Scheduler):
         return os.path.join(str(base_log_dir), self.session_name, app_id), redirect_std
 
     def schedule(self, dryrun_info: AppDryRunInfo[PopenRequest]) -> str:
-        if len(self._apps) == self._cache_size:
+        if len(self._apps) >= self._cache_size:
             if not self._evict_lru():
                 raise IndexError(
                     f"App cache size ({self._cache_size}) exceeded. Increase the cache size"
@@ -529,20 +895,60 @@ class LocalScheduler(Scheduler):
             app_id not in self._apps
         ), "no app_id collisions expected since uuid4 suffix is used"
 
+        start = time.perf_counter()
         os.makedirs(app_log_dir)
         local_app = _LocalAppDef(app_id, app_log_dir)
 
-        for role_name in request.role_params.keys():
-            role_params = request.role_params[role_name]
-            role_log_dirs = request.role_log_dirs[role_name]
-            for replica_id in range(len(role_params)):
-                replica_params = role_params[replica_id]
-                replica_log_dir = role_log_dirs[replica_id]
-
-                os.makedirs(replica_log_dir)
-                replica = self._popen(role_name, replica_id, replica_params)
-                local_app.add_replica(role_name, replica)
-        self._apps[app_id] = local_app
+        # create the log dirs and open the log files of all the replicas
+        # up front so that a bad log_dir fails the launch before any fork
+        launches = []
+        opened_files: List[TextIO] = []
+        try:
+            for role_name in request.role_params.keys():
+                role_params = request.role_params[role_name]
+                role_log_dirs = request.role_log_dirs[role_name]
+                for replica_id in range(len(role_params)):
+                    replica_params = role_params[replica_id]
+                    replica_log_dir = role_log_dirs[replica_id]
+
+                    os.makedirs(replica_log_dir)
+                    stdout = self._get_file_io(replica_params.stdout)
+                    if stdout:
+                        opened_files.append(stdout)
+                    stderr = self._get_file_io(replica_params.stderr)
+                    if stderr:
+                        opened_files.append(stderr)
+                    launches.append(
+                        (role_name, replica_id, replica_params, stdout, stderr)
+                    )
+        except Exception:
+            for f in opened_files:
+                f.close()
+            raise
+
+        # start timestamping before the replicas can write to their log files
+        timestamped_files = (
+            [f.name for f in opened_files] if request.timestamp_logs else []
+        )
+        for log_file in timestamped_files:
+            self._timestamper.watch(log_file)
+        try:
+            replicas = self._launch(launches)
+        except Exception:
+            for log_file in timestamped_files:
+                self._timestamper.unwatch(log_file)
+            raise
+
+        for role_name, replica in replicas:
+            local_app.add_replica(role_name, replica)
+        local_app.launch_latency = time.perf_counter() - start
+        log.info(
+            f"Launched {len(launches)} replicas of app: {app_id}"
+            f" in {local_app.launch_latency:.3f}s"
+        )
+        local_app.set_state(AppState.RUNNING)
+        self._apps.add(local_app)
+        self._reaper.watch(local_app)
         return app_id
 
     def _submit_dryrun(
@@ -605,36 +1011,22 @@ class LocalScheduler(Scheduler):
                 )
                 replica_log_dirs.append(replica_log_dir)
 
-        return PopenRequest(app_id, app_log_dir, role_params, role_log_dirs)
+        return PopenRequest(
+            app_id,
+            app_log_dir,
+            role_params,
+            role_log_dirs,
+            timestamp_logs=redirect_std and bool(cfg.get("timestamp_logs")),
+        )
 
     def describe(self, app_id: str) -> Optional[DescribeAppResponse]:
-        if app_id not in self._apps:
+        local_app = self._apps.get(app_id)
+        if not local_app:
             return None
 
-        local_app = self._apps[app_id]
         structured_error_msg = local_app.get_structured_error_msg()
-
-        # check if the app is known to have finished
-        if is_terminal(local_app.state):
-            state = local_app.state
-        else:
-            running = False
-            failed = False
-            for replicas in local_app.role_replicas.values():
-                for r in replicas:
-                    running |= r.is_alive()
-                    failed |= r.failed()
-
-            if running:
-                state = AppState.RUNNING
-            elif failed:
-                state = AppState.FAILED
-            else:
-                state = AppState.SUCCEEDED
-            local_app.set_state(state)
-
-        if is_terminal(local_app.state):
-            local_app.close()
+        # the state is kept up to date by the reaper as replicas exit
+        state = local_app.get_state()
 
         resp = DescribeAppResponse()
         resp.app_id = app_id
@@ -644,6 +1036,12 @@ class LocalScheduler(Scheduler):
         resp.ui_url = f"file://{local_app.log_dir}"
         return resp
 
+    def describe_many(
+        self, app_ids: List[str]
+    ) -> Dict[str, Optional[DescribeAppResponse]]:
+        # describe does not block (the reaper keeps the states up to date)
+        return {app_id: self.describe(app_id) for app_id in app_ids}
+
     def log_iter(
         self,
         app_id: str,
@@ -653,13 +1051,9 @@ class LocalScheduler(Scheduler):
         since: Optional[datetime] = None,
         until: Optional[datetime] = None,
         should_tail: bool = False,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
     ) -> Iterable[str]:
-        if since or until:
-            warnings.warn(
-                "Since and/or until times specified for LocalScheduler.log_iter."
-                " These will be ignored and all log lines will be returned"
-            )
-
         app = self._apps[app_id]
         log_file = os.path.join(app.log_dir, role_name, str(k), "stderr.log")
 
@@ -669,78 +1063,150 @@ class LocalScheduler(Scheduler):
                 f" Did you run it with log_dir set in RunConfig?"
             )
 
-        return LogIterator(app_id, regex or ".*", log_file, self)
+        if (since or until) and not LogTimestamps(log_file).exists():
+            warnings.warn(
+                "Since and/or until times specified for LocalScheduler.log_iter."
+                " These will be ignored and all log lines will be returned."
+                " Run the app with timestamp_logs set in RunConfig to filter by time"
+            )
+            since = until = None
+
+        return LogIterator(
+            app_id,
+            regex or ".*",
+            log_file,
+            self,
+            since=since,
+            until=until,
+            tail_lines=tail_lines,
+            limit_bytes=limit_bytes,
+        )
 
     def _cancel_existing(self, app_id: str) -> None:
         # can assume app_id exists
         local_app = self._apps[app_id]
-        local_app.close()
-        local_app.state = AppState.CANCELLED
+        local_app.finish(AppState.CANCELLED, self._on_finish)
+
+    def _wait_for_state_change(self, app_id: str, timeout: float) -> None:
+        local_app = self._apps.get(app_id)
+        if local_app:
+            local_app.wait(timeout)
+
+    async def _wait_for_state_change_async(self, app_id: str, timeout: float) -> None:
+        local_app = self._apps.get(app_id)
+        if not local_app:
+            return
+
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+
+        def on_done() -> None:
+            # called from the reaper (or cancelling) thread
+            loop.call_soon_threadsafe(
+                lambda: finished.done() or finished.set_result(None)
+            )
+
+        local_app.add_done_callback(on_done)
+        try:
+            await asyncio.wait({finished}, timeout=timeout)
+        finally:
+            local_app.remove_done_callback(on_done)
 
     def __del__(self) -> None:
         # terminate all apps
         for (app_id, app) in self._apps.items():
             log.info(f"Terminating app: {app_id}")
             app.terminate()
+        self._launcher.shutdown(wait=False)
 
 
-class LogIterator:
-    def __init__(
-        self, app_id: str, regex: str, log_file: str, scheduler: LocalScheduler
-    ) -> None:
-        self._app_id: str = app_id
-        self._regex: Pattern[str] = re.compile(regex)
-        self._log_file: str = log_file
-        self._log_fp: Optional[TextIO] = None
-        self._scheduler: LocalScheduler = scheduler
-        self._app_finished: bool = False
-
-    def _check_finished(self) -> None:
-        # either the app (already finished) was evicted from the LRU cache
-        # -- or -- the app reached a terminal state (and still in the cache)
-        desc = self._scheduler.describe(self._app_id)
-        if not desc or is_terminal(desc.state):
-            self._app_finished = True
-        else:
-            self._app_finished = False
-
-    def __iter__(self) -> "LogIterator":
-        # wait for the log file to appear or app to finish (whichever happens first)
-        while True:
-            self._check_finished()  # check to see if app has finished running
-
-            if os.path.isfile(self._log_file):
-                self._log_fp = open(self._log_file, "r")  # noqa: P201
-                break
+class _LogTimestamper:
+    """
+    Timestamps the replicas' log files as they are written to: a single daemon
+    thread wakes up on file-system change notifications (see ``FileWatcher``)
+    and appends a ``(time.time(), file size)`` record to the ``LogTimestamps``
+    of each log file that grew. The replicas keep writing to their log files
+    directly, only the file sizes are sampled, so the log files stay as-is.
+
+    The thread exits when no files are watched and is restarted on the next
+    ``watch``.
+    """
 
-            if self._app_finished:
-                # app finished without ever writing a log file
-                raise RuntimeError(
-                    f"app: {self._app_id} finished without writing: {self._log_file}"
+    def __init__(self, poll_interval: float = 0.1) -> None:
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # log file -> opened timestamps file
+        self._logs: Dict[str, BinaryIO] = {}
+        # log file -> last recorded size of the log file
+        self._sizes: Dict[str, int] = {}
+        self._watcher: Optional[FileWatcher] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, log_file: str) -> None:
+        """
+        Starts timestamping ``log_file``.
+        """
+        with self._lock:
+            if log_file in self._logs:
+                return
+            ts_fp = open(LogTimestamps(log_file).path, "ab")  # noqa: P201
+            self._logs[log_file] = ts_fp
+            self._sizes[log_file] = 0
+            if not self._watcher:
+                self._watcher = FileWatcher(poll_interval=self._poll_interval)
+            self._watcher.add(log_file)
+
+            if not self._thread:
+                self._thread = threading.Thread(
+                    target=self._run, name="torchx-local-timestamper", daemon=True
                 )
+                self._thread.start()
 
-            time.sleep(1)
-        return self
-
-    def __next__(self) -> str:
-        log_fp = self._log_fp
-        assert log_fp is not None
+    def unwatch(self, log_file: str) -> None:
+        """
+        Records the final size of ``log_file`` and stops timestamping it.
+        No-op if the file is not watched.
+        """
+        with self._lock:
+            if log_file not in self._logs:
+                return
+            self._record(log_file)
+            self._logs.pop(log_file).close()
+            del self._sizes[log_file]
+            none_throws(self._watcher).remove(log_file)
+
+    def _record(self, log_file: str) -> None:
+        try:
+            size = os.path.getsize(log_file)
+        except OSError:
+            return
+        if size != self._sizes[log_file]:
+            self._sizes[log_file] = size
+            ts_fp = self._logs[log_file]
+            ts_fp.write(LogTimestamps.RECORD.pack(time.time(), size))
+            ts_fp.flush()
+
+    def _run(self) -> None:
         while True:
-            line = log_fp.readline()
-            if not line:
-                # we have reached EOF and app finished
-                if self._app_finished:
-                    log_fp.close()
-                    raise StopIteration()
-
-                # if app is still running we need to wait for more possible log lines
-                # sleep for 1 sec to avoid thrashing the follow
-                time.sleep(1)
-                self._check_finished()
-            else:
-                line = line.rstrip("\n")  # strip the trailing newline
-                if re.match(self._regex, line):
-                    return line
+            with self._lock:
+                watcher = self._watcher
+                if not self._logs or not watcher:
+                    self._thread = None
+                    return
+
+            try:
+                changed = watcher.wait(self._poll_interval * 10)
+            except (OSError, ValueError):
+                # the watcher fell back to polling while waiting
+                changed = None
+
+            with self._lock:
+                for log_file in self._logs.keys() if changed is None else changed:
+                    if log_file in self._logs:
+                        try:
+                            self._record(log_file)
+                        except Exception:
+                            log.exception(f"failed to timestamp: {log_file}")
 
 
 def create_scheduler(session_name: str, **kwargs: Any) -> LocalScheduler:
@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Reading (and following) the log files of the replicas of an app. Used by the
+schedulers whose replicas write their logs to files that are readable from the
+host torchx runs on (e.g. ``local`` and ``slurm`` with a shared file system).
+"""
+
+import ctypes
+import hashlib
+import logging
+import os
+import re
+import select
+import struct
+import tempfile
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import BinaryIO, Deque, Dict, Optional, Pattern, Set, Tuple
+
+from pyre_extensions import none_throws
+from torchx.schedulers.api import Scheduler
+from torchx.specs.api import is_terminal
+from torchx.util.cache import prune
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class FileWatcher:
+    """
+    Blocks until one of the watched files is written to (or closed after writing).
+    Uses inotify where available (linux) and falls back to sleeping for
+    ``poll_interval`` seconds otherwise.
+    """
+
+    # from <sys/inotify.h>
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    # struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[];}
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, path: Optional[str] = None, poll_interval: float = 0.1) -> None:
+        self._poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._libc: Optional[ctypes.CDLL] = None
+        # inotify watch descriptor -> path
+        self._paths: Dict[int, str] = {}
+        # path -> inotify watch descriptor
+        self._wds: Dict[str, int] = {}
+        try:
+            libc = ctypes.CDLL("libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            self._fd = fd
+            self._libc = libc
+        except (OSError, AttributeError) as e:
+            logger.debug(f"inotify unavailable, polling for changes: {e}")
+
+        if path:
+            self.add(path)
+
+    def add(self, path: str) -> None:
+        """
+        Starts watching ``path`` (in addition to the already watched files).
+        """
+        fd, libc = self._fd, self._libc
+        if fd is None or libc is None or path in self._wds:
+            return
+        wd = libc.inotify_add_watch(
+            fd, path.encode(), self.IN_MODIFY | self.IN_CLOSE_WRITE
+        )
+        if wd < 0:
+            logger.debug(
+                f"inotify_add_watch failed for {path} (errno: {ctypes.get_errno()}),"
+                f" polling for changes"
+            )
+            self.close()
+            return
+        self._paths[wd] = path
+        self._wds[path] = wd
+
+    def remove(self, path: str) -> None:
+        """
+        Stops watching ``path``.
+        """
+        wd = self._wds.pop(path, None)
+        if wd is not None and self._fd is not None:
+            self._paths.pop(wd, None)
+            none_throws(self._libc).inotify_rm_watch(self._fd, wd)
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """
+        Returns once a watched file changes or after at most ``timeout`` seconds.
+
+        Returns:
+            the watched files that changed or ``None`` if that is not known
+            (when polling, any of the files may have changed)
+        """
+        fd = self._fd
+        if fd is None:
+            time.sleep(min(timeout, self._poll_interval))
+            return None
+
+        changed = set()
+        readable, _, _ = select.select([fd], [], [], timeout)
+        if readable:
+            # drain the pending events, one wake-up per batch of changes is enough
+            try:
+                while True:
+                    buf = os.read(fd, 4096)
+                    if not buf:
+                        break
+                    i = 0
+                    while i < len(buf):
+                        wd, _, _, name_len = self.EVENT.unpack_from(buf, i)
+                        i += self.EVENT.size + name_len
+                        path = self._paths.get(wd)
+                        if path:
+                            changed.add(path)
+            except BlockingIOError:
+                pass
+        return changed
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._paths.clear()
+        self._wds.clear()
+
+    def __del__(self) -> None:
+        self.close()
+
+
+class LineIndex:
+    """
+    Sparse index of the byte offsets of the lines in a log file: holds the
+    offset of every ``STRIDE``-th line so that seeking to any line only needs to
+    skip over at most ``STRIDE - 1`` lines. The index is built incrementally as
+    the log file is read and can be saved to (and loaded from) a sidecar file
+    (``<log_file>.idx``) once the log file is complete.
+
+    If ``index_dir`` is given the index is saved there instead (e.g. when the
+    log files are not in a torchx owned directory), named after the path,
+    inode and modification time of the log file so that an index is never
+    used for another (or rewritten) log file of the same path. Indices in
+    ``index_dir`` that were not used for ``MAX_AGE`` seconds are pruned, as
+    are the least recently used ones beyond ``MAX_ENTRIES``.
+    """
+
+    STRIDE: int = 1024
+    MAX_ENTRIES: int = 1000
+    MAX_AGE: float = 30 * 24 * 60 * 60
+
+    def __init__(self, log_file: str, index_dir: Optional[str] = None) -> None:
+        self.log_file = log_file
+        self.index_dir = index_dir
+        # offsets[i] is the byte offset of line i * STRIDE
+        self.offsets: "array[int]" = array("Q")
+        # whether there are offsets that have not been saved
+        self.dirty: bool = False
+
+    @property
+    def path(self) -> str:
+        index_dir = self.index_dir
+        if not index_dir:
+            return f"{self.log_file}.idx"
+        st = os.stat(self.log_file)
+        key = f"{os.path.abspath(self.log_file)}:{st.st_ino}:{st.st_mtime_ns}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(index_dir, f"{digest}.idx")
+
+    def add(self, line_no: int, offset: int) -> None:
+        """
+        Records that line ``line_no`` (0-based) starts at byte ``offset``.
+        """
+        if line_no % self.STRIDE == 0 and line_no // self.STRIDE == len(self.offsets):
+            self.offsets.append(offset)
+            self.dirty = True
+
+    def lookup(self, line_no: int) -> Tuple[int, int]:
+        """
+        Returns the ``(line_no, offset)`` of the closest indexed line at or before
+        the given ``line_no``.
+        """
+        i = min(line_no // self.STRIDE, len(self.offsets) - 1)
+        if i < 0:
+            return 0, 0
+        return i * self.STRIDE, self.offsets[i]
+
+    def load(self) -> None:
+        offsets = array("Q")
+        try:
+            path = self.path
+            if not os.path.isfile(path):
+                return
+            with open(path, "rb") as f:
+                offsets.frombytes(f.read())
+            if self.index_dir:
+                # marks the index as recently used so that it is not pruned
+                os.utime(path)
+        except (OSError, ValueError) as e:
+            logger.debug(f"ignoring unreadable line index of {self.log_file}: {e}")
+            return
+        # the first entry is the stride the index was built with
+        if offsets and offsets[0] == self.STRIDE and len(offsets) > len(self.offsets):
+            self.offsets = offsets[1:]
+            self.dirty = False
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        # write to a tmp file and rename so that readers never see a partial index
+        try:
+            path = self.path
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write((array("Q", [self.STRIDE]) + self.offsets).tobytes())
+            os.replace(tmp_path, path)
+            self.dirty = False
+            if self.index_dir:
+                prune(self.index_dir, self.MAX_ENTRIES, self.MAX_AGE)
+        except OSError as e:
+            logger.debug(f"failed to save line index of {self.log_file}: {e}")
+
+
+class LogTimestamps:
+    """
+    Sidecar file (``<log_file>.ts``) of fixed-size ``(time, size)`` records, each
+    one saying that by ``time`` (seconds since epoch) the log file was ``size``
+    bytes long. Records are appended in time order by ``_LogTimestamper`` so the
+    byte range of the log file written within a time window is found with a
+    binary search over the records rather than by scanning the log file.
+    """
+
+    RECORD = struct.Struct("<dQ")
+
+    def __init__(self, log_file: str) -> None:
+        self.path: str = f"{log_file}.ts"
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def size_at(self, t: float, inclusive: bool = True) -> int:
+        """
+        Returns the size (in bytes) that the log file had at time ``t`` (as of
+        the last record at or before ``t``, or strictly before ``t`` if not
+        ``inclusive``) and ``0`` if there is no such record.
+        """
+        record_size = self.RECORD.size
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            # ignore a trailing partially written record
+            lo, hi = 0, f.tell() // record_size
+            # find the first record that is after t
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f.seek(mid * record_size)
+                ts, _ = self.RECORD.unpack(f.read(record_size))
+                if ts < t or (inclusive and ts == t):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == 0:
+                return 0
+            f.seek((lo - 1) * record_size)
+            _, size = self.RECORD.unpack(f.read(record_size))
+            return size
+
+
+class LogIterator:
+    """
+    Iterates over the lines of a replica's log file, following (``tail -f``)
+    the file until the app finishes. Reads the file in large chunks and wakes
+    up on file-system change notifications rather than sleeping at EOF.
+
+    Supports line cursors: ``seek(n)`` (or ``iter[n]`` which also returns the
+    line) moves the iterator to the ``n``-th (0-based) line of the log file.
+    Seeking uses a line offset index that is built as the log is read and saved
+    next to the log file (or in ``index_dir``, see ``LineIndex``) once the app
+    has finished and the log was fully read.
+
+    If the log file is timestamped (see ``LogTimestamps``) only the lines
+    written within ``since`` and ``until`` are returned, the first line is found
+    with a binary search over the timestamps. Line numbers are then relative to
+    the first line written at or after ``since``.
+
+    ``tail_lines`` starts the iterator at the ``tail_lines``-th last line of the
+    file (as of the time iteration starts) and ``limit_bytes`` stops it at the
+    first line that starts more than ``limit_bytes`` bytes after the first line
+    returned. Line numbers are then relative to that first line.
+
+    With ``should_tail=False`` the iterator stops at the end of the file even if
+    the app is still running. The app's state is checked with
+    ``scheduler.describe`` so any scheduler whose replicas write to a log file
+    that is accessible locally can use this iterator.
+
+    .. note:: inotify only sees the writes made by the local host. Writes made
+              by other hosts to a log file on a network file system (e.g. NFS)
+              never wake up the watcher, following the log then degrades to
+              waking up every ``WAIT_TIMEOUT`` seconds (and calling
+              ``scheduler.describe`` each time). Schedulers whose replicas run
+              on other hosts should pass ``poll_interval`` to skip the inotify
+              watch and sleep for ``poll_interval`` seconds at EOF instead.
+    """
+
+    # number of bytes read from the log file at a time
+    CHUNK_SIZE: int = 64 * 1024
+    # max seconds to block at EOF before re-checking whether the app finished
+    WAIT_TIMEOUT: float = 1.0
+
+    def __init__(
+        self,
+        app_id: str,
+        regex: str,
+        log_file: str,
+        scheduler: Scheduler,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        should_tail: bool = True,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
+        index_dir: Optional[str] = None,
+        poll_interval: Optional[float] = None,
+    ) -> None:
+        self._app_id: str = app_id
+        # no need to evaluate a match-all regex on every line
+        self._regex: Optional[Pattern[str]] = (
+            None if regex in ("", ".*") else re.compile(regex)
+        )
+        self._log_file: str = log_file
+        self._log_fp: Optional[BinaryIO] = None
+        self._watcher: Optional[FileWatcher] = None
+        self._scheduler: Scheduler = scheduler
+        self._should_tail: bool = should_tail
+        self._poll_interval: Optional[float] = poll_interval
+        self._app_finished: bool = False
+        # set once the iterator is exhausted, every later next() stops too
+        self._finished: bool = False
+        # complete lines read from the log file but not returned yet
+        self._lines: Deque[bytes] = deque()
+        # trailing bytes read from the log file that are not newline terminated yet
+        self._partial: bytes = b""
+        self._timestamps: Optional[LogTimestamps] = (
+            LogTimestamps(log_file) if since or until else None
+        )
+        self._since: Optional[float] = since.timestamp() if since else None
+        self._until: Optional[float] = until.timestamp() if until else None
+        self._tail_lines: Optional[int] = tail_lines
+        self._limit_bytes: Optional[int] = limit_bytes
+        # line numbers do not start at the first line of the file with since
+        # or tail_lines so the line offset index cannot be used (or built)
+        self._index: Optional[LineIndex] = (
+            None if since or tail_lines is not None else LineIndex(log_file, index_dir)
+        )
+        # line number and byte offset of the next line to be returned
+        self._line_no: int = 0
+        self._offset: int = 0
+        # byte offset of line 0 (the first line written at or after since)
+        self._start_offset: int = 0
+        # byte offset of the first line written after until (once known)
+        self._end_offset: Optional[int] = None
+        # byte offset past which no line is returned (limit_bytes)
+        self._limit_offset: Optional[int] = None
+
+    def _check_finished(self) -> None:
+        # either the app (already finished) was evicted from the LRU cache
+        # -- or -- the app reached a terminal state (and still in the cache)
+        desc = self._scheduler.describe(self._app_id)
+        if not desc or is_terminal(desc.state):
+            self._app_finished = True
+        else:
+            self._app_finished = False
+
+    def __iter__(self) -> "LogIterator":
+        if self._log_fp is not None or self._finished:
+            # already iterating (or done)
+            return self
+
+        self._line_no = 0
+        self._lines.clear()
+        self._partial = b""
+        # wait for the log file to appear or app to finish (whichever happens first)
+        while True:
+            self._check_finished()  # check to see if app has finished running
+
+            if os.path.isfile(self._log_file):
+                self._log_fp = open(self._log_file, "rb")  # noqa: P201
+                if self._poll_interval is None:
+                    self._watcher = FileWatcher(self._log_file)
+                if self._index:
+                    self._index.load()
+                self._start_offset = self._find_start_offset()
+                if self._tail_lines is not None:
+                    self._start_offset = self._find_tail_offset(self._tail_lines)
+                if self._limit_bytes is not None:
+                    self._limit_offset = self._start_offset + self._limit_bytes
+                self._offset = self._start_offset
+                self._log_fp.seek(self._start_offset)
+                self._update_end_offset()
+                break
+
+            if self._app_finished:
+                # app finished without ever writing a log file
+                raise RuntimeError(
+                    f"app: {self._app_id} finished without writing: {self._log_file}"
+                )
+            if not self._should_tail:
+                raise RuntimeError(
+                    f"app: {self._app_id} has not written: {self._log_file} yet"
+                )
+
+            self._scheduler._wait_for_state_change(self._app_id, self.WAIT_TIMEOUT)
+        return self
+
+    def _find_start_offset(self) -> int:
+        """
+        Returns the byte offset of the first line written at or after ``since``.
+        """
+        since = self._since
+        if since is None:
+            return 0
+        size = none_throws(self._timestamps).size_at(since, inclusive=False)
+        if size == 0:
+            return 0
+        # size may be in the middle of a line that was started before since
+        log_fp = none_throws(self._log_fp)
+        log_fp.seek(size - 1)
+        return size - 1 + len(log_fp.readline())
+
+    def _find_tail_offset(self, num_lines: int) -> int:
+        """
+        Returns the byte offset of the ``num_lines``-th last line of the log
+        file (or ``self._start_offset`` if there are fewer lines after it).
+        """
+        log_fp = none_throws(self._log_fp)
+        end = log_fp.seek(0, os.SEEK_END)
+        if num_lines <= 0:
+            return end
+        pos = end
+        if end > self._start_offset:
+            log_fp.seek(end - 1)
+            if log_fp.read(1) == b"\n":
+                # the newline terminating the last line does not start a line
+                pos -= 1
+        # scans the file backwards for the newline before the first tail line
+        while pos > self._start_offset:
+            size = min(self.CHUNK_SIZE, pos - self._start_offset)
+            log_fp.seek(pos - size)
+            chunk = log_fp.read(size)
+            idx = len(chunk)
+            while num_lines > 0:
+                idx = chunk.rfind(b"\n", 0, idx)
+                if idx < 0:
+                    break
+                num_lines -= 1
+            if num_lines == 0:
+                return pos - size + idx + 1
+            pos -= size
+        return self._start_offset
+
+    def _update_end_offset(self) -> None:
+        """
+        Sets the byte offset of the first line written after ``until`` once
+        ``until`` has passed (before that more lines may still be written).
+        """
+        until = self._until
+        if until is None or self._end_offset is not None or time.time() <= until:
+            return
+        self._end_offset = none_throws(self._timestamps).size_at(until)
+
+    def _read_chunk(self) -> bool:
+        """
+        Reads the next chunk of the log file into ``self._lines``.
+
+        Returns:
+            ``False`` if there was nothing to read (EOF), ``True`` otherwise
+        """
+        log_fp = self._log_fp
+        assert log_fp is not None
+        chunk = log_fp.read(self.CHUNK_SIZE)
+        if not chunk:
+            return False
+        *lines, self._partial = (self._partial + chunk).split(b"\n")
+        self._lines.extend(lines)
+        return True
+
+    def _close(self) -> None:
+        self._finished = True
+        if self._log_fp:
+            self._log_fp.close()
+            self._log_fp = None
+        if self._watcher:
+            self._watcher.close()
+            self._watcher = None
+
+    def _next_line(self) -> Optional[bytes]:
+        """
+        Returns the next complete line of the log file or ``None`` if the end of
+        the file was reached. Does not wait for more lines to be written.
+        """
+        while not self._lines:
+            if not self._read_chunk():
+                return None
+        line = self._lines.popleft()
+        if self._index:
+            self._index.add(self._line_no, self._offset)
+        self._line_no += 1
+        self._offset += len(line) + 1
+        return line
+
+    def seek(self, line_no: int) -> None:
+        """
+        Moves the cursor of this iterator so that the next line returned is the
+        ``line_no``-th (0-based) line of the log file (or the first line after it
+        that matches the regex). If the log file has fewer lines, the cursor is
+        moved to the end of the file.
+        """
+        if self._log_fp is None:
+            # (re)opens the log file, also after the iterator was exhausted
+            self._finished = False
+            iter(self)
+        log_fp = none_throws(self._log_fp)
+
+        if self._index:
+            indexed_line_no, offset = self._index.lookup(line_no)
+        else:
+            indexed_line_no, offset = 0, self._start_offset
+        # jump to the closest indexed line when seeking backwards
+        # or when it is ahead of the current position
+        if line_no < self._line_no or indexed_line_no > self._line_no:
+            self._line_no, self._offset = indexed_line_no, offset
+            log_fp.seek(offset)
+            self._lines.clear()
+            self._partial = b""
+
+        while self._line_no < line_no:
+            if self._next_line() is None:
+                break
+
+    def __getitem__(self, line_no: int) -> str:
+        """
+        Seeks to the ``line_no``-th line and returns it (or the first line
+        after it that matches the regex).
+
+        Raises:
+            IndexError: if there is no such line
+        """
+        self.seek(line_no)
+        try:
+            return next(self)
+        except StopIteration:
+            raise IndexError(f"line: {line_no} is out of range for {self._log_file}")
+
+    def __next__(self) -> str:
+        if self._finished:
+            raise StopIteration()
+        if self._log_fp is None:
+            iter(self)
+        regex = self._regex
+        while True:
+            end_offset = self._end_offset
+            if end_offset is not None and self._offset >= end_offset:
+                # the rest of the lines were written after until
+                self._close()
+                raise StopIteration()
+            limit_offset = self._limit_offset
+            if limit_offset is not None and self._offset >= limit_offset:
+                self._close()
+                raise StopIteration()
+
+            raw_line = self._next_line()
+            if raw_line is not None:
+                line = raw_line.rstrip(b"\r").decode(errors="replace")
+                if not regex or regex.match(line):
+                    return line
+                continue
+
+            # we have reached EOF and app finished (or we are not following)
+            if self._app_finished or not self._should_tail:
+                if self._partial:
+                    # last line of the file is not newline terminated
+                    self._lines.append(self._partial)
+                    self._partial = b""
+                    continue
+                # the log file is complete, persist the index for later readers
+                if self._index and self._app_finished:
+                    self._index.save()
+                self._close()
+                raise StopIteration()
+
+            self._update_end_offset()
+            if self._end_offset is not None:
+                # until has passed and all the lines written until then were read
+                self._close()
+                raise StopIteration()
+
+            # if app is still running we need to wait for more possible log lines
+            # the watcher wakes up as soon as the file is written to (or closed
+            # when the app finishes) so this does not add latency to the follow
+            watcher = self._watcher
+            if watcher:
+                watcher.wait(self.WAIT_TIMEOUT)
+            else:
+                time.sleep(none_throws(self._poll_interval))
+            self._check_finished()
@@ -5,15 +5,35 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
-import csv
+import hashlib
+import logging
+import math
+import os
 import os.path
+import re
 import shlex
 import subprocess
-import tempfile
+import threading
+import time
+import warnings
 from dataclasses import dataclass
-from typing import Any, Dict, List, Mapping, Optional
+from datetime import datetime
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+    Union,
+)
 
+from pyre_extensions import none_throws
 from torchx.schedulers.api import AppDryRunInfo, DescribeAppResponse, Scheduler
+from torchx.schedulers.log_iterator import LogIterator
 from torchx.specs.api import (
     NONE,
     AppDef,
@@ -21,14 +41,21 @@ from torchx.specs.api import (
     Role,
     RunConfig,
     SchedulerBackend,
+    is_terminal,
     macros,
+    runopts,
 )
+from torchx.util.cache import cache_dir, prune
+
+logger: logging.Logger = logging.getLogger(__name__)
 
 
 SLURM_STATES: Mapping[str, AppState] = {
     "BOOT_FAIL": AppState.FAILED,
     "CANCELLED": AppState.CANCELLED,
     "COMPLETED": AppState.SUCCEEDED,
+    "COMPLETING": AppState.RUNNING,
+    "CONFIGURING": AppState.PENDING,
     "DEADLINE": AppState.FAILED,
     "FAILED": AppState.FAILED,
     "NODE_FAIL": AppState.FAILED,
@@ -37,20 +64,213 @@ SLURM_STATES: Mapping[str, AppState] = {
     "PREEMPTED": AppState.FAILED,
     "RUNNING": AppState.RUNNING,
     "REQUEUED": AppState.PENDING,
+    "REQUEUE_HOLD": AppState.PENDING,
     "RESIZING": AppState.PENDING,
     "REVOKED": AppState.FAILED,
+    "SIGNALING": AppState.RUNNING,
+    "STAGE_OUT": AppState.RUNNING,
+    "STOPPED": AppState.PENDING,
     "SUSPENDED": AppState.PENDING,
     "TIMEOUT": AppState.FAILED,
 }
 
 
+# seconds for which the job descriptions returned by sacct are cached
+DESCRIBE_CACHE_TTL: float = 5.0
+
+# max number of job ids queried with a single squeue/sacct invocation
+SACCT_MAX_JOB_IDS: int = 1000
+
+# max number of persisted terminal job states and max age (in seconds since
+# the job was submitted) of a persisted state, see _TerminalStateCache
+JOB_STATE_CACHE_MAX_ENTRIES: int = 10000
+JOB_STATE_CACHE_MAX_AGE: float = 30 * 24 * 60 * 60
+
+# format of the submit time of a job in the output of sacct
+SACCT_TIME_FORMAT: str = "%Y-%m-%dT%H:%M:%S"
+
+# max number of cached slurm scripts and max age (in seconds since they were
+# last submitted) of a cached script, see SlurmScheduler._cache_script
+SCRIPT_CACHE_MAX_ENTRIES: int = 1000
+SCRIPT_CACHE_MAX_AGE: float = 30 * 24 * 60 * 60
+
+# seconds between checks for new lines when following the log of a running job
+LOG_POLL_INTERVAL: float = 1.0
+
+
+# the name of the state at the start of a job state reported by squeue or sacct
+_SLURM_STATE: Pattern[str] = re.compile(r"[A-Z_]+")
+
+
+def _describe_response(job_id: str, state: str) -> DescribeAppResponse:
+    resp = DescribeAppResponse(app_id=job_id)
+    resp.msg = state
+    # the state may have a suffix (e.g. "CANCELLED by 1000" or, if the column
+    # is truncated, "CANCELLED+")
+    m = _SLURM_STATE.match(state.strip())
+    state_enum = SLURM_STATES.get(m.group(0)) if m else None
+    if state_enum is None:
+        # one job in an unexpected state should not fail describing the others
+        logger.warning(f"unknown state of slurm job {job_id}: {state}")
+        state_enum = AppState.UNKNOWN
+    resp.state = state_enum
+    return resp
+
+
+class _TerminalStateCache:
+    """
+    Persists the terminal states of jobs, which cannot change anymore, in an
+    append-only file of ``cluster|job_id|submit_time|state`` lines so that
+    finished jobs are never queried again (also across processes).
+
+    Job ids are only unique within a cluster and are reused once they wrap,
+    hence entries are keyed by cluster and job id, a job id that is handed out
+    again is dropped (see ``forget``) and entries of jobs submitted more than
+    ``max_age`` seconds ago are ignored. Once the file has more than
+    ``max_entries`` lines it is rewritten with the ``max_entries // 2`` most
+    recently submitted jobs (states appended concurrently by other processes
+    may be lost, they are then queried again).
+
+    The file is read once, on the first ``get``. Failing to read or write it
+    only disables the cache.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = JOB_STATE_CACHE_MAX_ENTRIES,
+        max_age: float = JOB_STATE_CACHE_MAX_AGE,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        # (cluster, job id) -> (submit time, state)
+        self._states: Optional[Dict[Tuple[str, str], Tuple[float, str]]] = None
+        self._num_lines = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[Tuple[str, str], Tuple[float, str]]:
+        states = self._states
+        if states is None:
+            states = self._states = {}
+            try:
+                with open(self.path, "r") as f:
+                    for line in f:
+                        self._num_lines += 1
+                        fields = line.rstrip("\n").split("|", 3)
+                        if len(fields) != 4:
+                            continue
+                        cluster, job_id, submit_time, state = fields
+                        if state:
+                            states[(cluster, job_id)] = (float(submit_time), state)
+                        else:
+                            # the job id was handed out again
+                            states.pop((cluster, job_id), None)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"failed to read slurm job states from {self.path}: {e}")
+        return states
+
+    def get(self, cluster: str, job_id: str) -> Optional[str]:
+        with self._lock:
+            cached = self._load().get((cluster, job_id))
+        if not cached or time.time() - cached[0] > self.max_age:
+            return None
+        return cached[1]
+
+    def put(self, cluster: str, states: Dict[str, Tuple[float, str]]) -> None:
+        """
+        Persists the ``(submit time, state)`` of the jobs keyed by job id.
+        """
+        with self._lock:
+            cached = self._load()
+            new = {
+                (cluster, job_id): s
+                for job_id, s in states.items()
+                if (cluster, job_id) not in cached
+            }
+            if new:
+                cached.update(new)
+                self._append(new)
+
+    def forget(self, cluster: str, job_id: str) -> None:
+        """
+        Drops the state of a job whose id was handed out to a new job.
+        """
+        with self._lock:
+            cached = self._load()
+            if (cluster, job_id) in cached:
+                del cached[(cluster, job_id)]
+                self._append({(cluster, job_id): (time.time(), "")})
+
+    def _append(self, states: Dict[Tuple[str, str], Tuple[float, str]]) -> None:
+        lines = "".join(
+            f"{cluster}|{job_id}|{submit_time}|{state}\n"
+            for (cluster, job_id), (submit_time, state) in states.items()
+        )
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # a single append so that concurrent writers do not interleave
+            with open(self.path, "a") as f:
+                f.write(lines)
+            self._num_lines += len(states)
+            if self._num_lines > self.max_entries:
+                self._compact()
+        except OSError as e:
+            logger.warning(f"failed to write slurm job states to {self.path}: {e}")
+
+    def _compact(self) -> None:
+        cached = none_throws(self._states)
+        now = time.time()
+        recent = sorted(
+            (
+                (submit_time, key, state)
+                for key, (submit_time, state) in cached.items()
+                if now - submit_time <= self.max_age
+            ),
+            reverse=True,
+        )[: self.max_entries // 2]
+        self._states = {key: (submit_time, state) for submit_time, key, state in recent}
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, "w") as f:
+            for submit_time, (cluster, job_id), state in reversed(recent):
+                f.write(f"{cluster}|{job_id}|{submit_time}|{state}\n")
+        os.replace(tmp_path, self.path)
+        self._num_lines = len(recent)
+
+
+# shell expressions that fill in the values of the macros from the env of a
+# slurm task (replica_id is only left unsubstituted in homogeneous jobs)
+_MACRO_ENV: Mapping[str, str] = {
+    macros.app_id: '"$SLURM_JOB_ID"',
+    macros.replica_id: '"$SLURM_PROCID"',
+}
+_MACRO: Pattern[str] = re.compile("(" + "|".join(map(re.escape, _MACRO_ENV)) + ")")
+
+# run options that configure torchx rather than being passed to sbatch
+_TORCHX_OPTS: Set[str] = {"homogeneous"}
+
+
 def _slurm_escape(s: str) -> str:
     """
-    _slurm_escape escapes the argument and substitutes in the macros.app_id with
-    a shell expression that fills in SLURM_JOB_ID from env.
+    _slurm_escape escapes the argument and substitutes in the macros.app_id
+    (macros.replica_id) with a shell expression that fills in SLURM_JOB_ID
+    (SLURM_PROCID) from env.
     """
-    escaped_parts = [shlex.quote(part) for part in s.split(macros.app_id)]
-    return '"$SLURM_JOB_ID"'.join(escaped_parts)
+    # the macros are at the odd indices
+    parts = _MACRO.split(s)
+    return "".join(
+        _MACRO_ENV[part] if i % 2 else shlex.quote(part) for i, part in enumerate(parts)
+    )
+
+
+def _log_file(app_id: str, role_name: str, replica_id: Union[int, str]) -> str:
+    """
+    Returns the name of the output file of the replica. The file is written to
+    the working directory of the job (``WorkDir`` in sacct).
+    """
+    return f"slurm-{app_id}-{role_name}-{replica_id}.out"
 
 
 @dataclass
@@ -64,19 +284,32 @@ class SlurmReplicaRequest:
     args: List[str]
     opts: Dict[str, str]
     env: Dict[str, str]
+    # file the output (stdout and stderr) of the replica is written to, relative
+    # to the working directory of the job
+    output: Optional[str] = None
+    # number of identical tasks (replicas) launched by the srun step
+    ntasks: int = 1
 
     @classmethod
-    def from_role(cls, role: Role, cfg: RunConfig) -> "SlurmReplicaRequest":
-        opts = {k: str(v) for k, v in cfg.cfgs.items()}
+    def from_role(
+        cls, role: Role, cfg: RunConfig, ntasks: int = 1
+    ) -> "SlurmReplicaRequest":
+        opts = {k: str(v) for k, v in cfg.cfgs.items() if k not in _TORCHX_OPTS}
         resource = role.resource
 
         if resource != NONE:
             if resource.cpu > 0:
                 opts["cpus-per-task"] = str(resource.cpu)
             if resource.memMB > 0:
-                opts["mem"] = str(resource.memMB)
+                if ntasks > 1 and resource.cpu > 0:
+                    # --mem is per node, which may run several of the tasks
+                    opts["mem-per-cpu"] = str(math.ceil(resource.memMB / resource.cpu))
+                else:
+                    opts["mem"] = str(resource.memMB)
             if resource.gpu > 0:
                 opts["gpus-per-task"] = str(resource.gpu)
+        if ntasks > 1:
+            opts["ntasks"] = str(ntasks)
 
         return cls(
             dir=role.image,
@@ -84,24 +317,47 @@ class SlurmReplicaRequest:
             args=list(role.args),
             opts=opts,
             env=dict(role.env),
+            ntasks=ntasks,
         )
 
     def materialize(self) -> str:
         sbatch_opts = [f"#SBATCH --{key}={value}" for key, value in self.opts.items()]
+        # the values of --export are taken literally, env vars that use macros
+        # are exported by the task itself once the macros are expanded
+        macro_env = {k: v for k, v in self.env.items() if _MACRO.search(v)}
         sbatch_opts += [
-            f"#SBATCH --export={key}={value}" for key, value in self.env.items()
+            f"#SBATCH --export={key}={value}"
+            for key, value in self.env.items()
+            if key not in macro_env
         ]
         sbatch_opts_str = "\n".join(sbatch_opts)
 
         escaped_args = [_slurm_escape(arg) for arg in self.args]
 
+        srun_opts = f"--chdir={self.dir}"
+        if self.output:
+            # srun resolves relative paths against --chdir, the batch script
+            # runs in the working directory of the job
+            srun_opts += f' --output="$PWD"/{_slurm_escape(self.output)}'
+
+        cmd = f"{self.entrypoint} {' '.join(escaped_args)}"
+        if self.ntasks > 1:
+            srun_opts += f" --ntasks={self.ntasks}"
+        if self.ntasks > 1 or macro_env:
+            # the tasks expand the macros in their own env (e.g. SLURM_PROCID)
+            exports = "".join(
+                f"export {key}={_slurm_escape(value)}; "
+                for key, value in macro_env.items()
+            )
+            cmd = f"sh -c {shlex.quote(exports + 'exec ' + cmd)}"
+
         return f"""#!/bin/sh
 {sbatch_opts_str}
 
 # exit on error
 set -e
 
-srun --chdir={self.dir} {self.entrypoint} {" ".join(escaped_args)}
+srun {srun_opts} {cmd}
 """
 
 
@@ -123,12 +379,34 @@ class SlurmScheduler(Scheduler):
     Each app def is scheduled using a heterogenous job via sbatch.
     Each replica of each role has a unique shell script generated with it's
     resource allocations and args and then sbatch is used to launch all of them
-    together.
-
-    Logs are written to the default slurm log file.
+    together. A single script is passed to sbatch through stdin. The scripts are
+    also kept in ``script_cache_dir`` (defaults to
+    ``~/.cache/torchx/slurm/scripts``), named by their sha256, for reference.
+    Scripts that were not submitted for 30 days are pruned, as are the least
+    recently submitted ones once the cache has more than 1000 scripts.
+
+    The output of each replica is written to ``slurm-{app_id}-{role}-{k}.out``
+    in the working directory of the job (the directory the app was submitted
+    from) and can be read (and followed while the job runs) with ``log_iter``
+    (``torchx log``) from any host that has that directory mounted. The line
+    indices used to seek in the logs are kept in ``~/.cache/torchx/slurm/log_index``.
 
     Any scheduler options passed to it are added as SBATCH arguments to each replica.
 
+    With the ``homogeneous`` option, a single role app is instead launched as one
+    ``srun --ntasks=num_replicas`` step. All replicas then share one script and
+    ``macros.replica_id`` is filled in from each task's ``SLURM_PROCID``.
+
+    Job states are queried with ``squeue`` for jobs that are still pending or
+    running and with ``sacct`` (which queries the accounting database) only for
+    the jobs that have left the queue, with one invocation for many jobs (see
+    ``describe_many``). States are cached for ``describe_cache_ttl`` seconds so
+    that polling many jobs does not overload the slurm controller. Terminal
+    states are persisted in ``state_cache_file`` (defaults to
+    ``~/.cache/torchx/slurm/job_states``, see ``torchx.util.cache``) per
+    cluster (``SLURM_CLUSTER_NAME`` or the ``ClusterName`` of
+    ``scontrol show config``) and not queried again.
+
     For more info see:
 
     * https://slurm.schedmd.com/sbatch.html
@@ -139,33 +417,139 @@ class SlurmScheduler(Scheduler):
         $ torchx run --scheduler slurm utils.echo --msg hello
         slurm://torchx_user/1234
         $ torchx status slurm://torchx_user/1234
-        $ less slurm-1234.out
+        $ torchx log slurm://torchx_user/1234/echo
         ...
     """
 
-    def __init__(self, session_name: str) -> None:
+    def __init__(
+        self,
+        session_name: str,
+        describe_cache_ttl: float = DESCRIBE_CACHE_TTL,
+        state_cache_file: Optional[str] = None,
+        script_cache_dir: Optional[str] = None,
+    ) -> None:
         super().__init__("slurm", session_name)
+        self._script_cache_dir: str = script_cache_dir or cache_dir("slurm", "scripts")
+        self._describe_cache_ttl = describe_cache_ttl
+        # job id -> (time.monotonic() when described, description)
+        self._describe_cache: Dict[str, Tuple[float, DescribeAppResponse]] = {}
+        self._describe_cache_lock = threading.Lock()
+        self._terminal_states = _TerminalStateCache(
+            state_cache_file or cache_dir("slurm", "job_states")
+        )
+        self._cluster: Optional[str] = None
+        self._cluster_lock = threading.Lock()
+        # job id -> working directory of the job
+        self._work_dirs: Dict[str, str] = {}
+
+    def _cluster_name(self) -> str:
+        """
+        Returns the name of the cluster the jobs are submitted to or an empty
+        string if it is unknown (terminal states are then not persisted).
+        """
+        with self._cluster_lock:
+            cluster = self._cluster
+            if cluster is None:
+                cluster = os.environ.get("SLURM_CLUSTER_NAME", "")
+                if not cluster:
+                    try:
+                        p = subprocess.run(
+                            ["scontrol", "show", "config"],
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE,
+                        )
+                        match = re.search(
+                            rb"^ClusterName\s*=\s*(\S+)", p.stdout, re.MULTILINE
+                        )
+                        if match:
+                            cluster = match.group(1).decode("utf-8")
+                    except OSError as e:
+                        logger.warning(f"failed to get the slurm cluster name: {e}")
+                self._cluster = cluster
+            return cluster
 
     def schedule(self, dryrun_info: AppDryRunInfo[SlurmBatchRequest]) -> str:
         req = dryrun_info.request
-        with tempfile.TemporaryDirectory() as tmpdir:
-            for i, (name, body) in enumerate(req.replicas.items()):
-                path = os.path.join(tmpdir, name)
-                with open(path, "w") as f:
-                    f.write(body.materialize())
-
+        scripts = [body.materialize() for body in req.replicas.values()]
+
+        if len(scripts) == 1:
+            # sbatch reads the (only) script from stdin, the cached copy is
+            # only kept for reference so failing to write it is not fatal
+            try:
+                path = self._cache_script(scripts[0])
+                logger.info(f"submitting slurm script: {path}")
+            except OSError as e:
+                logger.warning(f"failed to cache slurm script: {e}")
+            p = subprocess.run(
+                req.cmd,
+                input=scripts[0].encode("utf-8"),
+                stdout=subprocess.PIPE,
+                check=True,
+            )
+        else:
+            cmd = list(req.cmd)
+            for i, script in enumerate(scripts):
                 if i > 0:
-                    req.cmd.append(":")
-                req.cmd.append(path)
-
-            p = subprocess.run(req.cmd, stdout=subprocess.PIPE, check=True)
-            return p.stdout.decode("utf-8").strip()
+                    cmd.append(":")
+                cmd.append(self._cache_script(script))
+            logger.info(f"submitting slurm scripts: {cmd[len(req.cmd):]}")
+            p = subprocess.run(cmd, stdout=subprocess.PIPE, check=True)
+        job_id = p.stdout.decode("utf-8").strip()
+        cluster = self._cluster_name()
+        if cluster:
+            # the job id may have been used by a job before the ids wrapped
+            self._terminal_states.forget(cluster, job_id)
+        return job_id
+
+    def _cache_script(self, script: str) -> str:
+        """
+        Returns the path of the script in the script cache, which is keyed by
+        the sha256 of the script so that resubmitting identical scripts does not
+        write them again and every script that was submitted can be audited.
+        """
+        digest = hashlib.sha256(script.encode("utf-8")).hexdigest()
+        path = os.path.join(self._script_cache_dir, f"{digest}.sh")
+        try:
+            # marks the script as recently submitted so that it is not pruned
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(self._script_cache_dir, exist_ok=True)
+            # written under a temporary name so that the cache never has
+            # partially written scripts
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_path, "w") as f:
+                f.write(script)
+            os.replace(tmp_path, path)
+            prune(
+                self._script_cache_dir, SCRIPT_CACHE_MAX_ENTRIES, SCRIPT_CACHE_MAX_AGE
+            )
+        return path
 
     def _submit_dryrun(
         self, app: AppDef, cfg: RunConfig
     ) -> AppDryRunInfo[SlurmBatchRequest]:
         cmd = ["sbatch", "--parsable", "--job-name", app.name]
         replicas = {}
+        if cfg.get("homogeneous"):
+            if len(app.roles) != 1:
+                raise ValueError(
+                    f"homogeneous slurm jobs must have a single role,"
+                    f" {app.name} has {len(app.roles)}"
+                )
+            role = app.roles[0]
+            values = macros.Values(
+                img_root=role.image,
+                app_id=macros.app_id,
+                replica_id=macros.replica_id,
+            )
+            replica = SlurmReplicaRequest.from_role(
+                values.apply(role), cfg, ntasks=role.num_replicas
+            )
+            # srun substitutes %t with the task id (the replica id)
+            replica.output = _log_file(macros.app_id, role.name, "%t")
+            replicas[f"role-0-{role.name}.sh"] = replica
+            return AppDryRunInfo(SlurmBatchRequest(cmd=cmd, replicas=replicas), repr)
+
         for i, role in enumerate(app.roles):
             for replica_id in range(role.num_replicas):
                 values = macros.Values(
@@ -175,47 +559,227 @@ class SlurmScheduler(Scheduler):
                 )
                 name = f"role-{i}-{role.name}-{replica_id}.sh"
                 replica_role = values.apply(role)
-                replicas[name] = SlurmReplicaRequest.from_role(replica_role, cfg)
+                replica = SlurmReplicaRequest.from_role(replica_role, cfg)
+                replica.output = _log_file(macros.app_id, role.name, replica_id)
+                replicas[name] = replica
         req = SlurmBatchRequest(
             cmd=cmd,
             replicas=replicas,
         )
         return AppDryRunInfo(req, repr)
 
+    def run_opts(self) -> runopts:
+        opts = runopts()
+        opts.add(
+            "homogeneous",
+            type_=bool,
+            default=False,
+            help="run the replicas of a single role app as the tasks of one srun"
+            " step (with the replica id taken from SLURM_PROCID) rather than as"
+            " the components of a heterogeneous job."
+            " Other options are passed to sbatch as --key=value",
+        )
+        return opts
+
     def _validate(self, app: AppDef, scheduler: SchedulerBackend) -> None:
         # Skip validation step for slurm
         pass
 
     def _cancel_existing(self, app_id: str) -> None:
         subprocess.run(["scancel", app_id], check=True)
+        with self._describe_cache_lock:
+            self._describe_cache.pop(app_id, None)
 
     def describe(self, app_id: str) -> Optional[DescribeAppResponse]:
+        return self.describe_many([app_id])[app_id]
+
+    def describe_many(
+        self, app_ids: List[str]
+    ) -> Dict[str, Optional[DescribeAppResponse]]:
+        """
+        Describes the jobs whose terminal state is not persisted and that were
+        not described in the last ``describe_cache_ttl`` seconds with a single
+        ``squeue`` invocation (per ``SACCT_MAX_JOB_IDS`` jobs), followed by a
+        single ``sacct`` invocation for the jobs that are not in the queue.
+        """
+        now = time.monotonic()
+        cluster = self._cluster_name()
+        descs: Dict[str, Optional[DescribeAppResponse]] = {}
+        if cluster:
+            for app_id in app_ids:
+                state = self._terminal_states.get(cluster, app_id)
+                if state:
+                    descs[app_id] = _describe_response(app_id, state)
+
+        with self._describe_cache_lock:
+            self._describe_cache = {
+                app_id: cached
+                for app_id, cached in self._describe_cache.items()
+                if now - cached[0] < self._describe_cache_ttl
+            }
+            for app_id in app_ids:
+                cached = self._describe_cache.get(app_id)
+                if cached and app_id not in descs:
+                    descs[app_id] = cached[1]
+
+        missing = [app_id for app_id in dict.fromkeys(app_ids) if app_id not in descs]
+        for i in range(0, len(missing), SACCT_MAX_JOB_IDS):
+            chunk = missing[i : i + SACCT_MAX_JOB_IDS]
+            described = self._squeue(chunk)
+            finished = [app_id for app_id in chunk if app_id not in described]
+            terminal_states = {}
+            if finished:
+                for app_id, (desc, submit_time) in self._sacct(finished).items():
+                    described[app_id] = desc
+                    if is_terminal(desc.state):
+                        terminal_states[app_id] = (submit_time, desc.msg)
+
+            if cluster and terminal_states:
+                self._terminal_states.put(cluster, terminal_states)
+            with self._describe_cache_lock:
+                for app_id, desc in described.items():
+                    self._describe_cache[app_id] = (now, desc)
+            descs.update(described)
+
+        return {app_id: descs.get(app_id) for app_id in app_ids}
+
+    def _squeue(self, app_ids: List[str]) -> Dict[str, DescribeAppResponse]:
+        """
+        Returns the descriptions of the given jobs that are still queued (pending
+        or running). ``squeue`` is answered from the controller's memory and is
+        much cheaper than ``sacct``. Jobs in a terminal state are left out so
+        that their final state is read from the accounting database.
+        """
         p = subprocess.run(
-            ["sacct", "--parsable2", "-j", app_id], stdout=subprocess.PIPE, check=True
+            [
+                "squeue",
+                "--noheader",
+                "--format=%i|%T",
+                "--jobs",
+                ",".join(app_ids),
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
         )
-        output = p.stdout.decode("utf-8").split("\n")
-        if len(output) <= 1:
-            return None
-
-        reader = csv.DictReader(output, delimiter="|")
-
-        resp = DescribeAppResponse(
-            app_id=app_id,
+        if p.returncode != 0:
+            # squeue fails if none of the jobs is known to the controller
+            return {}
+
+        requested = set(app_ids)
+        descs = {}
+        for line in p.stdout.decode("utf-8").split("\n"):
+            job_id, _, state = line.strip().partition("|")
+            # components of heterogeneous jobs are listed as job_id+offset
+            job_id = job_id.split("+")[0]
+            if job_id not in requested or job_id in descs:
+                continue
+            desc = _describe_response(job_id, state)
+            if not is_terminal(desc.state):
+                descs[job_id] = desc
+        return descs
+
+    def _sacct(
+        self, app_ids: List[str]
+    ) -> Dict[str, Tuple[DescribeAppResponse, float]]:
+        """
+        Returns the descriptions and submit times of the given jobs that sacct
+        knows about.
+        """
+        p = subprocess.run(
+            [
+                "sacct",
+                "--parsable2",
+                "--noheader",
+                "--format=JobID,State,Submit",
+                "-j",
+                ",".join(app_ids),
+            ],
+            stdout=subprocess.PIPE,
+            check=True,
         )
-        for row in reader:
-            if row["JobID"] == app_id:
-                state = row["State"]
-                resp.msg = state
-                state_enum = SLURM_STATES.get(state)
-                assert (
-                    state_enum
-                ), f"failed to translate slurm state {state} to torchx state"
-                resp.state = state_enum
 
-        return resp
+        requested = set(app_ids)
+        descs = {}
+        for line in p.stdout.decode("utf-8").split("\n"):
+            job_id, _, rest = line.partition("|")
+            # skips the job steps (e.g. 1234.batch)
+            if job_id not in requested:
+                continue
+            state, _, submit = rest.partition("|")
+            try:
+                submit_time = datetime.strptime(submit, SACCT_TIME_FORMAT).timestamp()
+            except ValueError:
+                # e.g. Unknown
+                submit_time = time.time()
+            descs[job_id] = (_describe_response(job_id, state), submit_time)
+        return descs
+
+    def _work_dir(self, app_id: str) -> str:
+        """
+        Returns the working directory of the job, which its log files are
+        written to.
+        """
+        work_dir = self._work_dirs.get(app_id)
+        if work_dir is None:
+            p = subprocess.run(
+                [
+                    "sacct",
+                    "--parsable2",
+                    "--noheader",
+                    "--format=JobID,WorkDir",
+                    "-j",
+                    app_id,
+                ],
+                stdout=subprocess.PIPE,
+                check=True,
+            )
+            for line in p.stdout.decode("utf-8").split("\n"):
+                job_id, _, path = line.partition("|")
+                if job_id == app_id and path:
+                    work_dir = path
+                    break
+            else:
+                raise ValueError(f"unknown working directory of slurm job {app_id}")
+            self._work_dirs[app_id] = work_dir
+        return work_dir
+
+    def log_iter(
+        self,
+        app_id: str,
+        role_name: str,
+        k: int = 0,
+        regex: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        should_tail: bool = False,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
+    ) -> Iterable[str]:
+        if since or until:
+            warnings.warn(
+                "Since and/or until times specified for SlurmScheduler.log_iter."
+                " These will be ignored and all log lines will be returned"
+            )
+
+        return LogIterator(
+            app_id,
+            regex or ".*",
+            os.path.join(self._work_dir(app_id), _log_file(app_id, role_name, k)),
+            self,
+            should_tail=should_tail,
+            tail_lines=tail_lines,
+            limit_bytes=limit_bytes,
+            index_dir=cache_dir("slurm", "log_index"),
+            # the replicas write to the log files from other hosts, which
+            # inotify does not see
+            poll_interval=LOG_POLL_INTERVAL,
+        )
 
 
 def create_scheduler(session_name: str, **kwargs: Any) -> SlurmScheduler:
     return SlurmScheduler(
         session_name=session_name,
+        describe_cache_ttl=kwargs.get("describe_cache_ttl", DESCRIBE_CACHE_TTL),
+        state_cache_file=kwargs.get("state_cache_file"),
+        script_cache_dir=kwargs.get("script_cache_dir"),
     )
@@ -6,11 +6,14 @@
 # LICENSE file in the root directory of this source tree.
 
 
+import asyncio
+import threading
 import unittest
 from datetime import datetime
-from typing import Iterable, Optional, Union
+from typing import Iterable, Iterator, List, Optional, Union
 from unittest.mock import MagicMock, patch
 
+from pyre_extensions import none_throws
 from torchx.schedulers.api import DescribeAppResponse, Scheduler
 from torchx.specs.api import (
     NULL_RESOURCE,
@@ -123,3 +126,59 @@ class SchedulerTest(unittest.TestCase):
                 exists_mock.return_value = False
                 scheduler_mock.cancel("test_id")
                 cancel_mock.assert_not_called()
+
+    def test_describe_many(self) -> None:
+        scheduler_mock = SchedulerTest.MockScheduler("test_session")
+        app_ids = [f"app_{i}" for i in range(50)]
+        with patch.object(scheduler_mock, "describe") as describe_mock:
+            describe_mock.side_effect = lambda app_id: (
+                None if app_id == "app_1" else DescribeAppResponse(app_id)
+            )
+            descs = scheduler_mock.describe_many(app_ids)
+
+        self.assertEqual(app_ids, list(descs.keys()))
+        self.assertIsNone(descs["app_1"])
+        self.assertEqual("app_2", none_throws(descs["app_2"]).app_id)
+        self.assertEqual(50, describe_mock.call_count)
+
+    def test_schedule_many(self) -> None:
+        scheduler_mock = SchedulerTest.MockScheduler("test_session")
+        dryrun_infos = []
+        for i in range(20):
+            dryrun_info = AppDryRunInfo(None, lambda t: "None")
+            dryrun_info._app = AppDef(name=f"app_{i}")
+            dryrun_infos.append(dryrun_info)
+        error = ValueError("app_1 failed")
+
+        def schedule(dryrun_info: AppDryRunInfo[None]) -> str:
+            name = none_throws(dryrun_info._app).name
+            if name == "app_1":
+                raise error
+            return name
+
+        with patch.object(scheduler_mock, "schedule", side_effect=schedule):
+            app_ids = scheduler_mock.schedule_many(dryrun_infos, max_workers=4)
+
+        self.assertEqual(
+            ["app_0", error] + [f"app_{i}" for i in range(2, 20)],
+            app_ids,
+        )
+
+    def test_log_iter_async(self) -> None:
+        scheduler_mock = SchedulerTest.MockScheduler("test_session")
+        threads = []
+
+        def log_iter(*args: object, **kwargs: object) -> Iterator[str]:
+            for line in ["foo", "bar"]:
+                threads.append(threading.current_thread().name)
+                yield line
+
+        async def log_lines() -> List[str]:
+            return [line async for line in scheduler_mock.log_iter_async("app", "a")]
+
+        with patch.object(scheduler_mock, "log_iter", side_effect=log_iter):
+            self.assertEqual(["foo", "bar"], asyncio.run(log_lines()))
+        # not read from the event loop's default executor
+        self.assertEqual(2, len(threads))
+        for name in threads:
+            self.assertTrue(name.startswith("torchx-log-iter"), name)
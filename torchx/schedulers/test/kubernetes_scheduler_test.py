@@ -6,10 +6,15 @@
 
 import importlib
 import sys
+import threading
+import time
 import unittest
-from datetime import datetime
+from datetime import datetime, timezone
+from queue import Queue
+from typing import Any, Dict, Iterator, Optional
 from unittest.mock import patch, MagicMock
 
+from pyre_extensions import none_throws
 from torchx import schedulers
 from torchx import specs
 
@@ -17,11 +22,20 @@ from torchx import specs
 from torchx.schedulers import kubernetes_scheduler
 from torchx.schedulers.api import DescribeAppResponse
 from torchx.schedulers.kubernetes_scheduler import (
+    INFORMER_SYNC_TIMEOUT,
+    _VolcanoJobInformer,
     create_scheduler,
     role_to_pod,
+    sanitize_for_serialization,
 )
 
 
+def _log_response(*chunks: bytes) -> MagicMock:
+    resp = MagicMock()
+    resp.stream.return_value = iter(chunks)
+    return resp
+
+
 def _test_app() -> specs.AppDef:
     trainer_role = specs.Role(
         name="trainer",
@@ -42,6 +56,58 @@ def _test_app() -> specs.AppDef:
     return specs.AppDef("test", roles=[trainer_role])
 
 
+class FakeVolcanoApi:
+    """
+    Stand-in for the apiserver's volcano job list and watch APIs.
+    """
+
+    def __init__(self) -> None:
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.resource_version = 0
+        self.num_lists = 0
+        # raised by list_namespaced_custom_object if set
+        self.list_error: Optional[Exception] = None
+        # watch events, None ends the watch
+        self.events: "Queue[Optional[Dict[str, Any]]]" = Queue()
+
+    def set_job(self, name: str, phase: str, notify: bool = True) -> None:
+        self.resource_version += 1
+        event_type = "MODIFIED" if name in self.jobs else "ADDED"
+        job = {
+            "metadata": {"name": name, "resourceVersion": str(self.resource_version)},
+            "status": {"state": {"phase": phase}},
+        }
+        self.jobs[name] = job
+        if notify:
+            self.events.put({"type": event_type, "object": job})
+
+    def list_namespaced_custom_object(self, **kwargs: object) -> Dict[str, Any]:
+        self.num_lists += 1
+        if self.list_error:
+            raise self.list_error
+        return {
+            "items": list(self.jobs.values()),
+            "metadata": {"resourceVersion": str(self.resource_version)},
+        }
+
+    def watch(self) -> "FakeVolcanoApi.Watch":
+        return FakeVolcanoApi.Watch(self)
+
+    class Watch:
+        def __init__(self, api: "FakeVolcanoApi") -> None:
+            self.api = api
+
+        def stream(self, fn: object, **kwargs: object) -> Iterator[Dict[str, Any]]:
+            while True:
+                event = self.api.events.get()
+                if event is None:
+                    return
+                yield event
+
+        def stop(self) -> None:
+            self.api.events.put(None)
+
+
 class KubernetesSchedulerTest(unittest.TestCase):
     def test_create_scheduler(self) -> None:
         scheduler = create_scheduler("foo")
@@ -89,6 +155,181 @@ class KubernetesSchedulerTest(unittest.TestCase):
             want,
         )
 
+    def test_app_to_resource_compact(self) -> None:
+        app = _test_app()
+        app.roles[0].num_replicas = 512
+        worker = specs.Role(
+            name="worker",
+            image="pytorch/torchx:latest",
+            entrypoint="main",
+            args=["--rank", specs.macros.replica_id],
+            num_replicas=2,
+        )
+        app.roles.append(worker)
+
+        tasks = kubernetes_scheduler.app_to_resource(app, "testqueue", compact=True)[
+            "spec"
+        ]["tasks"]
+        self.assertEqual(
+            [("trainer", 512), ("worker-0", 1), ("worker-1", 1)],
+            [(task["name"], task["replicas"]) for task in tasks],
+        )
+        self.assertEqual(
+            ["main", "--rank", "1"], tasks[2]["template"].spec.containers[0].command
+        )
+
+        tasks = kubernetes_scheduler.app_to_resource(app, "testqueue")["spec"]["tasks"]
+        self.assertEqual(514, len(tasks))
+
+    @patch("kubernetes.client.CoreV1Api.list_namespaced_pod")
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object_status")
+    def test_describe_compact(
+        self,
+        get_namespaced_custom_object_status: MagicMock,
+        list_namespaced_pod: MagicMock,
+    ) -> None:
+        get_namespaced_custom_object_status.return_value = {
+            "status": {
+                "state": {"phase": "Running"},
+                "taskStatusCount": {
+                    "trainer": {"phase": {"Running": 2, "Succeeded": 1}},
+                },
+            }
+        }
+        pods = []
+        for pod_name, phase in [
+            ("testid-trainer-2", "Succeeded"),
+            ("testid-trainer-0", "Running"),
+            ("testid-trainer-1", "Running"),
+            # a pod of another task
+            ("testid-trainer-3-0", "Running"),
+        ]:
+            pod = MagicMock()
+            pod.metadata.name = pod_name
+            pod.status.phase = phase
+            pods.append(pod)
+        list_namespaced_pod.return_value.items = pods
+        scheduler = create_scheduler("test")
+        info = none_throws(scheduler.describe("testnamespace:testid"))
+        self.assertEqual(
+            "volcano.sh/job-name=testid",
+            list_namespaced_pod.call_args[1]["label_selector"],
+        )
+        self.assertEqual(
+            [specs.Role(name="trainer", image="", num_replicas=3)], info.roles
+        )
+        self.assertEqual(
+            [
+                (0, specs.ReplicaState.RUNNING),
+                (1, specs.ReplicaState.RUNNING),
+                (2, specs.ReplicaState.SUCCEEDED),
+            ],
+            [(r.id, r.state) for r in info.roles_statuses[0].replicas],
+        )
+
+        # the pods are not listed again until the phases of the task change
+        scheduler.describe("testnamespace:testid")
+        self.assertEqual(1, list_namespaced_pod.call_count)
+
+        get_namespaced_custom_object_status.return_value["status"]["taskStatusCount"][
+            "trainer"
+        ] = {"phase": {"Running": 1, "Succeeded": 2}}
+        pods[1].status.phase = "Succeeded"
+        info = none_throws(scheduler.describe("testnamespace:testid"))
+        self.assertEqual(2, list_namespaced_pod.call_count)
+        self.assertEqual(
+            specs.ReplicaState.SUCCEEDED, info.roles_statuses[0].replicas[0].state
+        )
+
+    @patch("kubernetes.client.CoreV1Api.list_namespaced_pod")
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object_status")
+    def test_describe_compact_pods_behind(
+        self,
+        get_namespaced_custom_object_status: MagicMock,
+        list_namespaced_pod: MagicMock,
+    ) -> None:
+        get_namespaced_custom_object_status.return_value = {
+            "status": {
+                "state": {"phase": "Running"},
+                "taskStatusCount": {"trainer": {"phase": {"Running": 1}}},
+            }
+        }
+        pod = MagicMock()
+        pod.metadata.name = "testid-trainer-0"
+        pod.status.phase = "Pending"
+        list_namespaced_pod.return_value.items = [pod]
+        scheduler = create_scheduler("test")
+        for _ in range(2):
+            scheduler.describe("testnamespace:testid")
+        # the pods do not match the counted phases yet so they are not cached
+        self.assertEqual(2, list_namespaced_pod.call_count)
+
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object")
+    @patch("kubernetes.client.CoreV1Api.read_namespaced_pod_log")
+    def test_log_iter_compact(
+        self,
+        read_namespaced_pod_log: MagicMock,
+        get_namespaced_custom_object: MagicMock,
+    ) -> None:
+        get_namespaced_custom_object.return_value = {
+            "spec": {"tasks": [{"name": "role"}]}
+        }
+        read_namespaced_pod_log.return_value = _log_response(b"foo\n")
+        scheduler = create_scheduler("test")
+        lines = scheduler.log_iter(
+            app_id="testnamespace:testjob", role_name="role", k=3
+        )
+        self.assertEqual(["foo"], list(lines))
+        self.assertEqual("testjob-role-3", read_namespaced_pod_log.call_args[1]["name"])
+
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object")
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object_status")
+    @patch("kubernetes.client.CoreV1Api.read_namespaced_pod_log")
+    def test_role_name_ending_in_digit(
+        self,
+        read_namespaced_pod_log: MagicMock,
+        get_namespaced_custom_object_status: MagicMock,
+        get_namespaced_custom_object: MagicMock,
+    ) -> None:
+        app = _test_app()
+        app.roles[0].name = "trainer-2"
+        app.roles[0].num_replicas = 2
+        resource = kubernetes_scheduler.app_to_resource(app, "testqueue")
+        # the job as returned by the apiserver
+        job = sanitize_for_serialization(resource)
+        job["status"] = {
+            "state": {"phase": "Running"},
+            "taskStatusCount": {
+                "trainer-2-0": {"phase": {"Running": 1}},
+                "trainer-2-1": {"phase": {"Pending": 1}},
+            },
+        }
+        get_namespaced_custom_object_status.return_value = job
+        get_namespaced_custom_object.return_value = job
+        scheduler = create_scheduler("test")
+
+        info = none_throws(scheduler.describe("testnamespace:testjob"))
+        self.assertEqual(
+            [specs.Role(name="trainer-2", image="", num_replicas=2)], info.roles
+        )
+        self.assertEqual(
+            [(0, specs.ReplicaState.RUNNING), (1, specs.ReplicaState.PENDING)],
+            [(r.id, r.state) for r in info.roles_statuses[0].replicas],
+        )
+
+        for k in range(2):
+            read_namespaced_pod_log.return_value = _log_response(b"foo\n")
+            lines = scheduler.log_iter(
+                app_id="testnamespace:testjob", role_name="trainer-2", k=k
+            )
+            self.assertEqual(["foo"], list(lines))
+            self.assertEqual(
+                f"testjob-trainer-2-{k}-0",
+                read_namespaced_pod_log.call_args[1]["name"],
+            )
+        # the tasks of the job are only fetched once
+        get_namespaced_custom_object.assert_called_once()
+
     def test_validate(self) -> None:
         scheduler = create_scheduler("test")
         app = _test_app()
@@ -126,6 +367,10 @@ spec:
       event: PodFailed
     replicas: 1
     template:
+      metadata:
+        labels:
+          torchx.pytorch.org/replica-id: '0'
+          torchx.pytorch.org/role-name: trainer
       spec:
         containers:
         - command:
@@ -172,7 +417,111 @@ spec:
         self.assertEqual(kwargs["version"], "v1alpha1")
         self.assertEqual(kwargs["namespace"], "testnamespace")
         self.assertEqual(kwargs["plural"], "jobs")
-        self.assertEqual(kwargs["body"], info.request.resource)
+        body = kwargs["body"]
+        self.assertEqual(body["spec"], info.request.resource["spec"])
+        # the job is named before it is submitted
+        self.assertNotIn("generateName", body["metadata"])
+        self.assertTrue(body["metadata"]["name"].startswith("test-"))
+
+    @patch.object(kubernetes_scheduler, "SUBMIT_BACKOFF", 0)
+    @patch("kubernetes.client.CustomObjectsApi.create_namespaced_custom_object")
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object")
+    def test_submit_retry(
+        self,
+        get_namespaced_custom_object: MagicMock,
+        create_namespaced_custom_object: MagicMock,
+    ) -> None:
+        from kubernetes.client.rest import ApiException
+
+        # the job created by the 503-ed attempt
+        get_namespaced_custom_object.side_effect = lambda **kwargs: {
+            "metadata": create_namespaced_custom_object.call_args[1]["body"]["metadata"]
+        }
+
+        # throttled, failed (after creating the job) and then conflicting with
+        # the job created by the previous attempt
+        create_namespaced_custom_object.side_effect = [
+            ApiException(status=429, reason="Too Many Requests"),
+            ApiException(status=503, reason="Service Unavailable"),
+            ApiException(status=409, reason="Conflict"),
+        ]
+        scheduler = create_scheduler("test")
+        cfg = specs.RunConfig()
+        cfg.set("namespace", "testnamespace")
+        cfg.set("queue", "testqueue")
+        info = scheduler._submit_dryrun(_test_app(), cfg)
+        app_id = scheduler.schedule(info)
+
+        self.assertEqual(3, create_namespaced_custom_object.call_count)
+        names = {
+            call[1]["body"]["metadata"]["name"]
+            for call in create_namespaced_custom_object.call_args_list
+        }
+        self.assertEqual({app_id.split(":")[1]}, names)
+
+        # conflicting with a job that was not created by this submission
+        create_namespaced_custom_object.reset_mock()
+        create_namespaced_custom_object.side_effect = [
+            ApiException(status=503, reason="Service Unavailable"),
+            ApiException(status=409, reason="Conflict"),
+        ]
+        get_namespaced_custom_object.side_effect = None
+        get_namespaced_custom_object.return_value = {
+            "metadata": {
+                "annotations": {"torchx.pytorch.org/submission-id": "someone else"}
+            }
+        }
+        with self.assertRaises(ApiException):
+            scheduler.schedule(info)
+
+        create_namespaced_custom_object.reset_mock()
+        create_namespaced_custom_object.side_effect = ApiException(
+            status=400, reason="Bad Request"
+        )
+        with self.assertRaises(ApiException):
+            scheduler.schedule(info)
+        self.assertEqual(1, create_namespaced_custom_object.call_count)
+
+    @patch("kubernetes.client.CustomObjectsApi.create_namespaced_custom_object")
+    def test_submit_long_name(self, create_namespaced_custom_object: MagicMock) -> None:
+        create_namespaced_custom_object.side_effect = lambda **kwargs: kwargs["body"]
+        scheduler = create_scheduler("test")
+        cfg = specs.RunConfig()
+        cfg.set("namespace", "testnamespace")
+        cfg.set("queue", "testqueue")
+        app = _test_app()
+        app.name = "a" * 70
+        app_id = scheduler.schedule(scheduler._submit_dryrun(app, cfg))
+
+        # the generateName prefix is truncated like the apiserver does
+        name = app_id.split(":")[1]
+        self.assertEqual(63, len(name))
+        self.assertTrue(name.startswith("a" * 55))
+
+    @patch("kubernetes.client.CustomObjectsApi.create_namespaced_custom_object")
+    def test_schedule_many(self, create_namespaced_custom_object: MagicMock) -> None:
+        from kubernetes.client.rest import ApiException
+
+        def create(body: Dict[str, Any], **kwargs: object) -> Dict[str, Any]:
+            if body["metadata"]["name"].startswith("bad-"):
+                raise ApiException(status=403, reason="Forbidden")
+            return body
+
+        create_namespaced_custom_object.side_effect = create
+        scheduler = create_scheduler("test")
+        cfg = specs.RunConfig()
+        cfg.set("namespace", "testnamespace")
+        cfg.set("queue", "testqueue")
+        apps = [_test_app() for _ in range(10)]
+        apps[3].name = "bad"
+        infos = [scheduler._submit_dryrun(app, cfg) for app in apps]
+
+        results = scheduler.schedule_many(infos)
+        self.assertEqual(10, len(results))
+        self.assertIsInstance(results[3], ApiException)
+        for i, result in enumerate(results):
+            if i != 3:
+                self.assertRegex(str(result), r"^testnamespace:test-")
 
     @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object_status")
     def test_describe(self, get_namespaced_custom_object_status: MagicMock) -> None:
@@ -253,7 +602,9 @@ spec:
     def test_runopts(self) -> None:
         scheduler = kubernetes_scheduler.create_scheduler("foo")
         runopts = scheduler.run_opts()
-        self.assertEqual(set(runopts._opts.keys()), {"queue", "namespace"})
+        self.assertEqual(
+            set(runopts._opts.keys()), {"queue", "namespace", "compact_tasks"}
+        )
 
     @patch("kubernetes.client.CustomObjectsApi.delete_namespaced_custom_object")
     def test_cancel_existing(self, delete_namespaced_custom_object: MagicMock) -> None:
@@ -272,10 +623,19 @@ spec:
             },
         )
 
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object")
     @patch("kubernetes.client.CoreV1Api.read_namespaced_pod_log")
-    def test_log_iter(self, read_namespaced_pod_log: MagicMock) -> None:
+    def test_log_iter(
+        self,
+        read_namespaced_pod_log: MagicMock,
+        get_namespaced_custom_object: MagicMock,
+    ) -> None:
+        get_namespaced_custom_object.return_value = {
+            "spec": {"tasks": [{"name": "role-0"}, {"name": "role-1"}]}
+        }
         scheduler = create_scheduler("test")
-        read_namespaced_pod_log.return_value = "foo reg\nfoo\nbar reg\n"
+        resp = _log_response(b"foo reg\nfo", b"o\nbar reg\n")
+        read_namespaced_pod_log.return_value = resp
         lines = scheduler.log_iter(
             app_id="testnamespace:testjob",
             role_name="role",
@@ -300,8 +660,212 @@ spec:
                 "namespace": "testnamespace",
                 "name": "testjob-role-1-0",
                 "timestamps": True,
+                "_preload_content": False,
             },
         )
+        resp.release_conn.assert_called_once()
+
+    def test_split_log_timestamp(self) -> None:
+        split = kubernetes_scheduler._split_log_timestamp
+        self.assertEqual(
+            (datetime(2021, 10, 18, 12, 0, 1, 123456, tzinfo=timezone.utc), "foo"),
+            split("2021-10-18T12:00:01.123456789Z foo"),
+        )
+        self.assertEqual(
+            (datetime(2021, 10, 18, 11, 0, 1, 500000, tzinfo=timezone.utc), " bar"),
+            split("2021-10-18T12:00:01.5+01:00  bar"),
+        )
+        self.assertEqual((None, "foo"), split("foo"))
+
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object")
+    @patch("kubernetes.client.CoreV1Api.read_namespaced_pod_log")
+    def test_log_iter_since_until(
+        self,
+        read_namespaced_pod_log: MagicMock,
+        get_namespaced_custom_object: MagicMock,
+    ) -> None:
+        get_namespaced_custom_object.return_value = {"spec": {"tasks": []}}
+        resp = _log_response(
+            b"2021-10-18T12:00:01.000000001Z a\n",
+            b"2021-10-18T12:00:02.000000001Z b\n",
+            b"2021-10-18T12:00:03.000000001Z c\n",
+            b"2021-10-18T12:00:04.000000001Z d\n",
+        )
+        read_namespaced_pod_log.return_value = resp
+        scheduler = create_scheduler("test")
+        lines = scheduler.log_iter(
+            app_id="testnamespace:testjob",
+            role_name="role",
+            since=datetime(2021, 10, 18, 12, 0, 2, tzinfo=timezone.utc),
+            until=datetime(2021, 10, 18, 12, 0, 3, 500000, tzinfo=timezone.utc),
+            tail_lines=10,
+            limit_bytes=1024,
+            regex="^[a-c]$",
+        )
+        # the timestamps are stripped (before the regex is matched)
+        self.assertEqual(["b", "c"], list(lines))
+        resp.release_conn.assert_called_once()
+        kwargs = read_namespaced_pod_log.call_args[1]
+        self.assertEqual(10, kwargs["tail_lines"])
+        self.assertEqual(1024, kwargs["limit_bytes"])
+        self.assertGreaterEqual(kwargs["since_seconds"], 1)
+
+    @patch.object(kubernetes_scheduler, "LOG_RECONNECT_INTERVAL", 0)
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object")
+    @patch("kubernetes.client.CoreV1Api.read_namespaced_pod")
+    @patch("kubernetes.client.CoreV1Api.read_namespaced_pod_log")
+    def test_log_iter_tail_reconnect(
+        self,
+        read_namespaced_pod_log: MagicMock,
+        read_namespaced_pod: MagicMock,
+        get_namespaced_custom_object: MagicMock,
+    ) -> None:
+        from urllib3.exceptions import ProtocolError
+
+        get_namespaced_custom_object.return_value = {"spec": {"tasks": []}}
+
+        def dropped() -> Iterator[bytes]:
+            yield b"2021-10-18T12:00:01Z a\n2021-10-18T12:00:02Z b\n"
+            yield b"2021-10-18T12:00:02Z c\n2021-10-18T12:00:0"
+            raise ProtocolError("connection reset")
+
+        first = MagicMock()
+        first.stream.return_value = dropped()
+        second = _log_response(
+            b"2021-10-18T12:00:02Z b\n2021-10-18T12:00:02Z c\n",
+            b"2021-10-18T12:00:02Z d\n2021-10-18T12:00:03Z e\n",
+        )
+        read_namespaced_pod_log.side_effect = [first, second]
+        running, succeeded = MagicMock(), MagicMock()
+        running.status.phase = "Running"
+        succeeded.status.phase = "Succeeded"
+        read_namespaced_pod.side_effect = [running, succeeded]
+
+        scheduler = create_scheduler("test")
+        lines = scheduler.log_iter(
+            app_id="testnamespace:testjob",
+            role_name="role",
+            should_tail=True,
+            tail_lines=10,
+        )
+        self.assertEqual(["a", "b", "c", "d", "e"], list(lines))
+        first_call, second_call = read_namespaced_pod_log.call_args_list
+        self.assertTrue(first_call[1]["follow"])
+        self.assertEqual(10, first_call[1]["tail_lines"])
+        self.assertNotIn("tail_lines", second_call[1])
+        # includes the slack for the skew between the local and apiserver clocks
+        self.assertGreater(
+            second_call[1]["since_seconds"], kubernetes_scheduler.LOG_CLOCK_SKEW_SLACK
+        )
+        first.release_conn.assert_called_once()
+
+    def test_iter_lines(self) -> None:
+        chunks = [b"foo\nb", b"ar\n\n", "héllo".encode("utf-8")[:2]]
+        chunks.append("héllo".encode("utf-8")[2:])
+        self.assertEqual(
+            ["foo", "bar", "", "héllo"], list(kubernetes_scheduler._iter_lines(chunks))
+        )
+
+    @patch("kubernetes.config.load_kube_config")
+    def test_api_client_reused(self, load_kube_config: MagicMock) -> None:
+        scheduler = create_scheduler("test", connection_pool_maxsize=32)
+        api_client = scheduler._api_client()
+        self.assertIs(api_client, scheduler._api_client())
+        self.assertEqual(32, api_client.configuration.connection_pool_maxsize)
+        self.assertIs(scheduler._custom_objects_api(), scheduler._custom_objects_api())
+        self.assertIs(api_client, scheduler._custom_objects_api().api_client)
+        self.assertIs(scheduler._core_v1_api(), scheduler._core_v1_api())
+        self.assertIs(api_client, scheduler._core_v1_api().api_client)
+        load_kube_config.assert_called_once()
+
+        self.assertIs(
+            kubernetes_scheduler._serialization_client(),
+            kubernetes_scheduler._serialization_client(),
+        )
+
+    def test_informer(self) -> None:
+        api = FakeVolcanoApi()
+        api.set_job("job1", "Running")
+        informer = _VolcanoJobInformer(api, "testnamespace", api.watch)
+        informer.start()
+        self.assertTrue(informer.wait_for_sync(timeout=10))
+        self.assertEqual(
+            "Running", none_throws(informer.get("job1"))["status"]["state"]["phase"]
+        )
+        self.assertIsNone(informer.get("job2"))
+
+        # waiters are woken up by the watch events
+        threading.Timer(0.1, lambda: api.set_job("job1", "Completed")).start()
+        start = time.monotonic()
+        informer.wait_for_change("job1", timeout=30)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(
+            "Completed", none_throws(informer.get("job1"))["status"]["state"]["phase"]
+        )
+
+        # the jobs are listed again when the watch fails
+        api.set_job("job2", "Pending", notify=False)
+        error = {"type": "ERROR", "object": {"code": 410}}
+        threading.Timer(0.1, lambda: api.events.put(error)).start()
+        informer.wait_for_change("job2", timeout=30)
+        self.assertIsNotNone(informer.get("job2"))
+        self.assertEqual(2, api.num_lists)
+
+        informer.stop()
+
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object_status")
+    def test_describe_informer(
+        self, get_namespaced_custom_object_status: MagicMock
+    ) -> None:
+        api = FakeVolcanoApi()
+        api.set_job("testid", "Running")
+        get_namespaced_custom_object_status.return_value = {
+            "status": {"state": {"phase": "Pending"}}
+        }
+        scheduler = create_scheduler("test", use_informer=True)
+        informer = _VolcanoJobInformer(api, "testnamespace", api.watch)
+        informer.start()
+        scheduler._informers["testnamespace"] = informer
+
+        info = none_throws(scheduler.describe("testnamespace:testid"))
+        self.assertEqual(specs.AppState.RUNNING, info.state)
+        get_namespaced_custom_object_status.assert_not_called()
+
+        # not watched yet
+        info = none_throws(scheduler.describe("testnamespace:newid"))
+        self.assertEqual(specs.AppState.PENDING, info.state)
+        get_namespaced_custom_object_status.assert_called_once()
+
+        threading.Timer(0.1, lambda: api.set_job("testid", "Completed")).start()
+        scheduler._wait_for_state_change("testnamespace:testid", timeout=30)
+        info = none_throws(scheduler.describe("testnamespace:testid"))
+        self.assertEqual(specs.AppState.SUCCEEDED, info.state)
+        informer.stop()
+
+    @patch("kubernetes.client.CustomObjectsApi.get_namespaced_custom_object_status")
+    def test_describe_informer_failed(
+        self, get_namespaced_custom_object_status: MagicMock
+    ) -> None:
+        api = FakeVolcanoApi()
+        api.list_error = RuntimeError("forbidden")
+        get_namespaced_custom_object_status.return_value = {
+            "status": {"state": {"phase": "Running"}}
+        }
+        scheduler = create_scheduler("test", use_informer=True)
+        informer = _VolcanoJobInformer(api, "testnamespace", api.watch)
+        informer.start()
+        scheduler._informers["testnamespace"] = informer
+
+        # the first describe stops waiting as soon as listing the jobs fails
+        # and later ones fall back to a GET without waiting at all
+        start = time.monotonic()
+        for _ in range(3):
+            info = none_throws(scheduler.describe("testnamespace:testid"))
+            self.assertEqual(specs.AppState.RUNNING, info.state)
+        self.assertLess(time.monotonic() - start, INFORMER_SYNC_TIMEOUT)
+        self.assertEqual(3, get_namespaced_custom_object_status.call_count)
+        self.assertFalse(informer.synced)
+        informer.stop()
 
 
 class KubernetesSchedulerNoImportTest(unittest.TestCase):
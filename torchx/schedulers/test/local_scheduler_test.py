@@ -5,16 +5,20 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
+import asyncio
 import json
 import os
 import shutil
+import signal
 import subprocess
+import sys
 import tempfile
+import threading
 import time
 import unittest
 from datetime import datetime
 from os.path import join
-from typing import Optional
+from typing import List, Optional
 from unittest import mock
 from unittest.mock import MagicMock, call, patch
 
@@ -24,8 +28,11 @@ from torchx.schedulers.local_scheduler import (
     DockerImageProvider,
     LocalDirectoryImageProvider,
     LocalScheduler,
+    ReplicaParam,
+    _LocalAppDef,
     make_unique,
 )
+from torchx.schedulers.log_iterator import LogIterator, LogTimestamps
 from torchx.specs.api import (
     AppDef,
     AppState,
@@ -137,6 +144,17 @@ class LocalSchedulerTest(unittest.TestCase):
             ["for i in $(seq 0 $1); do echo $i 1>&2; sleep $2; done"],
         )
         write_shell_script(self.test_dir, "echo_env_foo.sh", ["echo $FOO 1>&2"])
+        write_shell_script(self.test_dir, "echo_seq.sh", ["seq 0 $1 1>&2"])
+        write_shell_script(
+            self.test_dir,
+            "echo_partial.sh",
+            ["printf foo 1>&2", "sleep 0.5", "echo bar 1>&2", "printf baz 1>&2"],
+        )
+        write_shell_script(
+            self.test_dir,
+            "echo_abc.sh",
+            ["echo a 1>&2", "sleep 0.5", "echo b 1>&2", "sleep 0.5", "echo c 1>&2"],
+        )
         self.scheduler = LocalScheduler(session_name="test_session")
 
     def wait(
@@ -209,6 +227,109 @@ class LocalSchedulerTest(unittest.TestCase):
         self.assertEqual(f"{expected_app_id}", app_id)
         self.assertEqual(AppState.FAILED, desc.state)
 
+    def test_submit_many_replicas(self) -> None:
+        num_replicas = 16
+        role = Role(
+            "role1",
+            image=self.test_dir,
+            entrypoint="touch.sh",
+            args=[join(self.test_dir, f"test_file_{macros.replica_id}")],
+            num_replicas=num_replicas,
+        )
+        app = AppDef(name="test_app", roles=[role])
+        cfg = RunConfig({"log_dir": self.test_dir})
+        app_id = self.scheduler.submit(app, cfg)
+
+        desc = self.wait(app_id)
+        assert desc is not None
+        self.assertEqual(AppState.SUCCEEDED, desc.state)
+        for i in range(num_replicas):
+            self.assertTrue(os.path.isfile(join(self.test_dir, f"test_file_{i}")))
+
+        local_app = self.scheduler._apps[app_id]
+        # replicas are added in launch order regardless of which forked first
+        replica_ids = [r.replica_id for r in local_app.role_replicas["role1"]]
+        self.assertEqual(list(range(num_replicas)), replica_ids)
+        with open(join(local_app.log_dir, "SUCCESS"), "r") as f:
+            self.assertGreater(json.load(f)["launch_latency"], 0)
+
+    def test_submit_from_exited_thread(self) -> None:
+        role = Role("role1", image=self.test_dir, entrypoint="sleep.sh", args=["2"])
+        app = AppDef(name="test_app", roles=[role])
+        app_ids = []
+
+        def submit() -> None:
+            app_ids.append(self.scheduler.submit(app, RunConfig()))
+            # exits while the replica is running
+            time.sleep(0.5)
+
+        thread = threading.Thread(target=submit)
+        thread.start()
+        thread.join()
+
+        # the replica outlives the (exited) thread that scheduled it
+        desc = self.wait(app_ids[0])
+        assert desc is not None
+        self.assertEqual(AppState.SUCCEEDED, desc.state)
+
+    def test_schedule_async_and_many(self) -> None:
+        role = Role("role1", image=self.test_dir, entrypoint="sleep.sh", args=["2"])
+        app = AppDef(name="test_app", roles=[role])
+
+        async def schedule() -> str:
+            dryrun_info = self.scheduler.submit_dryrun(app, RunConfig())
+            return await self.scheduler.schedule_async(dryrun_info)
+
+        # scheduled from the (default executor and schedule_many pool) threads
+        # that exit while the replicas are running
+        app_ids = [asyncio.run(schedule())]
+        dryrun_infos = [
+            self.scheduler.submit_dryrun(app, RunConfig()) for _ in range(2)
+        ]
+        app_ids += self.scheduler.schedule_many(dryrun_infos)
+        for app_id in app_ids:
+            assert isinstance(app_id, str)
+            desc = self.wait(app_id)
+            assert desc is not None
+            self.assertEqual(AppState.SUCCEEDED, desc.state)
+
+    @patch("subprocess.Popen")
+    def test_submit_launch_failure(self, popen_mock: MagicMock) -> None:
+        launched = MagicMock()
+        popen_mock.side_effect = [launched, OSError("fork failed")]
+        role = Role("role1", image=self.test_dir, entrypoint="touch.sh", num_replicas=2)
+        app = AppDef(name="test_app", roles=[role])
+        cfg = RunConfig({"log_dir": self.test_dir})
+
+        with self.assertRaises(OSError):
+            self.scheduler.submit(app, cfg)
+        # the replica that did launch is cleaned up
+        launched.terminate.assert_called_once()
+        self.assertEqual(0, len(self.scheduler._apps))
+
+    @unittest.skipUnless(sys.platform == "linux", "PR_SET_PDEATHSIG is linux only")
+    def test_popen_pdeathsig(self) -> None:
+        # prints the replica's PR_GET_PDEATHSIG
+        prog = (
+            "import ctypes; sig = ctypes.c_int();"
+            " ctypes.CDLL('libc.so.6').prctl(2, ctypes.byref(sig)); print(sig.value)"
+        )
+        params = ReplicaParam(
+            [sys.executable, "-c", prog],
+            {"TORCHELASTIC_ERROR_FILE": join(self.test_dir, "error.json")},
+            stdout=None,
+            stderr=None,
+        )
+        out_file = join(self.test_dir, "pdeathsig.out")
+        with open(out_file, "w") as stdout:
+            with patch("subprocess.Popen", wraps=subprocess.Popen) as popen_mock:
+                replica = self.scheduler._popen("role1", 0, params, stdout, None)
+                self.assertEqual(0, replica.proc.wait())
+        # set between fork and exec rather than by an extra (wrapper) process
+        self.assertEqual(params.args, popen_mock.call_args[1]["args"])
+        with open(out_file, "r") as f:
+            self.assertEqual(str(int(signal.SIGTERM)), f.read().strip())
+
     def test_macros_env(self) -> None:
         # make sure the macro substitution works
         # touch a file called {app_id}_{replica_id} in the img_root directory (self.test_dir)
@@ -450,6 +571,111 @@ class LocalSchedulerTest(unittest.TestCase):
         ):
             self.assertEqual(str(i * 2), line)
 
+    def test_log_iterator_exhausted(self) -> None:
+        role = Role("role1", image=self.test_dir, entrypoint="echo_seq.sh", args=["9"])
+        cfg = RunConfig({"log_dir": join(self.test_dir, "log")})
+        app = AppDef(name="test_app", roles=[role])
+        app_id = self.scheduler.submit(app, cfg)
+        self.wait(app_id)
+
+        log_iter = self.scheduler.log_iter(app_id, "role1", k=0)
+        self.assertEqual([str(i) for i in range(10)], list(log_iter))
+        # an exhausted iterator stays exhausted
+        with self.assertRaises(StopIteration):
+            next(log_iter)
+        self.assertEqual([], list(log_iter))
+        # seeking reopens the log file
+        self.assertEqual("5", log_iter[5])
+
+    def test_log_iterator_partial_lines(self) -> None:
+        role = Role("role1", image=self.test_dir, entrypoint="echo_partial.sh")
+        cfg = RunConfig({"log_dir": join(self.test_dir, "log")})
+        app = AppDef(name="test_app", roles=[role])
+        app_id = self.scheduler.submit(app, cfg)
+
+        # lines written in multiple writes are only returned once complete
+        # and the last line is returned even if it is not newline terminated
+        self.assertEqual(
+            ["foobar", "baz"], list(self.scheduler.log_iter(app_id, "role1", k=0))
+        )
+
+    def test_log_iterator_seek(self) -> None:
+        role = Role(
+            "role1", image=self.test_dir, entrypoint="echo_seq.sh", args=["4999"]
+        )
+        cfg = RunConfig({"log_dir": join(self.test_dir, "log")})
+        app = AppDef(name="test_app", roles=[role])
+        app_id = self.scheduler.submit(app, cfg)
+        self.wait(app_id)
+
+        log_iter = self.scheduler.log_iter(app_id, "role1", k=0)
+        self.assertEqual("3000", log_iter[3000])
+        self.assertEqual("3001", next(log_iter))
+        # backwards
+        self.assertEqual("5", log_iter[5])
+        log_iter.seek(4000)
+        self.assertEqual([str(i) for i in range(4000, 5000)], list(log_iter))
+
+        # the index is saved once the log has been fully read
+        local_app = self.scheduler._apps[app_id]
+        log_file = join(local_app.log_dir, "role1", "0", "stderr.log")
+        self.assertTrue(os.path.isfile(f"{log_file}.idx"))
+
+        log_iter = self.scheduler.log_iter(app_id, "role1", k=0, regex="4.99")
+        self.assertEqual("4099", log_iter[2050])
+        self.assertEqual("4199", next(log_iter))
+        with self.assertRaises(IndexError):
+            log_iter[5000]
+
+    def test_log_iterator_tail_lines_limit_bytes(self) -> None:
+        role = Role(
+            "role1", image=self.test_dir, entrypoint="echo_seq.sh", args=["4999"]
+        )
+        cfg = RunConfig({"log_dir": join(self.test_dir, "log")})
+        app = AppDef(name="test_app", roles=[role])
+        app_id = self.scheduler.submit(app, cfg)
+        self.wait(app_id)
+
+        def log_lines(**kwargs: int) -> List[str]:
+            return list(self.scheduler.log_iter(app_id, "role1", k=0, **kwargs))
+
+        # small chunks so that the tail spans several (backward) reads
+        with patch.object(LogIterator, "CHUNK_SIZE", 16):
+            self.assertEqual(["4997", "4998", "4999"], log_lines(tail_lines=3))
+            self.assertEqual([str(i) for i in range(5000)], log_lines(tail_lines=10000))
+            self.assertEqual([], log_lines(tail_lines=0))
+        # "0\n" to "4\n" are 10 bytes
+        self.assertEqual(["0", "1", "2", "3", "4"], log_lines(limit_bytes=10))
+        self.assertEqual(["4998"], log_lines(tail_lines=2, limit_bytes=5))
+
+        log_iter = self.scheduler.log_iter(app_id, "role1", k=0, tail_lines=10)
+        self.assertEqual("4992", log_iter[2])
+
+    def test_log_iterator_since_until(self) -> None:
+        role = Role("role1", image=self.test_dir, entrypoint="echo_abc.sh")
+        cfg = RunConfig({"log_dir": join(self.test_dir, "log"), "timestamp_logs": True})
+        app = AppDef(name="test_app", roles=[role])
+        app_id = self.scheduler.submit(app, cfg)
+        self.wait(app_id)
+
+        local_app = self.scheduler._apps[app_id]
+        log_file = join(local_app.log_dir, "role1", "0", "stderr.log")
+        with open(LogTimestamps(log_file).path, "rb") as f:
+            records = list(LogTimestamps.RECORD.iter_unpack(f.read()))
+        # a, b and c are written ~0.5s apart
+        self.assertEqual([2, 4, 6], [size for _, size in records])
+        (t_a, _), (t_b, _), (t_c, _) = records
+        before_b = datetime.fromtimestamp((t_a + t_b) / 2)
+        after_b = datetime.fromtimestamp((t_b + t_c) / 2)
+
+        def log_lines(**kwargs: Optional[datetime]) -> List[str]:
+            return list(self.scheduler.log_iter(app_id, "role1", k=0, **kwargs))
+
+        self.assertEqual(["b", "c"], log_lines(since=before_b))
+        self.assertEqual(["a", "b"], log_lines(until=after_b))
+        self.assertEqual(["b"], log_lines(since=before_b, until=after_b))
+        self.assertEqual([], log_lines(since=datetime.now()))
+
     def test_log_iterator_no_log_dir(self) -> None:
         role = Role(
             "role1",
@@ -530,6 +756,64 @@ class LocalSchedulerTest(unittest.TestCase):
         assert desc is not None
         self.assertEqual(AppState.CANCELLED, desc.state)
 
+    def test_reaper_finishes_app(self) -> None:
+        role = Role(
+            "role1",
+            image=self.test_dir,
+            entrypoint="sleep.sh",
+            args=["0.5"],
+            num_replicas=2,
+        )
+        app = AppDef(name="test_app", roles=[role])
+        cfg = RunConfig({"log_dir": self.test_dir})
+        app_id = self.scheduler.submit(app, cfg)
+
+        # the state is updated by the reaper without anyone calling describe()
+        local_app = self.scheduler._apps[app_id]
+        self.scheduler._wait_for_state_change(app_id, timeout=30)
+        self.assertEqual(AppState.SUCCEEDED, local_app.state)
+        self.assertTrue(os.path.isfile(join(local_app.log_dir, "SUCCESS")))
+
+        # a subsequent describe should not poll the replicas
+        with patch("subprocess.Popen.poll") as poll_mock:
+            desc = self.scheduler.describe(app_id)
+            assert desc is not None
+            self.assertEqual(AppState.SUCCEEDED, desc.state)
+            poll_mock.assert_not_called()
+
+    def test_wait_for_state_change_timeout(self) -> None:
+        role = Role(
+            "role1",
+            image=self.test_dir,
+            entrypoint="sleep.sh",
+            args=["10"],
+            num_replicas=1,
+        )
+        app = AppDef(name="test_app", roles=[role])
+        cfg = RunConfig({"log_dir": self.test_dir})
+        app_id = self.scheduler.submit(app, cfg)
+
+        self.scheduler._wait_for_state_change(app_id, timeout=0.1)
+        desc = self.scheduler.describe(app_id)
+        assert desc is not None
+        self.assertEqual(AppState.RUNNING, desc.state)
+        self.scheduler.cancel(app_id)
+        # unknown apps return immediately
+        self.scheduler._wait_for_state_change("unknown_app", timeout=30)
+
+    def test_cancel_finished_app(self) -> None:
+        role = Role("role1", image=self.test_dir, entrypoint="fail.sh")
+        app = AppDef(name="test_app", roles=[role])
+        cfg = RunConfig({"log_dir": self.test_dir})
+        app_id = self.scheduler.submit(app, cfg)
+        self.wait(app_id)
+
+        # cancelling an app that already finished leaves its final state as is
+        self.scheduler.cancel(app_id)
+        desc = self.scheduler.describe(app_id)
+        assert desc is not None
+        self.assertEqual(AppState.FAILED, desc.state)
+
     def test_exists(self) -> None:
         role = Role(
             "role1",
@@ -568,6 +852,23 @@ class LocalSchedulerTest(unittest.TestCase):
         with self.assertRaises(IndexError):
             scheduler.submit(app, cfg)
 
+    def test_cache_evict_after_wait(self) -> None:
+        scheduler = LocalScheduler(session_name="test_session", cache_size=1)
+        role = Role("role1", image=self.test_dir, entrypoint="sleep.sh", args=["0"])
+        app = AppDef(name="test_app", roles=[role])
+        cfg = RunConfig({"log_dir": self.test_dir})
+        mark_terminal = scheduler._apps.mark_terminal
+
+        def slow_mark_terminal(local_app: _LocalAppDef) -> None:
+            time.sleep(0.5)
+            mark_terminal(local_app)
+
+        with patch.object(scheduler._apps, "mark_terminal", slow_mark_terminal):
+            app_id = scheduler.submit(app, cfg)
+            self.assertTrue(scheduler._apps[app_id].wait(timeout=30))
+            # the finished app is evictable as soon as waiting for it returns
+            scheduler.submit(app, cfg)
+
     def test_cache_evict(self) -> None:
         scheduler = LocalScheduler(session_name="test_session", cache_size=1)
         test_file1 = join(self.test_dir, "test_file_1")
@@ -600,6 +901,47 @@ class LocalSchedulerTest(unittest.TestCase):
         self.assertIsNotNone(scheduler.describe(app_id2))
         self.assertIsNotNone(self.wait(app_id2, scheduler))
 
+    def test_cache_evict_lru(self) -> None:
+        scheduler = LocalScheduler(session_name="test_session", cache_size=2)
+        role = Role(
+            "role1", image=self.test_dir, entrypoint="touch.sh", args=["/dev/null"]
+        )
+        app = AppDef(name="touch_dev_null", roles=[role])
+        cfg = RunConfig({"log_dir": self.test_dir})
+
+        app_id1 = scheduler.submit(app, cfg)
+        self.wait(app_id1, scheduler)
+        app_id2 = scheduler.submit(app, cfg)
+        self.wait(app_id2, scheduler)
+
+        # app1 finished first but was used more recently than app2
+        self.assertIsNotNone(scheduler.describe(app_id1))
+        app_id3 = scheduler.submit(app, cfg)
+        self.wait(app_id3, scheduler)
+
+        self.assertIsNotNone(scheduler.describe(app_id1))
+        self.assertIsNone(scheduler.describe(app_id2))
+        self.assertIsNotNone(scheduler.describe(app_id3))
+
+    def test_cache_does_not_evict_running(self) -> None:
+        scheduler = LocalScheduler(session_name="test_session", cache_size=2)
+        sleep = Role("sleep", image=self.test_dir, entrypoint="sleep.sh", args=["10"])
+        touch = Role(
+            "touch", image=self.test_dir, entrypoint="touch.sh", args=["/dev/null"]
+        )
+        cfg = RunConfig({"log_dir": self.test_dir})
+
+        sleep_app_id = scheduler.submit(AppDef(name="sleep", roles=[sleep]), cfg)
+        touch_app_id = scheduler.submit(AppDef(name="touch", roles=[touch]), cfg)
+        self.wait(touch_app_id, scheduler)
+
+        # only the finished app can be evicted, even though it was used last
+        touch_app_id2 = scheduler.submit(AppDef(name="touch", roles=[touch]), cfg)
+        self.wait(touch_app_id2, scheduler)
+        self.assertIsNone(scheduler.describe(touch_app_id))
+        self.assertIsNotNone(scheduler.describe(sleep_app_id))
+        scheduler.cancel(sleep_app_id)
+
     def _docker_app(self, entrypoint: str, *args: str) -> AppDef:
         return binary_component(
             name="test-app",
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from os.path import join
+from unittest.mock import MagicMock, patch
+
+from torchx.schedulers.api import DescribeAppResponse
+from torchx.schedulers.log_iterator import (
+    FileWatcher,
+    LineIndex,
+    LogIterator,
+    LogTimestamps,
+)
+from torchx.specs.api import AppState
+
+
+class LogIteratorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = tempfile.mkdtemp("torchx_log_iterator_test")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_file_watcher(self) -> None:
+        log_file = join(self.test_dir, "watched.log")
+        with open(log_file, "w") as f:
+            watcher = FileWatcher(log_file)
+            threading.Timer(0.1, lambda: f.write("foo") and f.flush()).start()
+            start = time.monotonic()
+            watcher.wait(timeout=10)
+            self.assertLess(time.monotonic() - start, 5)
+            watcher.close()
+
+    def test_log_timestamps(self) -> None:
+        log_file = join(self.test_dir, "timestamped.log")
+        timestamps = LogTimestamps(log_file)
+        with open(timestamps.path, "wb") as f:
+            for ts, size in [(1.0, 10), (2.0, 20), (2.0, 25), (3.0, 30)]:
+                f.write(LogTimestamps.RECORD.pack(ts, size))
+            # partially written record
+            f.write(b"\0")
+
+        self.assertEqual(0, timestamps.size_at(0.5))
+        self.assertEqual(10, timestamps.size_at(1.5))
+        self.assertEqual(25, timestamps.size_at(2.0))
+        self.assertEqual(10, timestamps.size_at(2.0, inclusive=False))
+        self.assertEqual(30, timestamps.size_at(4.0))
+
+    def test_line_index_dir(self) -> None:
+        log_file = join(self.test_dir, "indexed.log")
+        index_dir = join(self.test_dir, "index")
+        with open(log_file, "w") as f:
+            f.write("foo\n")
+
+        index = LineIndex(log_file, index_dir)
+        index.add(0, 0)
+        index.save()
+        self.assertEqual([os.path.basename(index.path)], os.listdir(index_dir))
+        self.assertFalse(os.path.exists(f"{log_file}.idx"))
+        loaded = LineIndex(log_file, index_dir)
+        loaded.load()
+        self.assertEqual([0], list(loaded.offsets))
+
+        # a rewritten log file of the same path does not use the old index
+        path = index.path
+        os.remove(log_file)
+        with open(log_file, "w") as f:
+            f.write("bar\n")
+        os.utime(log_file, ns=(0, 0))
+        self.assertNotEqual(path, index.path)
+        loaded = LineIndex(log_file, index_dir)
+        loaded.load()
+        self.assertEqual([], list(loaded.offsets))
+
+    def test_line_index_dir_prune(self) -> None:
+        index_dir = join(self.test_dir, "index")
+        paths = []
+        with patch.object(LineIndex, "MAX_ENTRIES", 2):
+            for i in range(3):
+                log_file = join(self.test_dir, f"{i}.log")
+                with open(log_file, "w") as f:
+                    f.write("foo\n")
+                index = LineIndex(log_file, index_dir)
+                index.add(0, 0)
+                index.save()
+                paths.append(index.path)
+                # 0 is the least recently used index
+                mtime = time.time() - 10 + i
+                os.utime(index.path, (mtime, mtime))
+        self.assertEqual(
+            sorted(os.path.basename(p) for p in paths[1:]),
+            sorted(os.listdir(index_dir)),
+        )
+
+    def test_log_iterator_poll_interval(self) -> None:
+        log_file = join(self.test_dir, "polled.log")
+        with open(log_file, "w") as f:
+            f.write("foo\n")
+        scheduler = MagicMock()
+        scheduler.describe.side_effect = [
+            DescribeAppResponse("app", AppState.RUNNING),
+            DescribeAppResponse("app", AppState.SUCCEEDED),
+        ]
+
+        log_iter = LogIterator(
+            "app", ".*", log_file, scheduler, should_tail=True, poll_interval=0.01
+        )
+        with patch("torchx.schedulers.log_iterator.FileWatcher") as watcher:
+            self.assertEqual(["foo"], list(log_iter))
+        # the file is not watched, the iterator sleeps at EOF instead
+        watcher.assert_not_called()
+        self.assertEqual(2, scheduler.describe.call_count)
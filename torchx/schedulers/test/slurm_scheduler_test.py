@@ -4,13 +4,23 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
+import hashlib
+import os
+import shlex
+import shutil
 import subprocess
+import tempfile
+import time
 import unittest
+from datetime import datetime
+from typing import Callable, List
 from unittest.mock import patch, MagicMock, call
 
 from torchx import specs
 from torchx.schedulers.api import DescribeAppResponse
 from torchx.schedulers.slurm_scheduler import (
+    _TerminalStateCache,
+    _describe_response,
     create_scheduler,
     SlurmScheduler,
     SlurmReplicaRequest,
@@ -18,7 +28,35 @@ from torchx.schedulers.slurm_scheduler import (
 )
 
 
+def _run(
+    squeue: bytes = b"", sacct: bytes = b""
+) -> Callable[..., subprocess.CompletedProcess]:
+    """
+    Returns a fake ``subprocess.run`` that outputs ``squeue`` and ``sacct``
+    for the respective commands (squeue fails if it outputs no jobs).
+    """
+
+    def run(cmd: List[str], **kwargs: object) -> subprocess.CompletedProcess:
+        if cmd[0] == "squeue":
+            return subprocess.CompletedProcess(cmd, 0 if squeue else 1, squeue, b"")
+        return subprocess.CompletedProcess(cmd, 0, sacct, b"")
+
+    return run
+
+
 class SlurmSchedulerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache_dir = tempfile.mkdtemp("torchx_slurm_scheduler_test")
+        env = patch.dict(
+            os.environ,
+            {"TORCHX_CACHE_DIR": self.cache_dir, "SLURM_CLUSTER_NAME": "testcluster"},
+        )
+        env.start()
+        self.addCleanup(env.stop)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.cache_dir)
+
     def test_create_scheduler(self) -> None:
         scheduler = create_scheduler("foo")
         self.assertIsInstance(scheduler, SlurmScheduler)
@@ -108,11 +146,72 @@ srun --chdir=/some/path echo 'hello slurm' test
         )
 
         # check macro substitution
+        script = req.replicas["role-0-a-1.sh"].materialize()
         self.assertIn(
             "echo 1 'hello '\"$SLURM_JOB_ID\"''",
-            req.replicas["role-0-a-1.sh"].materialize(),
+            script,
+        )
+        # each replica writes its own log file
+        self.assertIn(
+            '--output="$PWD"/slurm-"$SLURM_JOB_ID"-a-1.out',
+            script,
+        )
+
+    def test_dryrun_homogeneous(self) -> None:
+        scheduler = create_scheduler("foo")
+        role = specs.Role(
+            name="a",
+            image="/some/path",
+            entrypoint="echo",
+            args=[specs.macros.replica_id, f"hello {specs.macros.app_id}"],
+            num_replicas=3,
+            resource=specs.Resource(cpu=2, memMB=1000, gpu=0),
+        )
+        cfg = specs.RunConfig()
+        cfg.set("homogeneous", True)
+        cfg.set("partition", "foo")
+        info = scheduler.submit_dryrun(specs.AppDef(name="foo", roles=[role]), cfg)
+        req = info.request
+        self.assertEqual(["role-0-a.sh"], list(req.replicas.keys()))
+        script = req.replicas["role-0-a.sh"].materialize()
+        self.assertIn("#SBATCH --partition=foo\n", script)
+        self.assertIn("#SBATCH --ntasks=3\n", script)
+        # --mem would be per node
+        self.assertIn("#SBATCH --mem-per-cpu=500\n", script)
+        self.assertNotIn("homogeneous", script)
+        self.assertIn(
+            "srun --chdir=/some/path"
+            ' --output="$PWD"/slurm-"$SLURM_JOB_ID"-a-%t.out'
+            " --ntasks=3 sh -c ",
+            script,
         )
 
+        # the replica id is expanded by each task
+        cmd = shlex.split(script.splitlines()[-1])[-1]
+        self.assertEqual(
+            "exec echo ''\"$SLURM_PROCID\"'' 'hello '\"$SLURM_JOB_ID\"''", cmd
+        )
+
+        # env vars that use macros are exported by each task
+        role.env = {"RANK": specs.macros.replica_id, "FOO": "bar"}
+        info = scheduler.submit_dryrun(specs.AppDef(name="foo", roles=[role]), cfg)
+        script = info.request.replicas["role-0-a.sh"].materialize()
+        self.assertIn("#SBATCH --export=FOO=bar\n", script)
+        self.assertNotIn("--export=RANK", script)
+        self.assertNotIn("${replica_id}", script)
+        cmd = shlex.split(script.splitlines()[-1])[-1]
+        self.assertTrue(cmd.startswith("export RANK=''\"$SLURM_PROCID\"''; exec echo"))
+        env = subprocess.run(
+            ["sh", "-c", cmd.partition("exec")[0] + "exec env"],
+            env={"SLURM_PROCID": "2", "SLURM_JOB_ID": "54"},
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout.decode("utf-8")
+        self.assertIn("RANK=2\n", env)
+
+        with self.assertRaisesRegex(ValueError, "single role"):
+            scheduler.submit_dryrun(specs.AppDef(name="foo", roles=[role, role]), cfg)
+
     @patch("subprocess.run")
     def test_run_multi_role(self, run: MagicMock) -> None:
         run.return_value.stdout = b"1234"
@@ -143,11 +242,71 @@ srun --chdir=/some/path echo 'hello slurm' test
         (args,) = args
         self.assertEqual(len(args), 9)
         self.assertEqual(args[:4], ["sbatch", "--parsable", "--job-name", "foo"])
-        self.assertTrue(args[4].endswith("role-0-a-0.sh"))
         self.assertEqual(args[5], ":")
-        self.assertTrue(args[6].endswith("role-0-a-1.sh"))
         self.assertEqual(args[7], ":")
-        self.assertTrue(args[8].endswith("role-1-b-0.sh"))
+        # the scripts are written to the cache keyed by their sha256
+        script_dir = os.path.join(self.cache_dir, "slurm", "scripts")
+        for path in args[4::2]:
+            self.assertEqual(script_dir, os.path.dirname(path))
+        with open(args[6], "r") as f:
+            self.assertIn("echo 1 'hello '", f.read())
+
+        # resubmitting the same app reuses the cached scripts
+        scheduler.submit(app, specs.RunConfig())
+        self.assertEqual(args, run.call_args[0][0])
+        self.assertEqual(3, len(os.listdir(script_dir)))
+
+    @patch("torchx.schedulers.slurm_scheduler.SCRIPT_CACHE_MAX_ENTRIES", 2)
+    @patch("subprocess.run")
+    def test_script_cache_prune(self, run: MagicMock) -> None:
+        run.return_value.stdout = b"1234"
+        scheduler = create_scheduler("foo")
+        script_dir = os.path.join(self.cache_dir, "slurm", "scripts")
+
+        def submit(entrypoint: str) -> str:
+            role = specs.Role(name="a", image="/some/path", entrypoint=entrypoint)
+            app = specs.AppDef(name="foo", roles=[role])
+            info = scheduler.submit_dryrun(app, specs.RunConfig())
+            scheduler.schedule(info)
+            script = info.request.replicas["role-0-a-0.sh"].materialize()
+            return hashlib.sha256(script.encode("utf-8")).hexdigest() + ".sh"
+
+        a = submit("a")
+        b = submit("b")
+        os.utime(os.path.join(script_dir, b), (0, 0))
+        # resubmitting a script marks it as recently used
+        submit("b")
+        c = submit("c")
+        self.assertEqual(sorted([b, c]), sorted(os.listdir(script_dir)))
+        self.assertNotIn(a, os.listdir(script_dir))
+
+    @patch("subprocess.run")
+    def test_run_stdin(self, run: MagicMock) -> None:
+        run.return_value.stdout = b"1234"
+        scheduler = create_scheduler("foo")
+        app = specs.AppDef(
+            name="foo",
+            roles=[specs.Role(name="a", image="/some/path", entrypoint="echo")],
+        )
+        info = scheduler.submit_dryrun(app, specs.RunConfig())
+        self.assertEqual("1234", scheduler.schedule(info))
+
+        script = info.request.replicas["role-0-a-0.sh"].materialize()
+        self.assertEqual(
+            run.call_args,
+            call(
+                ["sbatch", "--parsable", "--job-name", "foo"],
+                input=script.encode("utf-8"),
+                stdout=subprocess.PIPE,
+                check=True,
+            ),
+        )
+        # the script is cached for reference
+        digest = hashlib.sha256(script.encode("utf-8")).hexdigest()
+        with open(
+            os.path.join(self.cache_dir, "slurm", "scripts", f"{digest}.sh")
+        ) as f:
+            self.assertEqual(script, f.read())
 
     @patch("torchx.schedulers.slurm_scheduler.SlurmScheduler.describe")
     @patch("subprocess.run")
@@ -162,19 +321,35 @@ srun --chdir=/some/path echo 'hello slurm' test
 
     @patch("subprocess.run")
     def test_describe_completed(self, run: MagicMock) -> None:
-        run.return_value.stdout = b"""JobID|JobName|Partition|Account|AllocCPUS|State|ExitCode
-53|echo|compute||1|COMPLETED|0:0
-53.batch|batch|||1|COMPLETED|0:0
-53.0|echo|||1|COMPLETED|0:0"""
+        submit = datetime.now().replace(microsecond=0)
+        submitted = f"|{submit.isoformat()}\n".encode()
+        run.side_effect = _run(
+            sacct=b"53|COMPLETED"
+            + submitted
+            + b"53.batch|COMPLETED"
+            + submitted
+            + b"53.0|COMPLETED"
+            + submitted
+        )
 
         scheduler = create_scheduler("foo")
         out = scheduler.describe("53")
 
-        self.assertEqual(run.call_count, 1)
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(run.call_args_list[0][0][0][0], "squeue")
         self.assertEqual(
             run.call_args,
             call(
-                ["sacct", "--parsable2", "-j", "53"], stdout=subprocess.PIPE, check=True
+                [
+                    "sacct",
+                    "--parsable2",
+                    "--noheader",
+                    "--format=JobID,State,Submit",
+                    "-j",
+                    "53",
+                ],
+                stdout=subprocess.PIPE,
+                check=True,
             ),
         )
 
@@ -183,10 +358,74 @@ srun --chdir=/some/path echo 'hello slurm' test
         self.assertEqual(out.msg, "COMPLETED")
         self.assertEqual(out.state, specs.AppState.SUCCEEDED)
 
+        # the terminal state is persisted and never queried again
+        out = create_scheduler("bar").describe("53")
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(out.state, specs.AppState.SUCCEEDED)
+        with open(os.path.join(self.cache_dir, "slurm", "job_states")) as f:
+            self.assertEqual(
+                f"testcluster|53|{submit.timestamp()}|COMPLETED\n", f.read()
+            )
+
+        # the cached state is only used on the same cluster
+        with patch.dict(os.environ, {"SLURM_CLUSTER_NAME": "othercluster"}):
+            create_scheduler("bar").describe("53")
+        self.assertEqual(run.call_count, 4)
+
+    @patch("subprocess.run")
+    def test_describe_job_id_reused(self, run: MagicMock) -> None:
+        run.side_effect = _run(sacct=b"53|COMPLETED|Unknown")
+        scheduler = create_scheduler("foo")
+        self.assertEqual(scheduler.describe("53").state, specs.AppState.SUCCEEDED)
+
+        # the job id wrapped and was handed out to a new job
+        run.side_effect = None
+        run.return_value.stdout = b"53"
+        app = specs.AppDef(
+            name="foo",
+            roles=[specs.Role(name="a", image="/some/path", entrypoint="echo")],
+        )
+        scheduler = create_scheduler("bar")
+        self.assertEqual("53", scheduler.submit(app, specs.RunConfig()))
+
+        run.side_effect = _run(squeue=b"53|RUNNING")
+        self.assertEqual(
+            create_scheduler("baz").describe("53").state, specs.AppState.RUNNING
+        )
+
+    def test_terminal_state_cache(self) -> None:
+        path = os.path.join(self.cache_dir, "job_states")
+        now = time.time()
+        cache = _TerminalStateCache(path, max_entries=4, max_age=100)
+        cache.put("c", {"1": (now - 200, "COMPLETED"), "2": (now, "FAILED")})
+        # expired
+        self.assertIsNone(cache.get("c", "1"))
+        self.assertEqual("FAILED", cache.get("c", "2"))
+        self.assertIsNone(cache.get("d", "2"))
+
+        cache.put("c", {"3": (now - 1, "COMPLETED"), "4": (now - 2, "COMPLETED")})
+        cache.put("c", {"5": (now - 3, "COMPLETED")})
+        # compacted to the 2 most recent jobs
+        with open(path) as f:
+            self.assertEqual(2, len(f.readlines()))
+        cache = _TerminalStateCache(path, max_entries=4, max_age=100)
+        self.assertEqual("FAILED", cache.get("c", "2"))
+        self.assertEqual("COMPLETED", cache.get("c", "3"))
+        self.assertIsNone(cache.get("c", "4"))
+
+    @patch("subprocess.run")
+    def test_cluster_name(self, run: MagicMock) -> None:
+        run.return_value.stdout = b"AuthType = auth/munge\nClusterName = foo\n"
+        with patch.dict(os.environ):
+            del os.environ["SLURM_CLUSTER_NAME"]
+            scheduler = create_scheduler("foo")
+            self.assertEqual("foo", scheduler._cluster_name())
+            self.assertEqual("foo", scheduler._cluster_name())
+        run.assert_called_once()
+
     @patch("subprocess.run")
     def test_describe_running(self, run: MagicMock) -> None:
-        run.return_value.stdout = b"""JobID|JobName|Partition|Account|AllocCPUS|State|ExitCode
-54|echo|compute||1|RUNNING|0:0"""
+        run.side_effect = _run(squeue=b"""54|RUNNING""")
 
         scheduler = create_scheduler("foo")
         out = scheduler.describe("54")
@@ -195,7 +434,15 @@ srun --chdir=/some/path echo 'hello slurm' test
         self.assertEqual(
             run.call_args,
             call(
-                ["sacct", "--parsable2", "-j", "54"], stdout=subprocess.PIPE, check=True
+                [
+                    "squeue",
+                    "--noheader",
+                    "--format=%i|%T",
+                    "--jobs",
+                    "54",
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
             ),
         )
 
@@ -203,3 +450,103 @@ srun --chdir=/some/path echo 'hello slurm' test
         self.assertEqual(out.app_id, "54")
         self.assertEqual(out.msg, "RUNNING")
         self.assertEqual(out.state, specs.AppState.RUNNING)
+
+    @patch("subprocess.run")
+    def test_describe_many_unknown_state(self, run: MagicMock) -> None:
+        run.side_effect = _run(squeue=b"54|RUNNING\n55|NEW_STATE")
+
+        scheduler = create_scheduler("foo")
+        with self.assertLogs("torchx.schedulers.slurm_scheduler", "WARNING"):
+            descs = scheduler.describe_many(["54", "55"])
+
+        self.assertEqual(descs["54"].state, specs.AppState.RUNNING)
+        self.assertEqual(descs["55"].state, specs.AppState.UNKNOWN)
+        self.assertEqual(descs["55"].msg, "NEW_STATE")
+
+    def test_describe_response_suffix(self) -> None:
+        for state, expected in [
+            ("CANCELLED by 1000", specs.AppState.CANCELLED),
+            ("CANCELLED+", specs.AppState.CANCELLED),
+            (" COMPLETED ", specs.AppState.SUCCEEDED),
+            ("OUT_OF_MEMORY", specs.AppState.FAILED),
+            ("", specs.AppState.UNKNOWN),
+        ]:
+            desc = _describe_response("54", state)
+            self.assertEqual(expected, desc.state, state)
+            self.assertEqual(state, desc.msg)
+
+    @patch("subprocess.run")
+    def test_describe_many(self, run: MagicMock) -> None:
+        run.side_effect = _run(
+            squeue=b"""54|RUNNING
+57+0|PENDING
+57+1|PENDING
+58|COMPLETING""",
+            sacct=b"""55|CANCELLED by 1000|Unknown
+55.batch|CANCELLED|Unknown""",
+        )
+
+        scheduler = create_scheduler("foo")
+        descs = scheduler.describe_many(["54", "55", "56", "57", "58"])
+
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(run.call_args_list[0][0][0][-2:], ["--jobs", "54,55,56,57,58"])
+        self.assertEqual(run.call_args_list[1][0][0][-2:], ["-j", "55,56"])
+        self.assertEqual(descs["54"].state, specs.AppState.RUNNING)
+        self.assertEqual(descs["55"].state, specs.AppState.CANCELLED)
+        self.assertEqual(descs["55"].msg, "CANCELLED by 1000")
+        self.assertIsNone(descs["56"])
+        self.assertEqual(descs["57"].state, specs.AppState.PENDING)
+        self.assertEqual(descs["58"].state, specs.AppState.RUNNING)
+
+        # the jobs that were found are cached
+        self.assertEqual(scheduler.describe("54").state, specs.AppState.RUNNING)
+        self.assertEqual(run.call_count, 2)
+        scheduler.describe_many(["54", "56"])
+        self.assertEqual(run.call_count, 4)
+        self.assertEqual(run.call_args[0][0][-2:], ["-j", "56"])
+
+    @patch("subprocess.run")
+    def test_describe_cache_ttl(self, run: MagicMock) -> None:
+        run.side_effect = _run(squeue=b"54|RUNNING")
+
+        scheduler = create_scheduler("foo", describe_cache_ttl=0)
+        scheduler.describe("54")
+        scheduler.describe("54")
+        self.assertEqual(run.call_count, 2)
+
+    @patch("subprocess.run")
+    @patch("torchx.schedulers.slurm_scheduler.SlurmScheduler.describe")
+    def test_log_iter(self, describe: MagicMock, run: MagicMock) -> None:
+        work_dir = os.path.join(self.cache_dir, "work")
+        os.makedirs(work_dir)
+        log_file = os.path.join(work_dir, "slurm-54-a-1.out")
+        with open(log_file, "w") as f:
+            f.write("foo\nbar\nfoobar")
+        run.side_effect = _run(
+            sacct=f"54|{work_dir}\n54.batch|{work_dir}\n".encode("utf-8")
+        )
+
+        scheduler = create_scheduler("foo")
+        describe.return_value = DescribeAppResponse("54", specs.AppState.RUNNING)
+        # not following the log of a running job stops at the end of the file
+        lines = scheduler.log_iter("54", "a", k=1, regex="foo")
+        self.assertEqual(["foo", "foobar"], list(lines))
+
+        describe.return_value = DescribeAppResponse("54", specs.AppState.SUCCEEDED)
+        lines = scheduler.log_iter("54", "a", k=1, should_tail=True)
+        self.assertEqual(["foo", "bar", "foobar"], list(lines))
+        # the work dir is only looked up once
+        self.assertEqual(1, run.call_count)
+        # the line index is kept in the cache rather than next to the log
+        self.assertFalse(os.path.exists(f"{log_file}.idx"))
+        self.assertEqual(
+            1, len(os.listdir(os.path.join(self.cache_dir, "slurm", "log_index")))
+        )
+
+        with self.assertRaises(RuntimeError):
+            iter(scheduler.log_iter("54", "a", k=0))
+
+        run.side_effect = _run(sacct=b"")
+        with self.assertRaisesRegex(ValueError, "working directory"):
+            scheduler.log_iter("55", "a", k=0)
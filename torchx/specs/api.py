@@ -417,6 +417,9 @@ class AppStatus:
 # see: https://docs.python.org/3/library/stdtypes.html#generic-alias-type
 ConfigValue = Union[str, int, float, bool, List[str], None]
 
+# string values (e.g. set with ``torchx run --scheduler_args``) of bool run options
+_BOOL_VALUES: Dict[str, bool] = {"true": True, "false": False}
+
 
 # =======================
 # ==== Run Config =======
@@ -615,6 +618,11 @@ class runopts:
         for cfg_key, (default, type_, required, _help) in self._opts.items():
             val = resolved_cfg.get(cfg_key)
 
+            # the values of options set from the cli are strings
+            if type_ is bool and isinstance(val, str) and val.lower() in _BOOL_VALUES:
+                val = _BOOL_VALUES[val.lower()]
+                resolved_cfg.set(cfg_key, val)
+
             # check required opt
             if required and val is None:
                 raise InvalidRunConfigException(
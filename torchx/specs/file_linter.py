@@ -266,6 +266,30 @@ class TorchFunctionVisitor(ast.NodeVisitor):
             self.linter_errors += validatior.validate(node)
 
 
+def get_fn_defs(source: str) -> Dict[str, ast.FunctionDef]:
+    """
+    Parses ``source`` and returns its top-level function definitions by name, so
+    that the functions of a module can be validated without re-parsing it.
+    Raises ``SyntaxError`` if the source cannot be parsed.
+    """
+    module = ast.parse(source)
+    return {
+        expr.name: expr for expr in module.body if isinstance(expr, ast.FunctionDef)
+    }
+
+
+def validate_fn_def(
+    func_def: ast.FunctionDef, path: str = "<NONE>"
+) -> List[LinterMessage]:
+    """
+    Runs the torchx function validators (see ``TorchFunctionVisitor``) on an
+    already parsed function definition.
+    """
+    visitor = TorchFunctionVisitor(path, func_def.name)
+    visitor.visit(func_def)
+    return visitor.linter_errors
+
+
 def validate(
     source: str, path: str = "<NONE>", torchx_function: str = "get_app_spec"
 ) -> List[LinterMessage]:
@@ -5,24 +5,37 @@
 # LICENSE file in the root directory of this source tree.
 
 import abc
+import ast
 import glob
 import importlib
+import importlib.util
+import json
 import logging
 import os
+import sys
+import time
 from collections import OrderedDict
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from inspect import getmembers, isfunction
 from types import ModuleType
-from typing import Dict, List, Optional, Union, Callable
+from typing import Any, Dict, List, Optional, Tuple, Union, Callable
 
 from pyre_extensions import none_throws
 from torchx.specs import AppDef
-from torchx.specs.file_linter import get_fn_docstring, validate
+from torchx.specs.file_linter import get_fn_defs, parse_fn_docstring, validate_fn_def
 from torchx.util import entrypoints
+from torchx.util.cache import cache_dir
 from torchx.util.io import read_conf_file
+from torchx.version import __version__
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+# max number of component groups that are scanned concurrently
+DISCOVERY_MAX_WORKERS: int = 8
+# component groups that take longer than this (in seconds) to discover are warned about
+SLOW_DISCOVERY_SECONDS: float = 5.0
+
 
 @dataclass
 class _Component:
@@ -36,7 +49,8 @@ class _Component:
             of the function that creates component
         group: Logic group of the component
         fn_name: Function name that creates component
-        fn: Function that creates component
+        _fn: Function that creates component, if not set ``fn`` imports the
+            module on first access (e.g. for components found in the index)
     """
 
     name: str
@@ -44,10 +58,129 @@ class _Component:
     description: str
     group: str
     fn_name: str
-    fn: Callable[..., AppDef]
+    _fn: Optional[Callable[..., AppDef]] = field(
+        default=None, repr=False, compare=False
+    )
+
+    @property
+    def fn(self) -> Callable[..., AppDef]:
+        """
+        Function that creates component
+        """
+        fn = self._fn
+        if fn is None:
+            module = importlib.import_module(self.module_name)
+            fn = self._fn = getattr(module, self.fn_name)
+        return fn
+
+
+class _ComponentIndex:
+    """
+    Persistent (json) index of the components defined in each component module,
+    keyed by the path, mtime and size of the module's source file. Modules whose
+    source did not change since they were indexed are neither imported nor
+    parsed to find their components. The index is only valid for the torchx
+    (linter) and python version that wrote it.
+
+    Entries of files that were not looked up for ``MAX_AGE`` seconds are
+    dropped when the index is saved, as are the least recently used ones beyond
+    ``MAX_ENTRIES``. The last use of an entry is refreshed at most once every
+    ``TOUCH_INTERVAL`` seconds so that lookups rarely rewrite the index.
+
+    Failing to read or write the index only disables it.
+    """
+
+    MAX_ENTRIES: int = 10000
+    MAX_AGE: float = 30 * 24 * 60 * 60
+    TOUCH_INTERVAL: float = 24 * 60 * 60
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._version: str = (
+            f"{__version__}-py{sys.version_info[0]}.{sys.version_info[1]}"
+        )
+        # source file path ->
+        #   {"mtime_ns", "size", "used", "components": [[fn_name, description]]}
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        try:
+            with open(path, "r") as f:
+                index = json.load(f)
+            if index.get("version") == self._version:
+                self._files = index["files"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"ignoring invalid component index {path}: {e}")
+
+    def get(self, filepath: str) -> Optional[List[Tuple[str, str]]]:
+        """
+        Returns the ``(fn_name, description)`` of the components in the file or
+        ``None`` if the file is not indexed or changed since it was indexed.
+        """
+        entry = self._files.get(filepath)
+        if not entry:
+            return None
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        if (stat.st_mtime_ns, stat.st_size) != (entry["mtime_ns"], entry["size"]):
+            return None
+        now = time.time()
+        if now - entry.get("used", 0) > self.TOUCH_INTERVAL:
+            entry["used"] = now
+            self._dirty = True
+        return [(fn_name, description) for fn_name, description in entry["components"]]
+
+    def put(self, filepath: str, components: List[Tuple[str, str]]) -> None:
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return
+        self._files[filepath] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "used": time.time(),
+            "components": [list(component) for component in components],
+        }
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        cutoff = time.time() - self.MAX_AGE
+        recent = sorted(
+            (
+                (e.get("used", 0), path)
+                for path, e in self._files.items()
+                if e.get("used", 0) >= cutoff and os.path.isfile(path)
+            ),
+            reverse=True,
+        )[: self.MAX_ENTRIES]
+        files = {path: self._files[path] for _, path in recent}
+        tmp_path = f"{self.path}.{os.getpid()}"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({"version": self._version, "files": files}, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"failed to write component index {self.path}: {e}")
+
+
+# (source file path, module name, indexed (fn_name, description) of its components)
+_ScannedModule = Tuple[str, str, Optional[List[Tuple[str, str]]]]
 
 
 class ComponentsFinder(abc.ABC):
+    def __init__(self) -> None:
+        # module path -> top-level function definitions (each module is parsed once)
+        self._fn_defs: Dict[str, Dict[str, ast.FunctionDef]] = {}
+        # (module path, function name) -> component description (None if invalid)
+        self._descriptions: Dict[Tuple[str, str], Optional[str]] = {}
+
     @abc.abstractmethod
     def find(self) -> List[_Component]:
         """
@@ -61,11 +194,29 @@ class ComponentsFinder(abc.ABC):
     def _validate_and_get_description(
         self, module: ModuleType, function_name: str
     ) -> Optional[str]:
-        module_path = os.path.abspath(module.__file__)
-        source = read_conf_file(module_path)
-        if len(validate(source, torchx_function=function_name)) != 0:
+        return self._get_description(os.path.abspath(module.__file__), function_name)
+
+    def _get_description(self, module_path: str, function_name: str) -> Optional[str]:
+        key = (module_path, function_name)
+        if key not in self._descriptions:
+            self._descriptions[key] = self._lint_function(module_path, function_name)
+        return self._descriptions[key]
+
+    def _get_fn_defs(self, module_path: str) -> Dict[str, ast.FunctionDef]:
+        fn_defs = self._fn_defs.get(module_path)
+        if fn_defs is None:
+            try:
+                fn_defs = get_fn_defs(read_conf_file(module_path))
+            except SyntaxError:
+                fn_defs = {}
+            self._fn_defs[module_path] = fn_defs
+        return fn_defs
+
+    def _lint_function(self, module_path: str, function_name: str) -> Optional[str]:
+        fn_def = self._get_fn_defs(module_path).get(function_name)
+        if not fn_def or validate_fn_def(fn_def, module_path):
             return None
-        func_definition, _ = none_throws(get_fn_docstring(source, function_name))
+        func_definition, _ = parse_fn_docstring(none_throws(ast.get_docstring(fn_def)))
         return func_definition
 
 
@@ -81,6 +232,13 @@ class ModuleComponentsFinder(ComponentsFinder):
     ``group`` can be supplied, which is used to construct component name and specify
     the logical grouping of the components.
 
+    If an ``index`` is given, the components of the modules that are in the index
+    (and did not change) are taken from it rather than importing the module.
+
+    ``find()`` runs in two steps: ``_scan()`` walks the directory and parses the
+    modules without importing them (safe to run concurrently with other finders)
+    and ``_import_components()`` imports the modules that were not in the index.
+
     ::
      module = "main.foo.bar" # resolves to main/foo/bar.py
      # main.foo will be replaced by the "trainer" in component.name
@@ -89,16 +247,46 @@ class ModuleComponentsFinder(ComponentsFinder):
 
     """
 
-    def __init__(self, module: Union[str, ModuleType], group: str) -> None:
+    def __init__(
+        self,
+        module: Union[str, ModuleType],
+        group: str,
+        index: Optional[_ComponentIndex] = None,
+    ) -> None:
+        super().__init__()
         self._module = module
         self._group = group
+        self._index = index
 
     def find(self) -> List[_Component]:
+        base_module, modules = self._scan()
+        return self._import_components(base_module, modules)
+
+    def _scan(self) -> Tuple[str, List[_ScannedModule]]:
+        """
+        Walks the directory of the module and parses (and lints) the source of
+        the component modules that are not in the index without importing them.
+        Other than importing ``module`` if it is given by name, this only reads
+        files.
+
+        Returns:
+            The base module name and the modules found in the directory
+        """
         module = self._try_load_module(self._module)
-        dir_name = os.path.dirname(module.__file__)
-        return self._get_components_from_dir(
-            dir_name, self._get_base_module_name(module)
-        )
+        search_dir = os.path.dirname(module.__file__)
+        base_module = self._get_base_module_name(module)
+        search_pattern = os.path.join(search_dir, "**", "*.py")
+
+        modules = []
+        for filepath in glob.glob(search_pattern, recursive=True):
+            module_name = self._get_module_name(filepath, search_dir, base_module)
+            indexed = self._index.get(filepath) if self._index else None
+            if indexed is None:
+                module_path = os.path.abspath(filepath)
+                for function_name in self._get_fn_defs(module_path):
+                    self._get_description(module_path, function_name)
+            modules.append((filepath, module_name, indexed))
+        return base_module, modules
 
     def _get_base_module_name(self, module: ModuleType) -> str:
         filepath = module.__file__
@@ -113,19 +301,59 @@ class ModuleComponentsFinder(ComponentsFinder):
         else:
             return module
 
-    def _get_components_from_dir(
-        self, search_dir: str, base_module: str
+    def _import_components(
+        self, base_module: str, modules: List[_ScannedModule]
     ) -> List[_Component]:
-        search_pattern = os.path.join(search_dir, "**", "*.py")
         component_defs = []
-        for filepath in glob.glob(search_pattern, recursive=True):
-            module = self._try_load_module(
-                self._get_module_name(filepath, search_dir, base_module)
-            )
+        for filepath, module_name, indexed in modules:
+            if indexed is not None:
+                component_defs += [
+                    self._make_component(base_module, module_name, fn_name, desc)
+                    for fn_name, desc in indexed
+                ]
+                continue
+
+            module = self._try_load_module(module_name)
             defs = self._get_components_from_module(base_module, module)
+            if self._index:
+                self._index.put(filepath, [(d.fn_name, d.description) for d in defs])
             component_defs += defs
         return component_defs
 
+    def _make_component(
+        self,
+        base_module: str,
+        module_name: str,
+        fn_name: str,
+        description: str,
+        fn: Optional[Callable[..., AppDef]] = None,
+    ) -> _Component:
+        return _Component(
+            name=self._get_component_name(base_module, module_name, fn_name),
+            module_name=module_name,
+            description=description,
+            group=self._group,
+            fn_name=fn_name,
+            _fn=fn,
+        )
+
+    def _get_component(self, module_name: str, fn_name: str) -> Optional[_Component]:
+        """
+        Imports only ``module_name`` and returns its ``fn_name`` component or
+        ``None`` if ``fn_name`` is not a (valid) component of the module.
+        """
+        base_module = self._get_base_module_name(self._try_load_module(self._module))
+        module = self._try_load_module(module_name)
+        function = getattr(module, fn_name, None)
+        if not isfunction(function) or self._is_private_function(fn_name):
+            return None
+        component_desc = self._validate_and_get_description(module, fn_name)
+        if not component_desc:
+            return None
+        return self._make_component(
+            base_module, module.__name__, fn_name, component_desc, function
+        )
+
     def _is_private_function(self, function_name: str) -> bool:
         return function_name.startswith("_")
 
@@ -147,15 +375,8 @@ class ModuleComponentsFinder(ComponentsFinder):
             component_desc = self._validate_and_get_description(module, function_name)
             if self._is_private_function(function_name) or not component_desc:
                 continue
-            component_def = _Component(
-                name=self._get_component_name(
-                    base_module, module.__name__, function_name
-                ),
-                module_name=module.__name__,
-                description=component_desc,
-                group=self._group,
-                fn_name=function_name,
-                fn=function,
+            component_def = self._make_component(
+                base_module, module.__name__, function_name, component_desc, function
             )
             component_defs.append(component_def)
         return component_defs
@@ -179,22 +400,111 @@ class ModuleComponentsFinder(ComponentsFinder):
             return f"{base_module}.{module_name}"
 
 
+def _timed_scan(
+    finder: ModuleComponentsFinder,
+) -> Tuple[float, Tuple[str, List[_ScannedModule]]]:
+    start = time.perf_counter()
+    scan = finder._scan()
+    return time.perf_counter() - start, scan
+
+
 def _load_components() -> Dict[str, _Component]:
     component_modules = entrypoints.load_group("torchx.components", default={})
     component_defs: OrderedDict[str, _Component] = OrderedDict()
+    index = _ComponentIndex(cache_dir("component_index.json"))
 
-    finder = ModuleComponentsFinder("torchx.components", "")
-    for component in finder.find():
-        component_defs[component.name] = component
-
+    finders = [
+        ModuleComponentsFinder(importlib.import_module("torchx.components"), "", index)
+    ]
     for component_group, component_module in component_modules.items():
-        finder = ModuleComponentsFinder(component_module, component_group)
-        found_components = finder.find()
-        for component in found_components:
+        finders.append(ModuleComponentsFinder(component_module, component_group, index))
+
+    # directory walks and parsing of the groups run concurrently,
+    # imports run serially in the order of the groups (later groups take precedence)
+    with ThreadPoolExecutor(
+        max_workers=min(len(finders), DISCOVERY_MAX_WORKERS)
+    ) as executor:
+        scans = list(executor.map(_timed_scan, finders))
+
+    for finder, (scan_time, (base_module, modules)) in zip(finders, scans):
+        start = time.perf_counter()
+        for component in finder._import_components(base_module, modules):
             component_defs[component.name] = component
+        import_time = time.perf_counter() - start
+
+        group = finder._group or "<builtin>"
+        msg = (
+            f"discovered components of group `{group}` ({base_module}) in"
+            f" {scan_time + import_time:.3f}s (scan: {scan_time:.3f}s,"
+            f" import: {import_time:.3f}s)"
+        )
+        if scan_time + import_time > SLOW_DISCOVERY_SECONDS:
+            logger.warning(f"slow component discovery, {msg}")
+        else:
+            logger.debug(msg)
+
+    index.save()
     return component_defs
 
 
+def _base_module_name(module_name: str) -> Optional[str]:
+    """
+    Same as ``ModuleComponentsFinder._get_base_module_name`` but without
+    importing the module itself (only its parent packages). Returns ``None``
+    if the module does not exist.
+    """
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        return None
+    if not spec:
+        return None
+    if spec.submodule_search_locations is not None:
+        return module_name
+    return module_name.rsplit(".", 1)[0]
+
+
+def _resolve_component(name: str) -> Optional[_Component]:
+    """
+    Resolves the component ``name`` (``{group}.{module_path}.{fn_name}``)
+    directly to its module and function, importing only that module (rather
+    than discovering all components). Returns ``None`` if the name cannot be
+    resolved this way: the module does not exist or exists in more than one
+    component group, or the function is not a (valid) component.
+    """
+    groups: List[Tuple[str, str]] = [("", "torchx.components")]
+    for group, value in entrypoints.get_group_values("torchx.components").items():
+        if ":" in value:
+            # not a module, let the full discovery handle (and report) it
+            return None
+        groups.append((group, value))
+
+    candidates = []
+    for group, module in groups:
+        if not group:
+            relname = name
+        elif name.startswith(f"{group}."):
+            relname = name[len(group) + 1 :]
+        else:
+            continue
+        base_module = _base_module_name(module)
+        if base_module is None:
+            continue
+        if "." not in relname:
+            # the component would be a function of the group's module itself,
+            # which only the full discovery can tell apart from other candidates
+            return None
+        module_path, fn_name = relname.rsplit(".", 1)
+        module_name = f"{base_module}.{module_path}"
+        if _base_module_name(module_name) is not None:
+            candidates.append((group, module, module_name, fn_name))
+
+    if len(candidates) != 1:
+        return None
+    group, module, module_name, fn_name = candidates[0]
+    return ModuleComponentsFinder(module, group)._get_component(module_name, fn_name)
+
+
 _components: Optional[Dict[str, _Component]] = None
 
 
@@ -219,10 +529,17 @@ def get_components() -> Dict[str, _Component]:
 
 def get_component(name: str) -> Optional[_Component]:
     """
-    Retrieves components by the provided name.
+    Retrieves components by the provided name. Unless all the components have
+    already been discovered, only the module of the component is imported,
+    falling back to discovering all the components if ``name`` cannot be
+    resolved directly (see ``_resolve_component``).
 
     Returns:
         Component or None if no component with ``name`` exists
     """
+    if not _components:
+        component = _resolve_component(name)
+        if component:
+            return component
     components = get_components()
     return components.get(name, None)
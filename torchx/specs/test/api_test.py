@@ -319,6 +319,21 @@ class RunConfigTest(unittest.TestCase):
         with self.assertRaises(InvalidRunConfigException):
             opts.resolve(cfg)
 
+    def test_runopts_resolve_bool_str(self) -> None:
+        opts = runopts()
+        opts.add("preemptible", type_=bool, help="is the job preemptible")
+        opts.add("run_as", type_=str, help="run as user")
+
+        for value, expected in [("True", True), ("false", False), (True, True)]:
+            cfg = RunConfig({"preemptible": value, "run_as": "true"})
+            resolved = opts.resolve(cfg)
+            self.assertEqual(expected, resolved.get("preemptible"))
+            # only the values of bool options are converted
+            self.assertEqual("true", resolved.get("run_as"))
+
+        with self.assertRaises(InvalidRunConfigException):
+            opts.resolve(RunConfig({"preemptible": "yes"}))
+
     def test_runopts_resolve_unioned(self) -> None:
         # runconfigs is a union of all run opts for all schedulers
         # make sure  opts resolves run configs that have more
@@ -10,7 +10,13 @@ import unittest
 from typing import Dict, List, Optional, cast
 
 from pyre_extensions import none_throws
-from torchx.specs.file_linter import get_fn_docstring, parse_fn_docstring, validate
+from torchx.specs.file_linter import (
+    get_fn_defs,
+    get_fn_docstring,
+    parse_fn_docstring,
+    validate,
+    validate_fn_def,
+)
 
 
 # Note if the function is moved, the tests need to be updated with new lineno
@@ -154,7 +160,7 @@ class SpecsFileValidatorTest(unittest.TestCase):
             "https://sphinxcontrib-napoleon.readthedocs.io/en/latest/example_google.html"
         )
         self.assertEquals(expected_desc, linter_error.description)
-        self.assertEqual(18, linter_error.line)
+        self.assertEqual(24, linter_error.line)
 
     def test_validate_docstring_empty(self) -> None:
         linter_errors = validate(
@@ -267,3 +273,23 @@ class SpecsFileValidatorTest(unittest.TestCase):
         self.assertEqual(
             "Function unknown_function not found", linter_errors[0].description
         )
+
+    def test_get_fn_defs(self) -> None:
+        fn_defs = get_fn_defs(self._file_content)
+        self.assertIn("_test_docstring_correct", fn_defs)
+        self.assertIn("current_file_path", fn_defs)
+        # only top-level functions
+        self.assertNotIn("test_get_fn_defs", fn_defs)
+
+        self.assertEqual(
+            [], validate_fn_def(fn_defs["_test_docstring_correct"], self._path)
+        )
+        linter_errors = validate_fn_def(fn_defs["_test_fn_no_return"], self._path)
+        self.assertEqual(1, len(linter_errors))
+        self.assertEqual(
+            validate(self._file_content, self._path, "_test_fn_no_return"),
+            linter_errors,
+        )
+
+        with self.assertRaises(SyntaxError):
+            get_fn_defs("def foo(:")
@@ -5,15 +5,21 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
+import os
+import shutil
 import sys
+import tempfile
+import time
 import unittest
 from unittest.mock import patch
 
 from pyre_extensions import none_throws
 from torchx.specs.api import AppDef, Role
+from torchx.specs.file_linter import get_fn_defs, validate_fn_def
 from torchx.specs.finder import (
     ModuleComponentsFinder,
     get_component,
+    _ComponentIndex,
     _load_components,
 )
 
@@ -34,6 +40,16 @@ def test_component(name: str, role_name: str = "worker") -> AppDef:
     )
 
 
+def _private_fn(name: str) -> AppDef:
+    """
+    Private function
+
+    Args:
+        name: AppDef name
+    """
+    return AppDef(name)
+
+
 def invalid_component(name: str, role_name: str = "worker") -> AppDef:
     return AppDef(
         name, roles=[Role(name=role_name, image="test_image", entrypoint="main.py")]
@@ -41,6 +57,15 @@ def invalid_component(name: str, role_name: str = "worker") -> AppDef:
 
 
 class DirComponentsFinderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache_dir = tempfile.mkdtemp("torchx_finder_test")
+        env = patch.dict(os.environ, {"TORCHX_CACHE_DIR": self.cache_dir})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.cache_dir)
+
     def test_get_components(self) -> None:
         components = _load_components()
         self.assertTrue(len(components) > 1)
@@ -61,6 +86,71 @@ class DirComponentsFinderTest(unittest.TestCase):
         self.assertEqual("echo", component.fn_name)
         self.assertIsNotNone(component.fn)
 
+    def test_get_component_lazy(self) -> None:
+        with patch("torchx.specs.finder._components", None), patch(
+            "torchx.specs.finder._load_components"
+        ) as load_mock:
+            component = none_throws(get_component("utils.echo"))
+            load_mock.assert_not_called()
+        self.assertEqual("utils.echo", component.name)
+        self.assertEqual("torchx.components.utils", component.module_name)
+        self.assertEqual(
+            "Echos a message to stdout (calls /bin/echo)", component.description
+        )
+        from torchx.components.utils import echo
+
+        self.assertEqual(echo, component.fn)
+
+    def test_get_component_lazy_entrypoints(self) -> None:
+        with patch("torchx.specs.finder._components", None), patch(
+            "torchx.specs.finder._load_components"
+        ) as load_mock, patch("torchx.specs.finder.entrypoints") as entrypoints_mock:
+            entrypoints_mock.get_group_values.return_value = {"foobar": __name__}
+            component = none_throws(get_component("foobar.finder_test.test_component"))
+            load_mock.assert_not_called()
+        self.assertEqual(test_component, component.fn)
+        self.assertEqual("foobar", component.group)
+        self.assertEqual("torchx.specs.test.finder_test", component.module_name)
+        self.assertEqual("Test component", component.description)
+
+    def test_get_component_lazy_fallback(self) -> None:
+        for name in [
+            "utils.missing_fn",
+            "missing_module.echo",
+            "foobar.finder_test.invalid_component",
+            "foobar.finder_test._private_fn",
+        ]:
+            with patch("torchx.specs.finder._components", None), patch(
+                "torchx.specs.finder._load_components", return_value={}
+            ) as load_mock, patch(
+                "torchx.specs.finder.entrypoints"
+            ) as entrypoints_mock:
+                entrypoints_mock.get_group_values.return_value = {"foobar": __name__}
+                self.assertIsNone(get_component(name))
+                load_mock.assert_called_once()
+
+    def test_get_component_lazy_ambiguous(self) -> None:
+        # builtin module torchx.components.test.dist_test is also the module
+        # dist_test of the "test" component group
+        with patch("torchx.specs.finder._components", None), patch(
+            "torchx.specs.finder._load_components", return_value={}
+        ) as load_mock, patch("torchx.specs.finder.entrypoints") as entrypoints_mock:
+            entrypoints_mock.get_group_values.return_value = {
+                "test": "torchx.components.test"
+            }
+            get_component("test.dist_test.foo")
+            load_mock.assert_called_once()
+
+    def test_get_component_lazy_ambiguous_group_module(self) -> None:
+        # utils.echo is both the builtin component and possibly a function of
+        # the module of the "utils" component group
+        with patch("torchx.specs.finder._components", None), patch(
+            "torchx.specs.finder._load_components", return_value={}
+        ) as load_mock, patch("torchx.specs.finder.entrypoints") as entrypoints_mock:
+            entrypoints_mock.get_group_values.return_value = {"utils": __name__}
+            get_component("utils.echo")
+            load_mock.assert_called_once()
+
     def test_get_entrypoints_components(self) -> None:
         test_torchx_group = {"foobar": sys.modules[__name__]}
         with patch("torchx.specs.finder.entrypoints") as entrypoints_mock:
@@ -73,6 +163,117 @@ class DirComponentsFinderTest(unittest.TestCase):
         self.assertEqual("torchx.specs.test.finder_test", foobar_component.module_name)
         self.assertEqual("Test component", foobar_component.description)
 
+    def test_get_components_indexed(self) -> None:
+        components = _load_components()
+        index_file = os.path.join(self.cache_dir, "component_index.json")
+        self.assertTrue(os.path.isfile(index_file))
+
+        # indexed (unchanged) component modules are neither imported nor parsed
+        with patch.object(
+            ModuleComponentsFinder, "_get_components_from_module"
+        ) as get_components_mock:
+            indexed_components = _load_components()
+        get_components_mock.assert_not_called()
+        self.assertEqual(components, indexed_components)
+
+        component = indexed_components["utils.echo"]
+        self.assertEqual(
+            "Echos a message to stdout (calls /bin/echo)", component.description
+        )
+        from torchx.components.utils import echo
+
+        self.assertEqual(echo, component.fn)
+
+    def test_component_index(self) -> None:
+        index_file = os.path.join(self.cache_dir, "index", "component_index.json")
+        module_file = os.path.join(self.cache_dir, "foo.py")
+        with open(module_file, "w") as f:
+            f.write("def bar(): pass")
+
+        index = _ComponentIndex(index_file)
+        self.assertIsNone(index.get(module_file))
+        index.put(module_file, [("bar", "Bar component")])
+        self.assertEqual([("bar", "Bar component")], index.get(module_file))
+        index.save()
+
+        index = _ComponentIndex(index_file)
+        self.assertEqual([("bar", "Bar component")], index.get(module_file))
+
+        # modified file invalidates its entry
+        with open(module_file, "a") as f:
+            f.write("\n")
+        self.assertIsNone(index.get(module_file))
+
+        # index written by a different torchx version is ignored
+        with patch("torchx.specs.finder.__version__", "0.0.0"):
+            self.assertEqual({}, _ComponentIndex(index_file)._files)
+
+        # corrupt index is ignored
+        with open(index_file, "w") as f:
+            f.write("{")
+        self.assertIsNone(_ComponentIndex(index_file).get(module_file))
+
+    def test_component_index_prune(self) -> None:
+        index_file = os.path.join(self.cache_dir, "component_index.json")
+        module_files = []
+        for name in ["a", "b", "c"]:
+            module_file = os.path.join(self.cache_dir, f"{name}.py")
+            with open(module_file, "w") as f:
+                f.write("def bar(): pass")
+            module_files.append(module_file)
+        a, b, c = module_files
+
+        index = _ComponentIndex(index_file)
+        for module_file in module_files:
+            index.put(module_file, [("bar", "Bar component")])
+        # a was last used long ago and b before c
+        index._files[a]["used"] = time.time() - 2 * _ComponentIndex.MAX_AGE
+        index._files[b]["used"] -= 10
+        with patch.object(_ComponentIndex, "MAX_ENTRIES", 1):
+            index.save()
+        self.assertEqual([c], list(_ComponentIndex(index_file)._files))
+
+        # an old entry that is looked up is refreshed
+        index = _ComponentIndex(index_file)
+        index._files[c]["used"] -= 2 * _ComponentIndex.TOUCH_INTERVAL
+        self.assertIsNotNone(index.get(c))
+        index.save()
+        used = _ComponentIndex(index_file)._files[c]["used"]
+        self.assertGreater(used, time.time() - _ComponentIndex.TOUCH_INTERVAL)
+
+    def test_scan(self) -> None:
+        finder = ModuleComponentsFinder("torchx.components", "")
+        with patch.object(
+            ModuleComponentsFinder, "_try_load_module", wraps=finder._try_load_module
+        ) as load_mock:
+            base_module, modules = finder._scan()
+        # only the base module is loaded
+        load_mock.assert_called_once_with("torchx.components")
+        self.assertEqual("torchx.components", base_module)
+
+        module_names = {module_name for _, module_name, _ in modules}
+        self.assertIn("torchx.components.utils", module_names)
+        utils_file = os.path.abspath(sys.modules["torchx.components.utils"].__file__)
+        # modules are linted ahead of importing them
+        self.assertEqual(
+            "Echos a message to stdout (calls /bin/echo)",
+            finder._descriptions[(utils_file, "echo")],
+        )
+
+        components = finder._import_components(base_module, modules)
+        self.assertIn("utils.echo", {c.name for c in components})
+
+    def test_load_components_timings(self) -> None:
+        with self.assertLogs("torchx.specs.finder", level="DEBUG") as cm:
+            _load_components()
+        self.assertIn("group `<builtin>` (torchx.components)", cm.output[0])
+        self.assertTrue(cm.output[0].startswith("DEBUG"))
+
+        with patch("torchx.specs.finder.SLOW_DISCOVERY_SECONDS", 0):
+            with self.assertLogs("torchx.specs.finder", level="WARNING") as cm:
+                _load_components()
+        self.assertIn("slow component discovery", cm.output[0])
+
     def test_validate_and_get_description(self) -> None:
         expected_desc = "Test component"
         finder = ModuleComponentsFinder(sys.modules[__name__], "")
@@ -81,6 +282,19 @@ class DirComponentsFinderTest(unittest.TestCase):
         )
         self.assertEqual(expected_desc, actual_desc)
 
+    def test_validate_and_get_description_parses_once(self) -> None:
+        finder = ModuleComponentsFinder(sys.modules[__name__], "")
+        with patch(
+            "torchx.specs.finder.get_fn_defs", wraps=get_fn_defs
+        ) as get_fn_defs_mock, patch(
+            "torchx.specs.finder.validate_fn_def", wraps=validate_fn_def
+        ) as validate_mock:
+            for _ in range(2):
+                for fn_name in ["test_component", "invalid_component", "unknown"]:
+                    finder._validate_and_get_description(sys.modules[__name__], fn_name)
+        self.assertEqual(1, get_fn_defs_mock.call_count)
+        self.assertEqual(2, validate_mock.call_count)
+
     def test_validate_and_get_description_invalid_component(self) -> None:
         finder = ModuleComponentsFinder(sys.modules[__name__], "")
         actual_desc = finder._validate_and_get_description(
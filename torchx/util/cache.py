@@ -0,0 +1,56 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import os
+import time
+
+
+def cache_dir(*parts: str) -> str:
+    """
+    Returns the path of the ``parts`` subdirectory of the local torchx cache
+    directory, which is ``$TORCHX_CACHE_DIR`` if set, otherwise
+    ``$XDG_CACHE_HOME/torchx`` (``~/.cache/torchx`` by default). The directory
+    is not created, callers create it when they first write to it.
+
+    Example: ``cache_dir("slurm")`` -> ``~/.cache/torchx/slurm``
+    """
+    root = os.environ.get("TORCHX_CACHE_DIR")
+    if not root:
+        xdg_cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        root = os.path.join(xdg_cache_home, "torchx")
+    return os.path.join(root, *parts)
+
+
+def prune(path: str, max_entries: int, max_age: float) -> None:
+    """
+    Removes the files in the ``path`` directory that were last modified more
+    than ``max_age`` seconds ago and, of the remaining ones, all but the
+    ``max_entries`` most recently modified ones. Callers that reuse a cached
+    file should touch it (``os.utime``) so that it is kept. Files that are
+    removed concurrently (e.g. by another process pruning) are ignored.
+    """
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue
+    except FileNotFoundError:
+        return
+
+    cutoff = time.time() - max_age
+    entries.sort(reverse=True)
+    for i, (mtime, file_path) in enumerate(entries):
+        if i >= max_entries or mtime < cutoff:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
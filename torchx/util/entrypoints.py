@@ -4,6 +4,12 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
 import warnings
 
 try:
@@ -12,7 +18,122 @@ try:
 except ImportError:
     import importlib_metadata as metadata
     from importlib_metadata import EntryPoint
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+
+from torchx.util.cache import cache_dir
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# set to "1" to persist the entry points table across processes (in the torchx cache dir)
+PERSIST_ENV: str = "TORCHX_PERSIST_ENTRYPOINTS"
+
+# group -> name -> entry point
+_EntryPointsTable = Dict[str, Dict[str, EntryPoint]]
+
+# (sys.path the table was built for, table)
+_table: Optional[Tuple[Tuple[str, ...], _EntryPointsTable]] = None
+_table_lock = threading.Lock()
+
+
+def clear_cache() -> None:
+    """
+    Clears the entry points table of this process so that the next lookup
+    re-reads the metadata of the installed distributions (e.g. after a
+    distribution was installed by this process).
+    """
+    global _table
+    with _table_lock:
+        _table = None
+
+
+def _entry_points() -> _EntryPointsTable:
+    """
+    Returns the entry points of the installed distributions by group and name.
+    Reading the metadata of every installed distribution is slow, so the table
+    is built once per process (and ``sys.path``) and, if ``$TORCHX_PERSIST_ENTRYPOINTS=1``,
+    persisted in the torchx cache dir keyed on ``sys.path`` and the installed
+    distributions.
+    """
+    global _table
+    path = tuple(sys.path)
+    with _table_lock:
+        if _table is None or _table[0] != path:
+            _table = (path, _load_table())
+        return _table[1]
+
+
+def _read_table() -> _EntryPointsTable:
+    table: _EntryPointsTable = {}
+    for group, eps in metadata.entry_points().items():
+        table[group] = {ep.name: ep for ep in eps}
+    return table
+
+
+def _dists_fingerprint() -> str:
+    """
+    Hash of ``sys.path`` and the distributions (and their ``entry_points.txt``)
+    installed on it, which changes when a distribution is installed, removed
+    or upgraded. Only lists the ``sys.path`` directories rather than reading
+    the metadata of the distributions.
+    """
+    digest = hashlib.sha256()
+    for entry in sys.path:
+        digest.update(f"{entry}\n".encode())
+        try:
+            names = sorted(os.listdir(entry or "."))
+        except OSError:
+            # not a directory (e.g. zip or egg file) or does not exist
+            names = []
+            try:
+                stat = os.stat(entry)
+                digest.update(f"{stat.st_mtime_ns}|{stat.st_size}\n".encode())
+            except OSError:
+                pass
+        for name in names:
+            if not name.endswith((".dist-info", ".egg-info")):
+                continue
+            try:
+                stat = os.stat(os.path.join(entry or ".", name, "entry_points.txt"))
+                stamp = f"{stat.st_mtime_ns}|{stat.st_size}"
+            except OSError:
+                stamp = "-"
+            digest.update(f"{name}|{stamp}\n".encode())
+    return digest.hexdigest()
+
+
+def _load_table() -> _EntryPointsTable:
+    if os.environ.get(PERSIST_ENV) != "1":
+        return _read_table()
+
+    cache_file = cache_dir("entrypoints.json")
+    key = _dists_fingerprint()
+    try:
+        with open(cache_file, "r") as f:
+            cached = json.load(f)
+        if cached["key"] == key:
+            return {
+                group: {name: EntryPoint(name, value, group) for name, value in eps}
+                for group, eps in cached["groups"].items()
+            }
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"ignoring invalid entry points cache {cache_file}: {e}")
+
+    table = _read_table()
+    groups = {
+        group: [[ep.name, ep.value] for ep in eps.values()]
+        for group, eps in table.items()
+    }
+    tmp_file = f"{cache_file}.{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(tmp_file, "w") as f:
+            json.dump({"key": key, "groups": groups}, f)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        logger.warning(f"failed to write entry points cache {cache_file}: {e}")
+    return table
 
 
 # pyre-ignore-all-errors[3, 2]
@@ -33,12 +154,12 @@ def load(group: str, name: str, default=None):
     raises an error.
     """
 
-    entrypoints = metadata.entry_points()
+    entrypoints = _entry_points()
 
     if group not in entrypoints and default:
         return default
 
-    eps: Dict[str, EntryPoint] = {ep.name: ep for ep in entrypoints[group]}
+    eps: Dict[str, EntryPoint] = entrypoints[group]
 
     if name not in eps and default:
         return default
@@ -47,6 +168,22 @@ def load(group: str, name: str, default=None):
         return ep.load()
 
 
+def get_group_values(group: str) -> Dict[str, str]:
+    """
+    Returns the entry points specified by ``group`` as a map of
+    ``name (str) -> value (str)`` without loading them. For the
+    ``entry_point.txt`` in ``load_group``: ``get_group_values("foo")`` ->
+    ``{"bar": "this.is:a_fn", "baz": "this.is:b_fn"}``. Returns an empty map
+    if the group does not exist.
+    """
+
+    entrypoints = _entry_points()
+
+    if group not in entrypoints:
+        return {}
+    return {name: ep.value for name, ep in entrypoints[group].items()}
+
+
 # pyre-ignore-all-errors[3, 2]
 def load_group(
     group: str, default: Optional[Dict[str, Any]] = None, ignore_missing=False
@@ -69,13 +206,13 @@ def load_group(
 
     """
 
-    entrypoints = metadata.entry_points()
+    entrypoints = _entry_points()
 
     if group not in entrypoints:
         return default
 
     eps = {}
-    for ep in entrypoints[group]:
+    for ep in entrypoints[group].values():
         try:
             eps[ep.name] = ep.load()
         except (ModuleNotFoundError, AttributeError) as e:
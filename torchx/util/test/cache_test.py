@@ -0,0 +1,47 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from torchx.util.cache import cache_dir, prune
+
+
+class CacheTest(unittest.TestCase):
+    def test_cache_dir(self) -> None:
+        with patch.dict(os.environ, {"TORCHX_CACHE_DIR": "/tmp/torchx"}):
+            self.assertEqual("/tmp/torchx/slurm", cache_dir("slurm"))
+
+        with patch.dict(os.environ, {"XDG_CACHE_HOME": "/tmp/cache"}):
+            os.environ.pop("TORCHX_CACHE_DIR", None)
+            self.assertEqual("/tmp/cache/torchx", cache_dir())
+
+        with patch.dict(os.environ, {"HOME": "/home/foo"}):
+            os.environ.pop("TORCHX_CACHE_DIR", None)
+            os.environ.pop("XDG_CACHE_HOME", None)
+            self.assertEqual("/home/foo/.cache/torchx/a/b", cache_dir("a", "b"))
+
+    def test_prune(self) -> None:
+        path = tempfile.mkdtemp("torchx_cache_test")
+        self.addCleanup(shutil.rmtree, path)
+        now = time.time()
+        for i in range(5):
+            with open(os.path.join(path, str(i)), "w") as f:
+                f.write(str(i))
+            # 4 is the most recently modified file
+            os.utime(os.path.join(path, str(i)), (now - 10 + i, now - 10 + i))
+        os.utime(os.path.join(path, "0"), (now - 100, now - 100))
+
+        prune(path, max_entries=10, max_age=50)
+        self.assertEqual(["1", "2", "3", "4"], sorted(os.listdir(path)))
+        prune(path, max_entries=2, max_age=50)
+        self.assertEqual(["3", "4"], sorted(os.listdir(path)))
+        # missing directories are ignored
+        prune(os.path.join(path, "missing"), max_entries=2, max_age=50)
@@ -4,6 +4,10 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
+import os
+import shutil
+import sys
+import tempfile
 import unittest
 
 try:
@@ -15,7 +19,13 @@ from typing import Dict
 from typing import List
 from unittest.mock import MagicMock, patch
 
-from torchx.util.entrypoints import load, load_group
+from torchx.util import entrypoints
+from torchx.util.entrypoints import (
+    clear_cache,
+    get_group_values,
+    load,
+    load_group,
+)
 
 
 def EntryPoint_from_config(config: ConfigParser) -> List[EntryPoint]:
@@ -73,6 +83,11 @@ _METADATA_EPS: str = "torchx.util.entrypoints.metadata.entry_points"
 
 
 class EntryPointsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # entry points are cached per process, make sure each test reads its own
+        clear_cache()
+        self.addCleanup(clear_cache)
+
     @patch(_METADATA_EPS, return_value=_ENTRY_POINTS)
     def test_load(self, mock_md_eps: MagicMock) -> None:
         print(type(load("entrypoints.test", "foo")))
@@ -121,3 +136,84 @@ class EntryPointsTest(unittest.TestCase):
 
         with self.assertRaises(ModuleNotFoundError):
             load_group("ep.grp.missing.mod.test", ignore_missing=False)
+
+    @patch(_METADATA_EPS, return_value=_ENTRY_POINTS)
+    def test_get_group_values(self, mock_md_eps: MagicMock) -> None:
+        self.assertEqual(
+            {
+                "foo": "torchx.util.test.entrypoints_test:foobar",
+                "bar": "torchx.util.test.entrypoints_test:barbaz",
+            },
+            get_group_values("ep.grp.test"),
+        )
+        # does not load the entry points
+        self.assertEqual(
+            {"baz": "torchx.util.test.entrypoints_test.missing_module"},
+            get_group_values("ep.grp.missing.mod.test"),
+        )
+        self.assertEqual({}, get_group_values("ep.grp.test.missing"))
+
+    @patch(_METADATA_EPS, return_value=_ENTRY_POINTS)
+    def test_entry_points_cached(self, mock_md_eps: MagicMock) -> None:
+        load("entrypoints.test", "foo")
+        load_group("ep.grp.test")
+        get_group_values("ep.grp.test")
+        mock_md_eps.assert_called_once()
+
+        clear_cache()
+        load("entrypoints.test", "foo")
+        self.assertEqual(2, mock_md_eps.call_count)
+
+        with patch.object(sys, "path", sys.path + ["/tmp/foo"]):
+            load("entrypoints.test", "foo")
+        self.assertEqual(3, mock_md_eps.call_count)
+
+    def test_entry_points_persisted(self) -> None:
+        tmpdir = tempfile.mkdtemp("torchx_entrypoints_test")
+        self.addCleanup(shutil.rmtree, tmpdir)
+        env = {entrypoints.PERSIST_ENV: "1", "TORCHX_CACHE_DIR": tmpdir}
+
+        with patch.dict(os.environ, env), patch(
+            _METADATA_EPS, return_value=_ENTRY_POINTS
+        ) as mock_md_eps:
+            self.assertEqual("foobar", load("entrypoints.test", "foo")())
+            mock_md_eps.assert_called_once()
+            self.assertTrue(os.path.isfile(os.path.join(tmpdir, "entrypoints.json")))
+
+            # new process reads the persisted table
+            clear_cache()
+            self.assertEqual("foobar", load("entrypoints.test", "foo")())
+            self.assertEqual(
+                {
+                    "foo": "torchx.util.test.entrypoints_test:foobar",
+                    "bar": "torchx.util.test.entrypoints_test:barbaz",
+                },
+                get_group_values("ep.grp.test"),
+            )
+            mock_md_eps.assert_called_once()
+
+            # installed distributions changed
+            clear_cache()
+            with patch(
+                "torchx.util.entrypoints._dists_fingerprint", return_value="changed"
+            ):
+                load("entrypoints.test", "foo")
+            self.assertEqual(2, mock_md_eps.call_count)
+
+    def test_dists_fingerprint(self) -> None:
+        site_dir = tempfile.mkdtemp("torchx_entrypoints_test")
+        self.addCleanup(shutil.rmtree, site_dir)
+        dist_info = os.path.join(site_dir, "foo-1.0.dist-info")
+        os.makedirs(dist_info)
+
+        with patch.object(sys, "path", [site_dir, "/does/not/exist"]):
+            fingerprint = entrypoints._dists_fingerprint()
+            self.assertEqual(fingerprint, entrypoints._dists_fingerprint())
+
+            with open(os.path.join(dist_info, "entry_points.txt"), "w") as f:
+                f.write(_EP_TXT)
+            ep_fingerprint = entrypoints._dists_fingerprint()
+            self.assertNotEqual(fingerprint, ep_fingerprint)
+
+            os.rename(dist_info, os.path.join(site_dir, "foo-2.0.dist-info"))
+            self.assertNotEqual(ep_fingerprint, entrypoints._dists_fingerprint())